@@ -9,10 +9,7 @@ import logging
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
-
-# from aws.glue import Glue
-from aws.cloudwatchlogs import CloudWatchLogs
-
+from support.metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +19,11 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.cloudwatchlogs import CloudWatchLogs
 
     cloudwatchlogs = CloudWatchLogs(args.profile)
     cloudwatchlogs.describe_log_streams(args.log_group_name, descending=True, limit=1)
@@ -36,9 +37,7 @@ def main():
 
 def setup_args() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=None)
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
     parser.add_argument(
         "-n",
         "--log_group_name",
@@ -48,12 +47,12 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument(
         "-e", "--environment", help="environment", choices=["dev", "stg"], default=""
     )
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
     logger.debug("Script Started")
     main()
     logger.debug("Script Completed")
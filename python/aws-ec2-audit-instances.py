@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Audit EC2 Instances - Get list of EC2 Instances across all regions and profiles
+
+Python version of bash/audit-ec2-instances.sh that checks every
+(profile, region) pair concurrently.
+"""
+
+import argparse
+import logging
+
+from support.logging_configurator import LoggingConfigurator
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+HEADER = "instance_id,instance_type,instance_name,state,key_name,launch_time"
+
+
+def main():
+    """
+    main program
+    """
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from support.fan_out import FanOut
+
+    fan_out = FanOut(max_workers=args.max_workers)
+    for result in fan_out.run(
+        describe_instances, args.profiles, args.regions, client_name="ec2"
+    ):
+        if not result.ok:
+            continue
+        print(
+            "PROFILE:%s REGION:%s - %d instances"
+            % (result.profile_name, result.region_name, len(result.result))
+        )
+        if result.result:
+            print(HEADER)
+            print("\n".join(result.result))
+
+    if fan_out.errors:
+        logger.warning("%d targets failed" % len(fan_out.errors))
+        for error in fan_out.errors:
+            logger.warning(
+                "%s/%s: %s" % (error.profile_name, error.region_name, error.error)
+            )
+
+
+def describe_instances(client) -> list:
+    from support.pagination import Pagination
+
+    rows = []
+    for reservation in Pagination.paginate(
+        client, "describe_instances", "Reservations"
+    ):
+        for instance in reservation["Instances"]:
+            tags = {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
+            rows.append(
+                ",".join(
+                    '"%s"' % value
+                    for value in [
+                        instance["InstanceId"],
+                        instance["InstanceType"],
+                        tags.get("Name", ""),
+                        instance["State"]["Name"],
+                        instance.get("KeyName", ""),
+                        instance["LaunchTime"],
+                    ]
+                )
+            )
+    return rows
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "-p", "--profiles", nargs="+", type=Aws.profile, default=["default"]
+    )
+    parser.add_argument(
+        "-r", "--regions", help="regions to check (default: all)", nargs="*"
+    )
+    parser.add_argument(
+        "-w", "--max_workers", help="max concurrent calls", type=int, default=32
+    )
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
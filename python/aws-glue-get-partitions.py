@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+List the partitions of an AWS Glue table as CSV or NDJSON
+"""
+
+import argparse
+import csv
+from datetime import datetime
+import json
+import logging
+import sys
+import time
+
+from support.logging_configurator import LoggingConfigurator
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    main program
+    """
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.glue import Glue
+    from aws.glue_partitions import PartitionSnapshot
+
+    glue = Glue(args.profile)
+    table = glue.get_table(args.database, args.table)
+    keys = [key["Name"] for key in table.get("PartitionKeys", [])]
+
+    start = time.perf_counter()
+    partitions = glue.iter_partitions(
+        args.database, args.table, expression=args.expression, segments=args.segments
+    )
+    if args.changed:
+        snapshot = PartitionSnapshot(
+            args.profile, args.database, args.table, args.expression
+        )
+        if snapshot.exists():
+            snapshot.load()
+        else:
+            logger.warning("No earlier listing - every partition is new")
+        rows = snapshot.compare(partitions)
+    else:
+        rows = (("", partition) for partition in partitions)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        count = write(output, args.format, keys, rows, args.changed)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.changed:
+        deleted = snapshot.deleted()
+        logger.info("%d partitions new or changed, %d deleted" % (count, len(deleted)))
+        for values in deleted[:20]:
+            logger.info("Deleted: %s" % values)
+        snapshot.save()
+    logger.info("Listed %d partitions in %.1f s" % (count, time.perf_counter() - start))
+
+
+def write(output, format: str, keys: list, rows, changed: bool) -> int:
+    """
+    Write (change, partition) rows one at a time - returns how many
+    """
+    count = 0
+    if format == "ndjson":
+        for change, partition in rows:
+            if changed:
+                partition["Change"] = change
+            output.write(json.dumps(partition, default=isoformat) + "\n")
+            count += 1
+        return count
+
+    writer = csv.writer(output)
+    headers = keys + ["location", "creation_time", "last_analyzed_time"]
+    writer.writerow(headers + ["change"] if changed else headers)
+    for change, partition in rows:
+        row = partition["Values"] + [
+            partition.get("StorageDescriptor", {}).get("Location", ""),
+            isoformat(partition.get("CreationTime", "")),
+            isoformat(partition.get("LastAnalyzedTime", "")),
+        ]
+        writer.writerow(row + [change] if changed else row)
+        count += 1
+    return count
+
+
+def isoformat(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument("-db", "--database", required=True)
+    parser.add_argument("-t", "--table", required=True)
+    parser.add_argument(
+        "-e",
+        "--expression",
+        help="partition filter evaluated by Glue, e.g. \"dt >= '2024-01-01'\"",
+    )
+    parser.add_argument(
+        "-n",
+        "--segments",
+        help="segments of the table read concurrently, up to 10",
+        type=int,
+        default=4,
+    )
+    parser.add_argument("-f", "--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("-o", "--output", help="file to write - defaults to stdout")
+    parser.add_argument(
+        "-c",
+        "--changed",
+        help="only partitions new or changed since the last --changed listing",
+        action="store_true",
+    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
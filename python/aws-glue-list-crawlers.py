@@ -9,8 +9,8 @@ import logging
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
-from aws.glue import Glue
-
+from support.metrics import Metrics
+from support.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +20,18 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+    ResponseCache.configure(args)
+
+    from aws.glue import Glue
 
     glue = Glue(args.profile)
-    glue.list_crawlers(args.filter)
-    glue.display_crawler_names()
+    for crawler_name in glue.iter_crawler_names(
+        args.filter, limit=args.limit, prefetch=True
+    ):
+        print(crawler_name)
 
 
 def setup_args() -> argparse.ArgumentParser:
@@ -32,15 +39,15 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument(
         "-f", "--filter", help="string filter to look for in crawler names", default=""
     )
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-l", "--limit", help="stop after this many crawlers", type=int)
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    ResponseCache.add_arguments(parser)
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
     logger.debug("Script Started")
     main()
     logger.debug("Script Completed")
@@ -4,14 +4,19 @@ Run AWS Glue Crawlers
 """
 
 import argparse
+from datetime import datetime, timezone
 import logging
 import sys
+import time
+from typing import TYPE_CHECKING, List, Optional
 
-
-from aws.glue import Glue
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
+from support.metrics import Metrics
+
+if TYPE_CHECKING:
+    from aws.glue_watcher import CrawlerRun
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +26,11 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.glue import Glue
 
     glue = Glue(args.profile)
 
@@ -31,8 +40,11 @@ def main():
 
     if args.environment:
         logger.info("Going to run crawlers for %s environment" % args.environment)
-        glue.list_crawlers(args.environment)
-        glue.batch_get_crawlers(glue.crawler_names)
+        glue.load_crawlers(args.environment)
+
+    if args.tags:
+        logger.info("Going to run crawlers tagged %s" % args.tags)
+        glue.load_crawlers(tags=args.tags)
 
     glue.display_crawlers()
     crawlers_to_start = glue.get_crawler_names_by_state(state="READY")
@@ -43,10 +55,91 @@ def main():
         sys.exit(0)
 
     # start crawlers
-    if crawlers_to_start:
-        glue.start_crawlers(crawlers_to_start)
-    else:
+    if not crawlers_to_start:
         logger.info("No crawlers to start!")
+        return
+
+    from aws.glue_watcher import CrawlerRun, CrawlerWatcher
+
+    started = time.monotonic()
+    watcher = CrawlerWatcher(glue, on_change=print_state_change)
+    if args.max_concurrent is not None:
+        from aws.glue_scheduler import CrawlerScheduler
+
+        scheduler = CrawlerScheduler(glue, args.max_concurrent, watcher)
+        runs = scheduler.run(crawlers_to_start)
+    else:
+        runs = [CrawlerRun(name) for name in crawlers_to_start]
+        for run in runs:
+            run.started = datetime.now(timezone.utc)
+        glue.start_crawlers(crawlers_to_start)
+        if not args.wait:
+            return
+        watcher.watch(runs)
+
+    watcher.add_table_counts(runs)
+    print_summary(runs, time.monotonic() - started)
+    if any(run.status != "SUCCEEDED" for run in runs):
+        sys.exit(1)
+
+
+def print_state_change(run: "CrawlerRun", previous: Optional[str]):
+    print(
+        "%s %s: %s -> %s"
+        % (datetime.now().strftime("%H:%M:%S"), run.name, previous or "-", run.state),
+        flush=True,
+    )
+
+
+def print_summary(runs: List["CrawlerRun"], seconds: float):
+    from tabulate import tabulate
+
+    table = [
+        [
+            run.name,
+            run.status,
+            round(run.expected_seconds) or "",
+            "" if run.seconds is None else round(run.seconds),
+            run.tables_created,
+            run.tables_updated,
+            run.error or "",
+        ]
+        for run in runs
+    ]
+    headers = ["crawler", "status", "expected s", "actual s", "created", "updated"]
+    print(tabulate(table, headers + ["error"], tablefmt="simple"))
+    failed = [run.name for run in runs if run.status != "SUCCEEDED"]
+    print(
+        "\n%d crawlers in %.1f minutes - %d tables created, %d updated, %d failed"
+        % (
+            len(runs),
+            seconds / 60,
+            sum(run.tables_created or 0 for run in runs),
+            sum(run.tables_updated or 0 for run in runs),
+            len(failed),
+        )
+    )
+    if failed:
+        print("Failed: %s" % ", ".join(failed))
+
+
+def tag(value: str) -> tuple:
+    key, separator, tag_value = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError("'%s' is not key=value" % value)
+    return key, tag_value
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("%s is not 1 or more" % value)
+    return number
+
+
+class TagsAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, dict(values))
 
 
 def setup_args() -> argparse.ArgumentParser:
@@ -65,14 +158,35 @@ def setup_args() -> argparse.ArgumentParser:
         help="runs all crawlers for specified environment or all environments",
         choices=["dev", "stg", "prod"],
     )
+    group.add_argument(
+        "-t",
+        "--tags",
+        help="runs all crawlers with these tags, e.g. team=data",
+        nargs="+",
+        type=tag,
+        action=TagsAction,
+    )
     parser.add_argument("-s", "--start_crawlers", action="store_true")
-    parser.add_argument("-p", "--profile", choices=Aws.get_profiles(), required=True)
+    parser.add_argument(
+        "-w",
+        "--wait",
+        help="follow the started crawlers until they finish and summarize them",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-k",
+        "--max_concurrent",
+        help="keep up to this many crawlers running, longest first, until all "
+        "finished (implies --wait) - keep it within the concurrent crawler quota",
+        type=positive_int,
+    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, required=True)
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     logger.debug("Script Started")
-    LoggingConfigurator.configure_logging()
     main()
     logger.debug("Script Completed")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Run AWS Glue Jobs - many runs, each with its own arguments, as early as the
+jobs' MaxConcurrentRuns allow
+
+Runs are read from NDJSON lines like
+    {"job": "etl-orders", "arguments": {"--day": "2024-01-01"}}
+or from a CSV with a job column, where every other non empty column becomes a
+--<column> argument.
+"""
+
+import argparse
+import logging
+import sys
+from typing import TYPE_CHECKING, List
+
+from support.logging_configurator import LoggingConfigurator
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+from support.record_reader import RecordReader
+
+if TYPE_CHECKING:
+    from aws.glue_jobs import JobRun
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    main program
+    """
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.glue import Glue
+    from aws.glue_jobs import JobRunner
+
+    runs = read_runs(args.file, args.format)
+    logger.info(
+        "Read %d runs of %d jobs" % (len(runs), len({run.job_name for run in runs}))
+    )
+
+    if not args.start_jobs:
+        for run in runs:
+            print("%s\t%s" % (run.job_name, run.arguments))
+        logger.warning("Simply checking - No jobs will be started!")
+        sys.exit(0)
+
+    runner = JobRunner(
+        Glue(args.profile),
+        max_workers=args.max_workers,
+        max_running=args.max_running,
+        poll_interval=args.poll_interval,
+    )
+    runner.run(runs)
+    print_summary(runs)
+    if any(run.state != "SUCCEEDED" for run in runs):
+        sys.exit(1)
+
+
+def read_runs(file: str, format: str) -> List["JobRun"]:
+    from aws.glue_jobs import JobRun
+
+    runs = []
+    for record in RecordReader.iter_records(file, format):
+        if "arguments" in record:
+            arguments = record["arguments"]
+        else:
+            arguments = {
+                "--" + key: value
+                for key, value in record.items()
+                if key != "job" and value not in (None, "")
+            }
+        runs.append(JobRun(record["job"], arguments))
+    return runs
+
+
+def print_summary(runs: List["JobRun"]):
+    from tabulate import tabulate
+
+    table = [
+        [
+            run.job_name,
+            run.run_id or "",
+            run.state,
+            "" if run.seconds is None else round(run.seconds),
+            "" if run.dpu_seconds is None else round(run.dpu_seconds),
+            run.error or "",
+        ]
+        for run in runs
+    ]
+    headers = ["job", "run id", "state", "seconds", "DPU seconds", "error"]
+    print(tabulate(table, headers, tablefmt="simple"))
+    print(
+        "\n%d runs - %.1f DPU hours, %d not succeeded"
+        % (
+            len(runs),
+            sum(run.dpu_seconds or 0 for run in runs) / 3600,
+            sum(run.state != "SUCCEEDED" for run in runs),
+        )
+    )
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "-f", "--file", help="NDJSON or CSV of runs, - for stdin", required=True
+    )
+    parser.add_argument(
+        "--format",
+        help="format of --file - defaults to csv for .csv files, else ndjson",
+        choices=RecordReader.formats,
+    )
+    parser.add_argument(
+        "-w",
+        "--max_workers",
+        help="StartJobRun and GetJobRuns calls in flight at once",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "-m",
+        "--max_running",
+        help="runs going at once across all jobs - keep it within the account quota",
+        type=int,
+    )
+    parser.add_argument(
+        "-i",
+        "--poll_interval",
+        help="seconds between GetJobRuns polls",
+        type=float,
+        default=15.0,
+    )
+    parser.add_argument("-s", "--start_jobs", action="store_true")
+    parser.add_argument("-p", "--profile", type=Aws.profile, required=True)
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
@@ -8,12 +8,11 @@ reference: https://sweetcode.io/auditing-iam-users-aws-sweetcode/
 import argparse
 import pathlib
 import sys
-from aws.iam_credential_report import IAMCredentialReport
-from aws.iam import IAM
 import logging
 
 from support.aws import Aws
 from support.common import Util
+from support.metrics import Metrics
 from support.logging_configurator import LoggingConfigurator
 
 logger = logging.getLogger(__name__)
@@ -21,10 +20,14 @@ logger = logging.getLogger(__name__)
 
 def main():
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
 
     logger.debug(args)
 
+    from aws.iam import IAM
+
     iam = IAM(args.profile)
 
     if args.run:
@@ -35,6 +38,9 @@ def main():
         logger.info("Getting Generated Credential Report...")
         iam.get_credential_report()
         if iam.credential_report:
+            # pandas is only needed once there is a report to clean
+            from aws.iam_credential_report import IAMCredentialReport
+
             credential_report = IAMCredentialReport(args.profile, iam.credential_report)
             credential_report.clean()
 
@@ -55,15 +61,13 @@ def setup_args() -> argparse.ArgumentParser:
     group.add_argument(
         "-g", "--get", help="Get Generated Credential Report", action="store_true"
     )
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
     logger.debug("Script Started")
     main()
     logger.debug("Script Completed")
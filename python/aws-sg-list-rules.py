@@ -9,8 +9,7 @@ import logging
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
-from aws.ec2 import SecurityGroup
-
+from support.metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +19,11 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.ec2 import SecurityGroup
 
     sg = SecurityGroup(args.profile)
     sg.describe_security_groups(group_names=["metabase-prod-lb-sg"])
@@ -34,15 +37,13 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument(
         "-f", "--filter", help="string filter to look for in crawler names", default=""
     )
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
     logger.debug("Script Started")
     main()
     logger.debug("Script Completed")
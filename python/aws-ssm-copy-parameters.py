@@ -5,28 +5,41 @@ AWS SSM - Copy Parameters to another AWS account
 
 import argparse
 import sys
-from typing import List
-from aws.ssm import NewParameter, Parameter, SSM
+from typing import TYPE_CHECKING, List
 import logging
 import json
 import pprint as pp
 
 from support.aws import Aws
 from support.common import Util
+from support.metrics import Metrics
 from support.logging_configurator import LoggingConfigurator
 
+if TYPE_CHECKING:
+    from aws.ssm import NewParameter, Parameter
+
 logger = logging.getLogger(__name__)
 
 
 def main():
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
 
     logger.info(args.path)
+    if args.sync:
+        sync_parameters(args)
+        return
+
+    from aws.ssm import SSM
 
     source_ssm = SSM(args.source_profile)
     source_ssm.get_parameters_by_path(
-        path=args.path, recursive=args.recursive, decrypt=args.with_decryption
+        path=args.path,
+        recursive=args.recursive,
+        decrypt=args.with_decryption,
+        sharded=args.sharded,
     )
     # source_ssm.display_parameters_names()
     source_ssm.display_parameters()
@@ -38,18 +51,16 @@ def main():
     # start copy
     new_parameters = create_new_parameters_list(source_ssm.parameters)
     target_ssm = SSM(args.target_profile)
-    target_ssm.put_parameters(new_parameters)
+    results = target_ssm.put_parameters(new_parameters)
+    if any(result.status == "failed" for result in results):
+        sys.exit(1)
 
 
 def setup_args() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=None)
     parser.add_argument("-p", "--path", required=True)
-    parser.add_argument(
-        "-s", "--source_profile", choices=Aws.get_profiles(), required=True
-    )
-    parser.add_argument(
-        "-t", "--target_profile", choices=Aws.get_profiles(), required=True
-    )
+    parser.add_argument("-s", "--source_profile", type=Aws.profile, required=True)
+    parser.add_argument("-t", "--target_profile", type=Aws.profile, required=True)
     parser.add_argument(
         "-r", "--recursive", help="recursive flag", action="store_true", default=True
     )
@@ -61,11 +72,110 @@ def setup_args() -> argparse.ArgumentParser:
         default=True,
     )
     parser.add_argument("-c", "--start_copy", action="store_true")
+    parser.add_argument(
+        "--sharded",
+        help="read each child path of --path concurrently",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--sync",
+        help="only copy parameters that are new or changed - changed means the "
+        "type differs or the source was modified after the target, so a target "
+        "edited by hand since the last copy is not reported",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-o",
+        "--overwrite",
+        help="with --sync, overwrite changed parameters in the target",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--delete",
+        help="with --sync, delete target parameters missing from the source",
+        action="store_true",
+    )
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
-def create_new_parameters_list(parameters: List[Parameter]) -> List[NewParameter]:
+def sync_parameters(args: argparse.Namespace):
+    """
+    Diff source and target metadata and move only new / changed parameters
+    """
+    from aws.ssm import SSM, NewParameter, ParameterDiff
+
+    source_ssm = SSM(args.source_profile)
+    target_ssm = SSM(args.target_profile)
+    source = source_ssm.describe_parameters_under_path(args.path, args.recursive)
+    target = target_ssm.describe_parameters_under_path(args.path, args.recursive)
+    diff = ParameterDiff(source, target)
+
+    source_values = {}
+    if args.start_copy and args.overwrite and diff.changed:
+        # a newer source copy doesn't mean a different value - compare the
+        # values, only when changed parameters are really going to be copied
+        source_values = {
+            parameter.name: parameter
+            for parameter in source_ssm.get_parameters(diff.changed, decrypt=True)
+        }
+        diff.mark_identical(
+            {
+                parameter.name
+                for parameter in target_ssm.get_parameters(diff.changed, decrypt=True)
+                if parameter.name in source_values
+                and source_values[parameter.name].value == parameter.value
+                and source_values[parameter.name].type == parameter.type
+            }
+        )
+    diff.display()
+
+    if not args.start_copy:
+        logger.warning("Simply checking - No SSM Parameters will be copied!")
+        sys.exit(0)
+
+    def new_parameter(parameter: "Parameter") -> "NewParameter":
+        description = source[parameter.name].get("Description", "")
+        return NewParameter(
+            parameter.name, parameter.value, parameter.type, description
+        )
+
+    results = target_ssm.put_parameters(
+        [
+            new_parameter(parameter)
+            for parameter in source_ssm.get_parameters(diff.new, decrypt=True)
+        ]
+    )
+    if args.overwrite:
+        # deleted from the source since the diff was taken
+        for name in diff.changed:
+            if name not in source_values:
+                logger.warning("Parameter '%s' no longer in source - skipped" % name)
+        results += target_ssm.put_parameters(
+            [
+                new_parameter(source_values[name])
+                for name in diff.changed
+                if name in source_values
+            ],
+            overwrite=True,
+        )
+    elif diff.changed:
+        logger.warning(
+            "%d changed parameters were not copied - use --overwrite"
+            % len(diff.changed)
+        )
+    if args.delete:
+        target_ssm.delete_parameters(diff.deleted)
+    if any(result.status == "failed" for result in results):
+        sys.exit(1)
+
+
+def create_new_parameters_list(
+    parameters: List["Parameter"],
+) -> List["NewParameter"]:
+    from aws.ssm import NewParameter
+
     new_parameters = [
         NewParameter(
             parameter.name,
@@ -79,6 +189,5 @@ def create_new_parameters_list(parameters: List[Parameter]) -> List[NewParameter
 
 if __name__ == "__main__":
     logger.debug("Script Started")
-    LoggingConfigurator.configure_logging()
     main()
     logger.debug("Script Completed")
@@ -9,7 +9,8 @@ import logging
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
-from aws.ssm import SSM
+from support.metrics import Metrics
+from support.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -19,19 +20,19 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+    ResponseCache.configure(args)
 
-    ssm = SSM(args.profile)
-
-    if args.all:
-        logger.info("Getting all parameters...")
-        ssm.describe_parameters()
+    from aws.ssm import SSM
 
-    if args.values:
-        logger.info("Getting specified values...")
-        ssm.describe_parameters(values=args.values)
-
-    ssm.display_parameters_names()
+    ssm = SSM(args.profile)
+    # print each page as it arrives rather than collecting every parameter
+    for parameter in ssm.iter_describe_parameters(
+        values=args.values, limit=args.limit, prefetch=True
+    ):
+        print(parameter["Name"])
 
 
 def setup_args() -> argparse.ArgumentParser:
@@ -44,14 +45,16 @@ def setup_args() -> argparse.ArgumentParser:
         "-a", "--all", help="Describe all parameters", action="store_true"
     )
     parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
+        "-l", "--limit", help="stop after this many parameters", type=int
     )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    ResponseCache.add_arguments(parser)
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     logger.debug("Script Started")
-    LoggingConfigurator.configure_logging()
     main()
     logger.debug("Script Completed")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+AWS SSM - Parameter history and drift: what changed, when and by whom
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import logging
+import re
+
+from support.logging_configurator import LoggingConfigurator
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.ssm_history import ParameterHistory
+
+    history = ParameterHistory(args.profile, max_workers=args.max_workers)
+    if args.command == "sync" or not args.offline:
+        counts = history.sync(args.path)
+        logger.info(
+            "Synced %(parameters)d parameters - fetched %(fetched)d histories, "
+            "%(deleted)d deleted" % counts
+        )
+    if args.command == "sync":
+        return
+
+    from tabulate import tabulate
+
+    prefix = (args.path.rstrip("/") + "/") if args.path else ""
+    table = [
+        [
+            name,
+            "deleted" if version is None else version,
+            modified,
+            user or "",
+            "" if version is None else ("value" if changed else "metadata"),
+        ]
+        for name, version, modified, user, changed in history.changed_since(args.since)
+        if name.startswith(prefix)
+    ]
+    print(
+        tabulate(
+            table, ["name", "version", "modified", "by", "change"], tablefmt="simple"
+        )
+    )
+
+
+def since(value: str) -> datetime:
+    """
+    argparse type for an ISO date/time or a duration ago like 30m, 12h or 7d
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", value)
+    if match:
+        unit = {"m": "minutes", "h": "hours", "d": "days"}[match.group(2)]
+        return datetime.now(timezone.utc) - timedelta(**{unit: int(match.group(1))})
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("'%s' is not a date or duration" % value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "command",
+        help="sync the local history store or list what changed",
+        choices=["sync", "changed"],
+    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    parser.add_argument("--path", help="only parameters under this path")
+    parser.add_argument(
+        "-s",
+        "--since",
+        help="changed: ISO date/time or duration ago like 12h or 7d",
+        type=since,
+        default="1d",
+    )
+    parser.add_argument(
+        "-o",
+        "--offline",
+        help="changed: answer from the local store without syncing",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-w",
+        "--max_workers",
+        help="parameters whose history is fetched at once",
+        type=int,
+        default=Aws.max_pool_connections,
+    )
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
@@ -8,17 +8,21 @@ import logging
 
 import pprint as pp
 
-from aws.ssm import SSM
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
+from support.metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
 
 def main():
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.ssm import SSM
 
     ssm = SSM(args.profile)
     parameter = ssm.get_parameter(args.token, args.with_decryption)
@@ -34,15 +38,13 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument(
         "-f", "--full_info", help="get full JSON info of parameter", action="store_true"
     )
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     logger.debug("Script Started")
-    LoggingConfigurator.configure_logging()
     main()
     logger.debug("Script Completed")
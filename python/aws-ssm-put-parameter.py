@@ -4,47 +4,145 @@ AWS SSM
 """
 
 import argparse
+import itertools
 import logging
+import sys
 import pprint as pp
-from typing import List
+from typing import TYPE_CHECKING, Iterator, List, Set, Tuple
 
-from aws.ssm import SSM, NewParameter
 from support.aws import Aws
+from support.checkpoint import Checkpoint
 from support.common import Util
+from support.metrics import Metrics
 from support.csv_reader import CSVReader
 from support.logging_configurator import LoggingConfigurator
 
+if TYPE_CHECKING:
+    from aws.ssm import NewParameter, PutParameterResult
+
 logger = logging.getLogger(__name__)
 
 
 def main():
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
 
-    new_parameters = create_new_parameters_list(args.input_file)
+    from aws.ssm import SSM
+
+    checkpoint = Checkpoint(
+        args.checkpoint or args.input_file + ".checkpoint", args.input_file
+    )
+    if args.restart:
+        checkpoint.clear()
+    checkpoint.load()
 
     ssm = SSM(args.profile)
-    ssm.put_parameters(new_parameters)
+    if checkpoint.failed:
+        # rows before the checkpoint that failed last time get another go
+        retry = list(
+            iter_failed_parameters(
+                args.input_file, checkpoint.rows_done, set(checkpoint.failed)
+            )
+        )
+        logger.info("Retrying %d failed parameters" % len(retry))
+        checkpoint.retried(ssm.put_parameters(retry))
+
+    # only one chunk of rows is held at a time whatever the size of the file
+    for rows_done, new_parameters, invalid in iter_new_parameter_chunks(
+        args.input_file, args.chunk_size, checkpoint.rows_done
+    ):
+        results = ssm.put_parameters(new_parameters)
+        checkpoint.advance(rows_done, results + invalid)
+        logger.info("Finished %d rows" % rows_done)
+
+    logger.info(
+        "Created %d, skipped %d, failed %d parameters"
+        % (
+            checkpoint.counts["created"],
+            checkpoint.counts["skipped"],
+            checkpoint.counts["failed"],
+        )
+    )
+    if checkpoint.failed:
+        logger.error("Failed: %s" % ", ".join(checkpoint.failed))
+        sys.exit(1)
+    checkpoint.clear()
 
 
 def setup_args() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=None)
     parser.add_argument("-i", "--input_file", required=True)
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    parser.add_argument(
+        "-n",
+        "--chunk_size",
+        help="rows handed to the write pipeline at a time",
+        type=int,
+        default=500,
+    )
     parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
+        "-c",
+        "--checkpoint",
+        help="progress file to resume from, defaults to <input_file>.checkpoint",
     )
+    parser.add_argument(
+        "-r", "--restart", help="ignore an existing checkpoint", action="store_true"
+    )
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
-def create_new_parameters_list(csv_file: str) -> List[NewParameter]:
-    file_contents = CSVReader.read_file_into_dict(csv_file)
-    new_parameters = [NewParameter(**content) for content in file_contents]
-    return new_parameters
+def iter_new_parameter_chunks(
+    csv_file: str, chunk_size: int, skip_rows: int = 0
+) -> Iterator[Tuple[int, List["NewParameter"], List["PutParameterResult"]]]:
+    """
+    Yield (rows done, valid NewParameters, failed results of invalid rows) per
+    chunk of the file, validating rows as they are read
+    """
+    from aws.ssm import NewParameter, PutParameterResult
+
+    rows = itertools.islice(
+        enumerate(CSVReader.iter_file_into_dict(csv_file), start=1), skip_rows, None
+    )
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        new_parameters = []
+        invalid = []
+        for row_number, row in chunk:
+            try:
+                new_parameters.append(NewParameter(**row))
+            except (TypeError, ValueError) as err:
+                name = row.get("Name") or "row %d" % row_number
+                logger.error("Row %d is invalid: %s" % (row_number, err))
+                invalid.append(PutParameterResult(name, "failed", err))
+        yield chunk[-1][0], new_parameters, invalid
+
+
+def iter_failed_parameters(
+    csv_file: str, rows_done: int, names: Set[str]
+) -> Iterator["NewParameter"]:
+    """
+    NewParameters of the first rows_done rows named in names - rows that are
+    invalid stay failed
+    """
+    from aws.ssm import NewParameter
+
+    rows = itertools.islice(CSVReader.iter_file_into_dict(csv_file), rows_done)
+    for row in rows:
+        if row.get("Name") not in names:
+            continue
+        try:
+            yield NewParameter(**row)
+        except (TypeError, ValueError):
+            continue
 
 
 if __name__ == "__main__":
     logger.debug("Script Started")
-    LoggingConfigurator.configure_logging()
     main()
     logger.debug("Script Completed")
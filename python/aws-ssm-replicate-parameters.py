@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+AWS SSM - Replicate a parameter tree to several (profile, region) targets at once
+"""
+
+import argparse
+from collections import Counter
+import logging
+import sys
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+from support.logging_configurator import LoggingConfigurator
+
+if TYPE_CHECKING:
+    from aws.ssm import PutParameterResult
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.ssm import SSM, NewParameter
+    from support.fan_out import FanOut
+
+    # read the source once - every target gets the same list
+    source_ssm = SSM(args.source_profile, args.source_region)
+    source_ssm.get_parameters_by_path(
+        path=args.path, recursive=args.recursive, decrypt=True, sharded=args.sharded
+    )
+    # GetParametersByPath leaves descriptions out - DescribeParameters has them
+    metadata = source_ssm.describe_parameters_under_path(args.path, args.recursive)
+    new_parameters = [
+        NewParameter(
+            parameter.name,
+            parameter.value,
+            parameter.type,
+            metadata.get(parameter.name, {}).get("Description", ""),
+        )
+        for parameter in source_ssm.parameters
+    ]
+    logger.info(
+        "Replicating %d parameters to %d targets"
+        % (len(new_parameters), len(args.targets))
+    )
+
+    if not args.start_copy:
+        logger.warning("Simply checking - No SSM Parameters will be copied!")
+        sys.exit(0)
+
+    def replicate(profile_name: str, region_name: Optional[str]) -> Counter:
+        # each target has its own client, so its own throttling bucket
+        target_ssm = SSM(profile_name, region_name)
+        progress = Progress(
+            "%s/%s" % (profile_name, target_ssm.client.meta.region_name),
+            len(new_parameters),
+        )
+        results = target_ssm.put_parameters(
+            new_parameters, overwrite=args.overwrite, on_result=progress.update
+        )
+        return Counter(result.status for result in results)
+
+    fan_out = FanOut(max_workers=len(args.targets))
+    results = list(fan_out.run_targets(replicate, args.targets))
+    report = [
+        [
+            result.profile_name,
+            result.region_name or "default",
+            *(
+                result.result[status] if result.ok else "-"
+                for status in ("created", "updated", "skipped", "failed")
+            ),
+            "" if result.ok else result.error,
+        ]
+        for result in results
+    ]
+
+    from tabulate import tabulate
+
+    headers = ["profile", "region", "created", "updated", "skipped", "failed"]
+    print(tabulate(sorted(report), headers + ["error"], tablefmt="simple"))
+    if fan_out.errors or any(result.result["failed"] for result in results):
+        sys.exit(1)
+
+
+class Progress:
+    """
+    Logs how far one target got every 10% of its parameters
+    """
+
+    def __init__(self, target: str, total: int):
+        self.target = target
+        self.total = total
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def update(self, result: "PutParameterResult"):
+        with self._lock:
+            self.counts[result.status] += 1
+            done = sum(self.counts.values())
+        if done == self.total or done % max(1, self.total // 10) == 0:
+            logger.info(
+                "%s: %d/%d done, %d failed"
+                % (self.target, done, self.total, self.counts["failed"])
+            )
+
+
+def target(value: str) -> Tuple[str, Optional[str]]:
+    """
+    argparse type for profile[:region]
+    """
+    profile_name, _, region_name = value.partition(":")
+    return Aws.profile(profile_name), region_name or None
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument("-p", "--path", required=True)
+    parser.add_argument("-s", "--source_profile", type=Aws.profile, required=True)
+    parser.add_argument("--source_region", help="defaults to the profile's region")
+    parser.add_argument(
+        "-t",
+        "--targets",
+        help="profile[:region] to replicate to - region defaults to the profile's",
+        type=target,
+        nargs="+",
+        required=True,
+    )
+    parser.add_argument(
+        "-r", "--recursive", help="recursive flag", action="store_true", default=True
+    )
+    parser.add_argument(
+        "--sharded",
+        help="read each child path of --path concurrently",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-o",
+        "--overwrite",
+        help="overwrite parameters that already exist in a target",
+        action="store_true",
+    )
+    parser.add_argument("-c", "--start_copy", action="store_true")
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
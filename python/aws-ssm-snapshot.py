@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+AWS SSM - Snapshot parameters locally and query the snapshot offline
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from support.logging_configurator import LoggingConfigurator
+from support.aws import Aws
+from support.common import Util
+from support.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    args = setup_args()
+    LoggingConfigurator.configure_logging()
+    Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.ssm_snapshot import SSMSnapshot
+
+    snapshot = SSMSnapshot(args.profile, args.region)
+
+    if args.command == "take":
+        snapshot.take(with_values=args.with_values)
+        snapshot.save()
+        return
+
+    if not snapshot.exists():
+        logger.error(
+            "No snapshot for '%s' in %s - run 'take' first"
+            % (args.profile, snapshot.region_name)
+        )
+        sys.exit(1)
+    snapshot.load()
+
+    if args.command == "refresh":
+        snapshot.refresh()
+        snapshot.save()
+        return
+
+    start = time.perf_counter()
+    if args.path:
+        parameters = snapshot.get_parameters_by_path(
+            args.path, recursive=args.recursive, values=args.values
+        )
+    else:
+        parameters = snapshot.describe_parameters(values=args.values)
+    logger.info(
+        "Found %d parameters in %.1f ms"
+        % (len(parameters), (time.perf_counter() - start) * 1000)
+    )
+    for parameter in parameters:
+        if args.show_values and snapshot.with_values:
+            print("%s\t%s" % (parameter["Name"], parameter["Value"]))
+        else:
+            print(parameter["Name"])
+
+
+def setup_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "command",
+        help="take a new snapshot, refresh the existing one or query it offline",
+        choices=["take", "refresh", "query"],
+    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    parser.add_argument("--region", help="defaults to the profile's region")
+    parser.add_argument(
+        "-w",
+        "--with_values",
+        help="take: also store values - SecureStrings stay encrypted",
+        action="store_true",
+    )
+    parser.add_argument("--path", help="query: parameters under this path")
+    parser.add_argument(
+        "-r", "--recursive", help="query: include nested paths", action="store_true"
+    )
+    parser.add_argument(
+        "-v",
+        "--values",
+        help="query: names containing any of these",
+        nargs="*",
+        type=str,
+        default=[],
+    )
+    parser.add_argument(
+        "-s", "--show_values", help="query: print values too", action="store_true"
+    )
+    Metrics.add_arguments(parser)
+    parser.add_argument("-d", "--debug", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.debug("Script Started")
+    main()
+    logger.debug("Script Completed")
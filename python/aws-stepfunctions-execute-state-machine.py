@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-List AWS Step Functions State Machines
+Execute AWS Step Functions State Machines
 ---
 
 Currently no way to batch get step functions so need to
@@ -8,21 +8,30 @@ get full list of step functions that exist, then filter out
 based on list provided by user to get the list of step functions
 to execute.
 This is also because start_execution() only takes stateMachineArn
+
+With --file, one state machine is executed once per input read from an NDJSON
+file (one JSON input per line), a CSV (one input object per row) or stdin.
+Execution names are derived from the inputs, so rerunning a file doesn't start
+anything twice.
 """
 
 import argparse
+import csv
+import json
 import logging
+import sys
+import time
 
-from tabulate import tabulate
-from typing import List
-
-import boto3
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 
-from aws.stepfunctions import StepFunctions
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
+from support.metrics import Metrics
+from support.record_reader import RecordReader
 
+if TYPE_CHECKING:
+    from aws.stepfunctions import StepFunctions
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +41,11 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+
+    from aws.stepfunctions import StepFunctions
 
     # get arm for state machine
     step_functions = StepFunctions(args.profile)
@@ -42,12 +55,91 @@ def main():
         args.state_machines_names
     )
 
+    if args.file:
+        if len(state_machines_arns) != 1:
+            logger.error("--file executes exactly one state machine")
+            sys.exit(1)
+        execute_bulk(step_functions, state_machines_arns[0], args)
+        return
+
     print(state_machines_arns)
     logger.info("Starting state machines %s" % state_machines_arns)
-
     step_functions.execute_state_machines(state_machines_arns)
 
 
+def execute_bulk(step_functions: "StepFunctions", arn: str, args: argparse.Namespace):
+    """
+    Start one execution per input and stream name, executionArn, startDate
+    and error of each to the results file
+    """
+    executions = iter_executions(args.file, args.format, args.name_field, args.prefix)
+    try:
+        results = step_functions.start_executions(
+            arn,
+            executions,
+            max_workers=args.max_workers,
+            allow_express=args.allow_express,
+        )
+    except ValueError as err:
+        logger.error("%s. Use --allow_express to start it anyway" % err)
+        sys.exit(1)
+    output = open(args.results, "w", newline="") if args.results else sys.stdout
+    writer = csv.writer(output)
+    writer.writerow(["name", "executionArn", "startDate", "error"])
+    counts = {"started": 0, "exists": 0, "failed": 0}
+    start = time.perf_counter()
+    try:
+        for result in results:
+            counts[result.status] += 1
+            writer.writerow(
+                [
+                    result.name,
+                    result.execution_arn or "",
+                    result.start_date.isoformat() if result.start_date else "",
+                    result.error or "",
+                ]
+            )
+            done = sum(counts.values())
+            if done % 1000 == 0:
+                output.flush()
+                logger.info(
+                    "%d executions done, %.0f/s"
+                    % (done, done / (time.perf_counter() - start))
+                )
+    finally:
+        if args.results:
+            output.close()
+    logger.info(
+        "%d started, %d already existed, %d failed in %.1f s"
+        % (
+            counts["started"],
+            counts["exists"],
+            counts["failed"],
+            time.perf_counter() - start,
+        )
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+def iter_executions(
+    file: str, format: str, name_field: str, prefix: str
+) -> Iterator[Tuple[str, str]]:
+    """
+    (name, input) per record - the input is the record as canonical JSON so
+    the same record always gets the same name
+    """
+    from aws.stepfunctions import StepFunctions
+
+    for record in RecordReader.iter_records(file, format):
+        execution_input = json.dumps(record, sort_keys=True, separators=(",", ":"))
+        if name_field:
+            name = StepFunctions.clean_execution_name(str(record[name_field]))
+        else:
+            name = StepFunctions.execution_name(execution_input, prefix)
+        yield name, execution_input
+
+
 def setup_args() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=None)
     parser.add_argument(
@@ -62,8 +154,39 @@ def setup_args() -> argparse.ArgumentParser:
         required=True,
     )
     parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
+        "-f", "--file", help="NDJSON or CSV of execution inputs, - for stdin"
+    )
+    parser.add_argument(
+        "--format",
+        help="format of --file - defaults to csv for .csv files, else ndjson",
+        choices=RecordReader.formats,
+    )
+    parser.add_argument(
+        "-r", "--results", help="CSV of started executions - defaults to stdout"
+    )
+    parser.add_argument(
+        "-n",
+        "--name_field",
+        help="input field to name executions by instead of a hash of the input",
     )
+    parser.add_argument(
+        "--prefix", help="prefix of hashed execution names", default="bulk"
+    )
+    parser.add_argument(
+        "--allow_express",
+        help="start --file inputs on an EXPRESS state machine, where reruns "
+        "start every input again",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-w",
+        "--max_workers",
+        help="StartExecution calls in flight at once",
+        type=int,
+        default=Aws.max_pool_connections,
+    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
@@ -86,13 +209,14 @@ def setup_args() -> argparse.ArgumentParser:
 
 
 def display_crawlers(state_machines: List[dict]):
+    from tabulate import tabulate
+
     headers = list(state_machines[0].keys())
     table = [list(state_machine.values()) for state_machine in state_machines]
     print(tabulate(table, headers, tablefmt="simple"))
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
     logger.debug("Script Started")
     main()
     logger.debug("Script Completed")
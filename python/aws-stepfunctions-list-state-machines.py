@@ -6,11 +6,11 @@ List AWS Step Functions State Machines
 import argparse
 import logging
 
-from aws.stepfunctions import StepFunctions
 from support.logging_configurator import LoggingConfigurator
 from support.aws import Aws
 from support.common import Util
-
+from support.metrics import Metrics
+from support.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +20,14 @@ def main():
     main program
     """
     args = setup_args()
+    LoggingConfigurator.configure_logging()
+    logger.info("Script Started")
     Util.check_debug_mode(args)
+    Metrics.configure(args)
+    ResponseCache.configure(args)
+
+    from aws.stepfunctions import StepFunctions
+
     step_functions = StepFunctions(profile_name=args.profile)
     step_functions.list_state_machines()
     step_functions.display_state_machines()
@@ -28,15 +35,13 @@ def main():
 
 def setup_args() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=None)
-    parser.add_argument(
-        "-p", "--profile", choices=Aws.get_profiles(), default="default"
-    )
+    parser.add_argument("-p", "--profile", type=Aws.profile, default="default")
+    ResponseCache.add_arguments(parser)
+    Metrics.add_arguments(parser)
     parser.add_argument("-d", "--debug", action="store_true")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    LoggingConfigurator.configure_logging()
-    logger.info("Script Started")
     main()
     logger.info("Script Completed")
@@ -3,15 +3,29 @@ AWS Service
 """
 
 from abc import ABC, abstractmethod
+import types
 
 import boto3
 
+from support.metrics import Metrics
+
 
 class AwsService(ABC):
     """
     Aws Service Base Class
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # time every wrapper method and the _convert_* helpers when --metrics is on
+        for name, attribute in list(vars(cls).items()):
+            if not isinstance(attribute, types.FunctionType):
+                continue
+            if name.startswith("_") and not name.startswith("_convert"):
+                continue
+            span_name = "%s.%s" % (cls.__name__, name)
+            setattr(cls, name, Metrics.timed(span_name, attribute))
+
     @abstractmethod
     def __init__(self, profile_name: str, **kwargs):
         pass
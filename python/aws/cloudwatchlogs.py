@@ -12,11 +12,24 @@ from tabulate import tabulate
 
 from aws.aws_service import AwsService
 from support.aws import Aws
+from support.compact import Compact
 
 logger = logging.getLogger(__name__)
 
 
-class LogStream:
+class LogStream(Compact):
+    __slots__ = (
+        "log_stream_name",
+        "creation_time",
+        "first_event_timestamp",
+        "last_event_timestamp",
+        "last_ingestion_time",
+        "upload_sequence_token",
+        "_arn_prefix",
+        "_arn",
+        "stored_bytes",
+    )
+
     def __init__(
         self,
         logStreamName: str,
@@ -37,6 +50,18 @@ class LogStream:
         self.arn: str = arn
         self.stored_bytes: int = storedBytes
 
+    @property
+    def arn(self) -> str:
+        if self._arn_prefix is None:
+            return self._arn
+        return self._arn_prefix + self.log_stream_name
+
+    @arn.setter
+    def arn(self, arn: str):
+        # every stream of a log group shares the ARN up to the stream name
+        self._arn_prefix = Compact.arn_prefix(arn, self.log_stream_name)
+        self._arn = None if self._arn_prefix is not None else arn
+
 
 class CloudWatchLogs(AwsService):
     def __init__(self, profile_name: str):
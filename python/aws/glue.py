@@ -2,22 +2,44 @@
 AWS Glue
 """
 
+import bisect
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import itertools
 import json
 import logging
-
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import boto3
 from tabulate import tabulate
 
 from aws.aws_service import AwsService
 from support.aws import Aws
+from support.compact import Compact, Packed
+from support.pagination import Pagination
 
 logger = logging.getLogger(__name__)
 
 
-class Crawler:
+class Crawler(Compact):
+    __slots__ = (
+        "_classifiers",
+        "configuration",
+        "crawl_elapsed_time",
+        "creation_time",
+        "database_name",
+        "last_updated",
+        "name",
+        "role",
+        "_schedule",
+        "_schema_change_policy",
+        "state",
+        "_targets",
+        "version",
+        "_last_crawl",
+    )
+
     def __init__(
         self,
         Classifiers: list,
@@ -39,18 +61,26 @@ class Crawler:
         self.configuration: dict = Configuration
         self.crawl_elapsed_time: float = CrawlElapsedTime
         self.creation_time: datetime = CreationTime
-        self.database_name: str = DatabaseName
+        self.database_name: str = Compact.intern(DatabaseName)
         self.last_updated: datetime = LastUpdated
         self.name: str = Name
-        self.role: str = Role
+        self.role: str = Compact.intern(Role)
         self.schedule: dict = Schedule
         self.schema_change_policy: dict = SchemaChangePolicy
-        self.state: str = State
+        self.state: str = Compact.intern(State)
         self.targets: dict = Targets
         self.version: int = Version
         if LastCrawl:
             self.last_crawl: dict = LastCrawl
 
+    # nested fields stay pickled until first read - only crawlers that have
+    # run have a last_crawl, as before
+    classifiers = Packed("_classifiers")
+    schedule = Packed("_schedule")
+    schema_change_policy = Packed("_schema_change_policy")
+    targets = Packed("_targets")
+    last_crawl = Packed("_last_crawl")
+
     def __repr__(self):
         return json.dumps(self.values())
 
@@ -58,40 +88,194 @@ class Crawler:
         return {"Name": self.name, "State": self.state}
 
 
+class CrawlerInventory:
+    """
+    Crawlers indexed by name, database, schedule and S3 target path so
+    repeated selections don't scan every crawler. Adding a crawler again
+    replaces the earlier copy. State changes while crawlers run, so it is
+    read off the crawlers themselves rather than indexed.
+    """
+
+    def __init__(self, crawlers: List[Crawler] = []):
+        self.by_name: Dict[str, Crawler] = {}
+        self.by_database: Dict[str, List[str]] = defaultdict(list)
+        self.by_schedule: Dict[Optional[str], List[str]] = defaultdict(list)
+        self._s3_paths: List[Tuple[str, str]] = []
+        self._s3_sorted: bool = True
+        for crawler in crawlers:
+            self.add(crawler)
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def add(self, crawler: Crawler):
+        if crawler.name in self.by_name:
+            self.remove(crawler.name)
+        self.by_name[crawler.name] = crawler
+        self.by_database[crawler.database_name].append(crawler.name)
+        schedule = crawler.schedule or {}
+        self.by_schedule[schedule.get("ScheduleExpression")].append(crawler.name)
+        for target in (crawler.targets or {}).get("S3Targets", []):
+            self._s3_paths.append((target["Path"], crawler.name))
+            self._s3_sorted = False
+
+    def remove(self, name: str):
+        crawler = self.by_name.pop(name)
+        self.by_database[crawler.database_name].remove(name)
+        schedule = crawler.schedule or {}
+        self.by_schedule[schedule.get("ScheduleExpression")].remove(name)
+        if (crawler.targets or {}).get("S3Targets"):
+            self._s3_paths = [entry for entry in self._s3_paths if entry[1] != name]
+
+    def names_by_state(self, state: str) -> List[str]:
+        state = state.upper()
+        return [
+            name for name, crawler in self.by_name.items() if crawler.state == state
+        ]
+
+    def names_by_database(self, database_name: str) -> List[str]:
+        return list(self.by_database.get(database_name, []))
+
+    def names_by_schedule(self, schedule_expression: Optional[str]) -> List[str]:
+        """
+        Crawlers on schedule_expression - None for crawlers without a schedule
+        """
+        return list(self.by_schedule.get(schedule_expression, []))
+
+    def names_by_s3_prefix(self, prefix: str) -> List[str]:
+        """
+        Crawlers with an S3 target under prefix, e.g. s3://prod-lake/table_
+        """
+        if not self._s3_sorted:
+            self._s3_paths.sort()
+            self._s3_sorted = True
+        start = bisect.bisect_left(self._s3_paths, (prefix,))
+        names = []
+        for path, name in itertools.islice(self._s3_paths, start, None):
+            if not path.startswith(prefix):
+                break
+            names.append(name)
+        return list(dict.fromkeys(names))
+
+
 class Glue(AwsService):
+    # BatchGetCrawlers accepts between 1 and 25 names
+    batch_get_crawlers_size = 25
+    # GetCrawlerMetrics accepts up to 100 names
+    get_crawler_metrics_size = 100
+    # GetPartitions splits a table into at most 10 segments
+    get_partitions_max_segments = 10
+    batch_get_jobs_size = 25
+
     def __init__(self, profile_name: str):
         self.profile_name = profile_name
         self.client_name = "glue"
         self.client = self._create_client()
         self.crawler_names: List[str] = []
         self.crawlers: List[Crawler] = []
+        self.crawlers_not_found: List[str] = []
+        self._inventory = CrawlerInventory()
+        # how many of self.crawlers the inventory has seen
+        self._indexed: int = 0
 
     def _create_client(self) -> boto3.client:
         return Aws.create_client(self.profile_name, self.client_name)
 
-    def batch_get_crawlers(self, crawler_names: List[str]):
-        logger.debug("Batch getting crawlers...")
+    @property
+    def inventory(self) -> CrawlerInventory:
+        """
+        Index of self.crawlers - crawlers added since the last use are indexed
+        on the way, and a crawler loaded again replaces its earlier copy
+        """
+        if len(self.crawlers) < self._indexed:
+            # self.crawlers was cut down or replaced - start over
+            self._inventory = CrawlerInventory()
+            self._indexed = 0
+        for crawler in self.crawlers[self._indexed :]:
+            self._inventory.add(crawler)
+        self._indexed = len(self.crawlers)
+        return self._inventory
 
-        # BatchGetCrawlers only accepts between 1 and 25 crawlers at a time
-        # botocore.errorfactory.InvalidInputException: An error occurred (InvalidInputException)
-        # when calling the BatchGetCrawlers operation: Number of requested crawlers must be between
-        # 1 and 25
-        start_idx = 0
-        end_idx = 24
-        num_elements = 24
-
-        while len(self.crawlers) < len(crawler_names):
-            crawler_names_batch_25 = crawler_names[start_idx:end_idx]
-            resp = self.client.batch_get_crawlers(CrawlerNames=crawler_names_batch_25)
-            converted: List[Crawler] = self._convert_crawler_dict_to_class(
-                resp["Crawlers"]
+    def load_crawlers(self, filter: str = "", tags: Optional[Dict[str, str]] = None):
+        """
+        Full definitions of every crawler whose name contains filter in one pass
+
+        With tags, ListCrawlers narrows the crawlers down on the server first
+        and only those are fetched. Otherwise the definitions come straight
+        from paginated GetCrawlers instead of listing names and then fetching
+        them.
+        """
+        logger.debug("Loading crawlers...")
+        if tags:
+            names = Pagination.paginate(
+                self.client, "list_crawlers", "CrawlerNames", Tags=tags
+            )
+            crawlers = self.iter_crawlers([name for name in names if filter in name])
+        else:
+            crawlers = (
+                crawler
+                for crawler_dict in Pagination.paginate(
+                    self.client, "get_crawlers", "Crawlers"
+                )
+                for crawler in self._convert_crawler_dict_to_class([crawler_dict])
+                if filter in crawler.name
             )
-            self.crawlers.extend(converted)
-            start_idx = end_idx
-            end_idx += num_elements
+        self.crawlers.extend(crawlers)
+        logger.info("Loaded %d crawlers" % len(self.crawlers))
 
+    def batch_get_crawlers(self, crawler_names: List[str]):
+        logger.debug("Batch getting crawlers...")
+        order = {name: i for i, name in enumerate(crawler_names)}
+        crawlers = sorted(
+            self.iter_crawlers(crawler_names), key=lambda c: order[c.name]
+        )
+        self.crawlers.extend(crawlers)
+        if self.crawlers_not_found:
+            logger.warning(
+                "%d crawlers not found: %s"
+                % (len(self.crawlers_not_found), self.crawlers_not_found)
+            )
         logger.debug("Completed batch getting crawlers!")
 
+    def iter_crawlers(
+        self, crawler_names: List[str], max_workers: int = Aws.max_pool_connections
+    ) -> Iterator[Crawler]:
+        """
+        Stream Crawlers as each BatchGetCrawlers call lands - names are sent 25
+        at a time with max_workers calls in flight, and names that don't exist
+        are collected in self.crawlers_not_found
+        """
+        batches = iter(
+            [
+                crawler_names[i : i + Glue.batch_get_crawlers_size]
+                for i in range(0, len(crawler_names), Glue.batch_get_crawlers_size)
+            ]
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # only max_workers batches in flight - landed responses are let go
+            # as soon as they're converted
+            pending = {
+                executor.submit(self.client.batch_get_crawlers, CrawlerNames=batch)
+                for batch in itertools.islice(batches, max_workers)
+            }
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        resp = future.result()
+                        self.crawlers_not_found.extend(resp.get("CrawlersNotFound", []))
+                        yield from self._convert_crawler_dict_to_class(resp["Crawlers"])
+                        for batch in itertools.islice(batches, 1):
+                            pending.add(
+                                executor.submit(
+                                    self.client.batch_get_crawlers, CrawlerNames=batch
+                                )
+                            )
+            finally:
+                # the caller stopped early - don't send the remaining batches
+                for future in pending:
+                    future.cancel()
+
     def _convert_crawler_dict_to_class(self, crawlers: List[dict]) -> List[Crawler]:
         """
         Converts dictionary representation of Crawler to Crawler class
@@ -103,26 +287,22 @@ class Glue(AwsService):
 
     def list_crawlers(self, filter: str = ""):
         logger.debug("Listing crawlers...")
-        got_all_crawlers = False
-        next_token = ""
-        while not got_all_crawlers:
-            resp = self.client.list_crawlers(NextToken=next_token)
-
-            if filter:
-                for crawler_name in resp["CrawlerNames"]:
-                    if filter in crawler_name:
-                        self.crawler_names.append(crawler_name)
-            else:
-                self.crawler_names.extend(resp["CrawlerNames"])
-
-            next_token = resp.get("NextToken", None)
-
-            if not next_token:
-                got_all_crawlers = True
-
+        self.crawler_names.extend(self.iter_crawler_names(filter))
         logger.debug("Found %d crawlers" % len(self.crawler_names))
         logger.debug("Completed listing crawlers!")
 
+    def iter_crawler_names(
+        self, filter: str = "", limit: Optional[int] = None, **pagination
+    ) -> Iterator[str]:
+        """
+        Stream crawler names containing filter as each page arrives
+        """
+        crawler_names = Pagination.paginate(
+            self.client, "list_crawlers", "CrawlerNames", **pagination
+        )
+        matching = (name for name in crawler_names if filter in name)
+        return itertools.islice(matching, limit)
+
     def display_crawler_names(self):
         for crawler_name in self.crawler_names:
             print(crawler_name)
@@ -134,15 +314,70 @@ class Glue(AwsService):
             print(tabulate(table, headers, tablefmt="simple"))
 
     def get_crawler_names_by_state(self, state: str = "READY"):
-        crawlers_in_state: List[Crawler] = []
-        state = state.upper()
-        logger.debug("Getting crawlers in state '%s'..." % state)
-        for crawler in self.crawlers:
-            if crawler.state == state:
-                crawlers_in_state.append(crawler.name)
-        logger.debug("Completed getting crawlers in state '%s'" % state)
+        logger.debug("Getting crawlers in state '%s'..." % state.upper())
+        crawlers_in_state = self.inventory.names_by_state(state)
+        logger.debug("Completed getting crawlers in state '%s'" % state.upper())
         return crawlers_in_state
 
+    def get_crawler_metrics(self, crawler_names: List[str]) -> Dict[str, dict]:
+        """
+        CrawlerMetrics by crawler name, 100 names per GetCrawlerMetrics call
+        """
+        metrics: Dict[str, dict] = {}
+        for i in range(0, len(crawler_names), Glue.get_crawler_metrics_size):
+            batch = crawler_names[i : i + Glue.get_crawler_metrics_size]
+            for crawler_metrics in Pagination.paginate(
+                self.client,
+                "get_crawler_metrics",
+                "CrawlerMetricsList",
+                CrawlerNameList=batch,
+            ):
+                metrics[crawler_metrics["CrawlerName"]] = crawler_metrics
+        return metrics
+
+    def get_table(self, database_name: str, table_name: str) -> dict:
+        resp = self.client.get_table(DatabaseName=database_name, Name=table_name)
+        return resp["Table"]
+
+    def iter_partitions(
+        self,
+        database_name: str,
+        table_name: str,
+        expression: Optional[str] = None,
+        segments: int = 4,
+        page_size: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """
+        Stream the partitions of a table as pages land, in no particular order
+
+        The table is read as segments independent GetPartitions token chains at
+        once, expression (e.g. "dt >= '2024-01-01'") is evaluated by Glue and
+        column schemas are left out since they repeat the table's. Only a few
+        pages per segment are held at a time.
+        """
+        segments = max(1, min(segments, Glue.get_partitions_max_segments))
+        arguments = {
+            "DatabaseName": database_name,
+            "TableName": table_name,
+            "ExcludeColumnSchema": True,
+        }
+        if expression:
+            arguments["Expression"] = expression
+
+        def read(segment: int) -> Iterator[list]:
+            for page in Pagination.pages(
+                self.client,
+                "get_partitions",
+                page_size=page_size,
+                Segment={"SegmentNumber": segment, "TotalSegments": segments},
+                **arguments,
+            ):
+                yield page["Partitions"]
+
+        # one waiting page per segment - pages of 1000 partitions are big
+        for page in Pagination.merge([read(segment) for segment in range(segments)]):
+            yield from page
+
     def start_crawlers(self, crawlers: List[str]):
         logger.info("Starting %d crawlers..." % len(crawlers))
 
@@ -156,3 +391,35 @@ class Glue(AwsService):
     def start_crawler(self, crawler_name: str):
         resp = self.client.start_crawler(Name=crawler_name)
         logger.debug("Completed starting crawler: %s" % resp)
+
+    def batch_get_jobs(self, job_names: List[str]) -> Dict[str, dict]:
+        """
+        Job definitions by name, 25 names per BatchGetJobs call - names that
+        don't exist are logged and left out
+        """
+        jobs: Dict[str, dict] = {}
+        for i in range(0, len(job_names), Glue.batch_get_jobs_size):
+            resp = self.client.batch_get_jobs(
+                JobNames=job_names[i : i + Glue.batch_get_jobs_size]
+            )
+            jobs.update((job["Name"], job) for job in resp["Jobs"])
+            if resp.get("JobsNotFound"):
+                logger.warning("Jobs not found: %s" % resp["JobsNotFound"])
+        return jobs
+
+    def start_job_run(self, job_name: str, arguments: Dict[str, str] = {}) -> str:
+        """
+        Start a run of job_name and return its JobRunId
+        """
+        resp = self.client.start_job_run(JobName=job_name, Arguments=arguments)
+        logger.debug("Completed starting job run: %s" % resp)
+        return resp["JobRunId"]
+
+    def get_recent_job_runs(self, job_name: str) -> List[dict]:
+        """
+        The latest 200 runs of job_name, newest first, in one GetJobRuns call
+        """
+        return self.client.get_job_runs(JobName=job_name, MaxResults=200)["JobRuns"]
+
+    def get_job_run(self, job_name: str, run_id: str) -> dict:
+        return self.client.get_job_run(JobName=job_name, RunId=run_id)["JobRun"]
@@ -0,0 +1,298 @@
+"""
+AWS Glue Job Runner
+
+Starts many runs of Glue jobs, each with its own arguments, as early as the
+quotas allow. A job never gets more runs going than its MaxConcurrentRuns,
+StartJobRun calls overlap through a bounded pool and a job's next run is
+started as soon as a poll sees one of its runs end. Runs are followed with
+one GetJobRuns call per job rather than one call per run. Waiting for a slot
+doesn't count against a run's attempts while runs of ours hold it.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+from botocore.exceptions import ClientError
+
+from aws.glue import Glue
+from support.backoff import QuotaBackoff
+
+logger = logging.getLogger(__name__)
+
+
+class JobRun:
+    """
+    One run of a Glue job, from StartJobRun to its final JobRunState
+    """
+
+    # JobRunStates a run doesn't leave
+    final_states = {"SUCCEEDED", "FAILED", "STOPPED", "TIMEOUT", "ERROR", "EXPIRED"}
+    # DPUs of one worker of each WorkerType
+    worker_dpus = {
+        "Standard": 1.0,
+        "G.025X": 0.25,
+        "G.1X": 1.0,
+        "G.2X": 2.0,
+        "G.4X": 4.0,
+        "G.8X": 8.0,
+        "Z.2X": 2.0,
+    }
+
+    def __init__(self, job_name: str, arguments: Dict[str, str] = {}):
+        self.job_name = job_name
+        self.arguments = arguments
+        self.run_id: Optional[str] = None
+        # JobRunState - NOT_STARTED when StartJobRun never went through
+        self.state: Optional[str] = None
+        # StartJobRun refusals, and the ones that counted as attempts
+        self.refusals: int = 0
+        self.attempts: int = 0
+        self.not_before: float = 0.0
+        self.started: Optional[datetime] = None
+        self.completed: Optional[datetime] = None
+        self.execution_time: Optional[int] = None
+        self.dpu_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in JobRun.final_states or self.state == "NOT_STARTED"
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started is None or self.completed is None:
+            return None
+        return (self.completed - self.started).total_seconds()
+
+    def update(self, job_run: dict):
+        """
+        Take state, timings and usage from a GetJobRun(s) JobRun
+        """
+        self.state = job_run["JobRunState"]
+        self.started = job_run.get("StartedOn")
+        self.completed = job_run.get("CompletedOn")
+        self.execution_time = job_run.get("ExecutionTime")
+        self.error = job_run.get("ErrorMessage")
+        if self.state in JobRun.final_states:
+            self.dpu_seconds = JobRun.dpu_seconds_of(job_run)
+
+    @staticmethod
+    def dpu_seconds_of(job_run: dict) -> Optional[float]:
+        # only auto scaling and flex runs report DPUSeconds themselves
+        if job_run.get("DPUSeconds") is not None:
+            return job_run["DPUSeconds"]
+        if job_run.get("ExecutionTime") is None:
+            return None
+        if job_run.get("WorkerType") and job_run.get("NumberOfWorkers"):
+            dpus = job_run["NumberOfWorkers"] * JobRun.worker_dpus.get(
+                job_run["WorkerType"], 1.0
+            )
+        else:
+            dpus = job_run.get("MaxCapacity") or 0.0
+        return job_run["ExecutionTime"] * dpus
+
+
+class JobRunner:
+    """
+    Runs JobRuns within each job's MaxConcurrentRuns and, optionally, an
+    overall max_running
+    """
+
+    # StartJobRun errors that clear up once other runs end - attempts only
+    # count while none of ours hold the slots
+    retryable_error_codes = {
+        "ConcurrentRunsExceededException",
+        "ResourceNumberLimitExceededException",
+    }
+    max_attempts: int = 8
+    backoff_base: float = 10.0
+    backoff_max: float = 300.0
+
+    def __init__(
+        self,
+        glue: Glue,
+        max_workers: int = 4,
+        max_running: Optional[int] = None,
+        poll_interval: float = 15.0,
+    ):
+        self.glue = glue
+        self.max_workers = max_workers
+        self.max_running = max_running
+        self.poll_interval = poll_interval
+        self.backoff = QuotaBackoff(
+            JobRunner.backoff_base, JobRunner.backoff_max, JobRunner.max_attempts
+        )
+        # job name -> monotonic time until which its runs are all taken
+        self._paused_until: Dict[str, float] = {}
+
+    def run(self, runs: List[JobRun]) -> List[JobRun]:
+        """
+        Start every run, in order as far as the limits allow, and follow them
+        until all of them ended
+        """
+        jobs = self.glue.batch_get_jobs(sorted({run.job_name for run in runs}))
+        limits = {
+            name: job.get("ExecutionProperty", {}).get("MaxConcurrentRuns", 1)
+            for name, job in jobs.items()
+        }
+        queue: List[JobRun] = []
+        for run in runs:
+            if run.job_name in jobs:
+                queue.append(run)
+            else:
+                run.state = "NOT_STARTED"
+                run.error = "Job not found"
+        logger.info(
+            "Running %d runs of %d jobs, %d workers"
+            % (len(queue), len(jobs), self.max_workers)
+        )
+
+        started = time.monotonic()
+        running: Dict[str, List[JobRun]] = defaultdict(list)
+        last_poll = started
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queue or any(running.values()):
+                self._launch(executor, queue, running, limits)
+                next_poll = last_poll + self.poll_interval
+                time.sleep(self._wait(queue, running, limits, next_poll))
+                if any(running.values()) and time.monotonic() >= next_poll:
+                    last_poll = time.monotonic()
+                    for job_name in self._poll(executor, running):
+                        # a slot of the job freed up - its refused runs go again
+                        self._paused_until.pop(job_name, None)
+                        for run in queue:
+                            if run.job_name == job_name:
+                                run.not_before = 0.0
+
+        states: Dict[str, int] = defaultdict(int)
+        for run in runs:
+            states[run.state] += 1
+        logger.info(
+            "Ran %d job runs in %.1f minutes: %s"
+            % (len(runs), (time.monotonic() - started) / 60, dict(states))
+        )
+        return runs
+
+    def _launch(
+        self,
+        executor: ThreadPoolExecutor,
+        queue: List[JobRun],
+        running: Dict[str, List[JobRun]],
+        limits: Dict[str, int],
+    ):
+        """
+        Start every queued run that has a free slot, StartJobRun calls
+        overlapping in the pool
+        """
+        now = time.monotonic()
+        taken = {name: len(job_runs) for name, job_runs in running.items()}
+        total = sum(taken.values())
+        batch: List[JobRun] = []
+        for run in queue:
+            if self.max_running and total >= self.max_running:
+                break
+            if (
+                run.not_before > now
+                or self._paused_until.get(run.job_name, 0.0) > now
+                or taken.get(run.job_name, 0) >= limits[run.job_name]
+            ):
+                continue
+            batch.append(run)
+            taken[run.job_name] = taken.get(run.job_name, 0) + 1
+            total += 1
+
+        futures = {
+            executor.submit(self.glue.start_job_run, run.job_name, run.arguments): run
+            for run in batch
+        }
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                run.run_id = future.result()
+            except ClientError as error:
+                code = error.response["Error"]["Code"]
+                if code == "ConcurrentRunsExceededException":
+                    # only the job's own runs ending frees one of its slots
+                    own_running = bool(running[run.job_name])
+                else:
+                    own_running = any(running.values())
+                retry_in = (
+                    self.backoff.retry_in(run, own_running)
+                    if code in JobRunner.retryable_error_codes
+                    else None
+                )
+                if retry_in is not None:
+                    run.not_before = now + retry_in
+                    # the job's slots are taken - its other queued runs wait too
+                    self._paused_until[run.job_name] = run.not_before
+                    logger.info(
+                        "Run of '%s' not started (%s) - retrying in %.0f s"
+                        % (run.job_name, code, run.not_before - now)
+                    )
+                    continue
+                logger.error("Failed starting '%s': %s" % (run.job_name, error))
+                queue.remove(run)
+                run.state = "NOT_STARTED"
+                run.error = str(error)
+                continue
+            queue.remove(run)
+            run.state = "STARTING"
+            running[run.job_name].append(run)
+            logger.info(
+                "Started '%s' run %s (%d queued)"
+                % (run.job_name, run.run_id, len(queue))
+            )
+
+    def _poll(
+        self, executor: ThreadPoolExecutor, running: Dict[str, List[JobRun]]
+    ) -> Set[str]:
+        """
+        One GetJobRuns call per job with runs going, overlapping in the pool -
+        returns the jobs that had a run end
+        """
+        ended: Set[str] = set()
+        job_names = [name for name, job_runs in running.items() if job_runs]
+        recent = executor.map(self.glue.get_recent_job_runs, job_names)
+        for job_name, job_runs in zip(job_names, recent):
+            by_id = {job_run["Id"]: job_run for job_run in job_runs}
+            for run in list(running[job_name]):
+                job_run = by_id.get(run.run_id)
+                if job_run is None:
+                    # pushed out of the latest 200 by runs started elsewhere
+                    job_run = self.glue.get_job_run(job_name, run.run_id)
+                previous = run.state
+                run.update(job_run)
+                if run.state != previous:
+                    logger.info("'%s' run %s: %s" % (job_name, run.run_id, run.state))
+                if run.done:
+                    running[job_name].remove(run)
+                    ended.add(job_name)
+        return ended
+
+    def _wait(
+        self,
+        queue: List[JobRun],
+        running: Dict[str, List[JobRun]],
+        limits: Dict[str, int],
+        next_poll: float,
+    ) -> float:
+        """
+        Seconds until the next poll or the next backed off run is due
+        """
+        now = time.monotonic()
+        waits = [next_poll - now] if any(running.values()) else []
+        due = [
+            max(run.not_before, self._paused_until.get(run.job_name, 0.0))
+            for run in queue
+            if len(running[run.job_name]) < limits[run.job_name]
+        ]
+        if due and not (
+            self.max_running
+            and sum(len(job_runs) for job_runs in running.values()) >= self.max_running
+        ):
+            waits.append(min(due) - now)
+        return max(0.0, min(waits)) if waits else 0.0
@@ -0,0 +1,109 @@
+"""
+AWS Glue Partition Snapshot
+
+Fingerprints of a table's partitions from the last time they were listed, so
+a new listing can be narrowed down to the partitions a crawl added or changed
+since. Only a short hash per partition is kept, which keeps tables with
+hundreds of thousands of partitions small on disk and in memory.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionSnapshot:
+    """
+    Partition fingerprints of one table (and expression) stored as gzipped JSON
+    under ~/.cache/aws-tools/glue-partitions
+    """
+
+    directory: Path = (
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "aws-tools"
+        / "glue-partitions"
+    )
+
+    def __init__(
+        self,
+        profile_name: str,
+        database_name: str,
+        table_name: str,
+        expression: Optional[str] = None,
+    ):
+        name = "%s.%s" % (database_name, table_name)
+        if expression:
+            # a listing narrowed by an expression is only comparable to another
+            # listing narrowed by the same expression
+            name += "." + hashlib.sha1(expression.encode("utf-8")).hexdigest()[:12]
+        self.file = (
+            PartitionSnapshot.directory
+            / (profile_name or "default")
+            / ("%s.json.gz" % name)
+        )
+        self.taken: Optional[float] = None
+        self.fingerprints: Dict[str, str] = {}
+        self._seen: Dict[str, str] = {}
+
+    def exists(self) -> bool:
+        return self.file.exists()
+
+    def load(self):
+        with gzip.open(self.file, "rt", encoding="utf-8") as file:
+            stored = json.load(file)
+        self.taken = stored["taken"]
+        self.fingerprints = stored["fingerprints"]
+        logger.info(
+            "Loaded fingerprints of %d partitions taken %s"
+            % (len(self.fingerprints), time.ctime(self.taken))
+        )
+
+    def compare(self, partitions: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+        """
+        ("new" or "changed", partition) for partitions that aren't in the
+        snapshot or differ from it - every partition is remembered for save
+        """
+        for partition in partitions:
+            key = PartitionSnapshot.key(partition)
+            fingerprint = PartitionSnapshot.fingerprint(partition)
+            self._seen[key] = fingerprint
+            previous = self.fingerprints.get(key)
+            if previous is None:
+                yield "new", partition
+            elif previous != fingerprint:
+                yield "changed", partition
+
+    def deleted(self) -> List[List[str]]:
+        """
+        Values of the snapshot's partitions compare didn't see again
+        """
+        return [json.loads(key) for key in self.fingerprints if key not in self._seen]
+
+    def save(self):
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        stored = {"taken": time.time(), "fingerprints": self._seen}
+        temporary = "%s.%d.tmp" % (self.file, os.getpid())
+        with gzip.open(temporary, "wt", encoding="utf-8") as file:
+            json.dump(stored, file, separators=(",", ":"))
+        os.replace(temporary, self.file)
+        logger.info(
+            "Saved fingerprints of %d partitions to '%s'" % (len(self._seen), self.file)
+        )
+
+    @staticmethod
+    def key(partition: dict) -> str:
+        return json.dumps(partition["Values"], separators=(",", ":"))
+
+    @staticmethod
+    def fingerprint(partition: dict) -> str:
+        # LastAccessTime moves on reads - only what a crawl writes counts
+        written = [partition.get("StorageDescriptor"), partition.get("Parameters")]
+        encoded = json.dumps(written, sort_keys=True, default=str)
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).hexdigest()
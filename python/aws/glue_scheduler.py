@@ -0,0 +1,178 @@
+"""
+AWS Glue Crawler Scheduler
+
+Runs a list of crawlers with at most max_concurrent of them crawling at once.
+Crawlers are launched longest first by their median runtime from
+GetCrawlerMetrics, so the long ones don't end up holding the run open on their
+own, and each slot is refilled as soon as the watcher sees its crawler finish.
+Waiting out the account's concurrent run quota doesn't count against a
+crawler's attempts while any of ours are still crawling.
+"""
+
+from datetime import datetime, timezone
+import logging
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from aws.glue import Glue
+from aws.glue_watcher import CrawlerRun, CrawlerWatcher
+from support.backoff import QuotaBackoff
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlerScheduler:
+    """
+    Keeps up to max_concurrent crawlers running until every crawler has run
+    """
+
+    # StartCrawler errors that clear up once other crawls finish - attempts
+    # only count while none of ours are running
+    retryable_error_codes = {
+        "CrawlerRunningException",
+        "ConcurrentRunsExceededException",
+    }
+    max_attempts: int = 8
+    backoff_base: float = 5.0
+    backoff_max: float = 300.0
+
+    def __init__(
+        self,
+        glue: Glue,
+        max_concurrent: int = 10,
+        watcher: Optional[CrawlerWatcher] = None,
+    ):
+        self.glue = glue
+        self.max_concurrent = max_concurrent
+        self.watcher = watcher or CrawlerWatcher(glue)
+        self.backoff = QuotaBackoff(
+            CrawlerScheduler.backoff_base,
+            CrawlerScheduler.backoff_max,
+            CrawlerScheduler.max_attempts,
+        )
+        # monotonic time until which the account's concurrent run quota is full
+        self._paused_until: float = 0.0
+        self._last_poll: float = 0.0
+
+    def expected_runtimes(self, crawler_names: List[str]) -> Dict[str, float]:
+        """
+        Median runtime of each crawler - crawlers that never ran get the median
+        of the others
+        """
+        metrics = self.glue.get_crawler_metrics(crawler_names)
+        runtimes = {
+            name: crawler_metrics.get("MedianRuntimeSeconds")
+            or crawler_metrics.get("LastRuntimeSeconds")
+            for name, crawler_metrics in metrics.items()
+        }
+        known = [runtime for runtime in runtimes.values() if runtime]
+        default = statistics.median(known) if known else 0.0
+        return {name: runtimes.get(name) or default for name in crawler_names}
+
+    def run(self, crawler_names: List[str]) -> List[CrawlerRun]:
+        """
+        Run every crawler once and return how each went, longest first
+        """
+        runtimes = self.expected_runtimes(crawler_names)
+        runs = [
+            CrawlerRun(name, runtimes[name]) for name in dict.fromkeys(crawler_names)
+        ]
+        runs.sort(key=lambda run: run.expected_seconds, reverse=True)
+        logger.info(
+            "Scheduling %d crawlers, %d at a time - %.0f crawler minutes expected"
+            % (len(runs), self.max_concurrent, sum(runtimes.values()) / 60)
+        )
+
+        started = time.monotonic()
+        queue = list(runs)
+        running = self.watcher.running
+        self._last_poll = time.monotonic()
+        while queue or running:
+            self._launch(queue, running)
+            time.sleep(self._wait(queue, running))
+            if running and time.monotonic() >= self._next_poll:
+                self._last_poll = time.monotonic()
+                finished = self.watcher.poll()
+                if finished:
+                    # a slot freed up - the quota may take the next crawler now
+                    self._paused_until = 0.0
+                for run in finished:
+                    logger.info(
+                        "Crawler '%s' %s after %.0f s (expected %.0f s)"
+                        % (run.name, run.status, run.seconds, run.expected_seconds)
+                    )
+
+        minutes = (time.monotonic() - started) / 60
+        statuses: Dict[str, int] = {}
+        for run in runs:
+            statuses[run.status] = statuses.get(run.status, 0) + 1
+        logger.info(
+            "Ran %d crawlers in %.1f minutes: %s" % (len(runs), minutes, statuses)
+        )
+        return runs
+
+    def _launch(self, queue: List[CrawlerRun], running: Dict[str, CrawlerRun]):
+        """
+        Start queued crawlers, longest first, until every slot is taken
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return
+        for run in list(queue):
+            if len(running) >= self.max_concurrent:
+                return
+            if run.not_before > now:
+                continue
+            started = datetime.now(timezone.utc)
+            try:
+                self.glue.start_crawler(run.name)
+            except ClientError as error:
+                code = error.response["Error"]["Code"]
+                retry_in = (
+                    self.backoff.retry_in(run, bool(running))
+                    if code in CrawlerScheduler.retryable_error_codes
+                    else None
+                )
+                if retry_in is not None:
+                    logger.info(
+                        "Crawler '%s' not started (%s) - retrying in %.0f s"
+                        % (run.name, code, retry_in)
+                    )
+                    if code == "ConcurrentRunsExceededException":
+                        # the account is full - nothing else will start either
+                        # until the backoff is over or one of ours finishes
+                        self._paused_until = now + retry_in
+                        return
+                    run.not_before = now + retry_in
+                    continue
+                logger.error("Failed starting crawler '%s': %s" % (run.name, error))
+                queue.remove(run)
+                run.status = "NOT_STARTED"
+                run.error = str(error)
+                continue
+            queue.remove(run)
+            run.started = started
+            self.watcher.track(run)
+            logger.info(
+                "Started crawler '%s' (%d running, %d queued)"
+                % (run.name, len(running), len(queue))
+            )
+
+    @property
+    def _next_poll(self) -> float:
+        # a crawler tracked since the last poll brings the next one forward
+        return self._last_poll + self.watcher.interval
+
+    def _wait(self, queue: List[CrawlerRun], running: Dict[str, CrawlerRun]) -> float:
+        """
+        Seconds until the next poll or the next backed off crawler is due
+        """
+        waits = [self._next_poll - time.monotonic()] if running else []
+        if queue and len(running) < self.max_concurrent:
+            due = max(self._paused_until, min(run.not_before for run in queue))
+            waits.append(due - time.monotonic())
+        # nothing left after the last launch refused its crawlers for good
+        return max(0.0, min(waits)) if waits else 0.0
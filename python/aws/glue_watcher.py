@@ -0,0 +1,153 @@
+"""
+AWS Glue Crawler Watcher
+
+Follows started crawlers until their crawl is over. States come from
+BatchGetCrawlers 25 crawlers per call, polled every few seconds right after a
+start or a state change and progressively less often while nothing moves, so
+watching hundreds of long crawls costs a handful of calls a minute.
+"""
+
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from aws.glue import Glue
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlerRun:
+    """
+    One crawler's crawl, from its StartCrawler to its LastCrawl
+    """
+
+    def __init__(self, name: str, expected_seconds: float = 0.0):
+        self.name = name
+        self.expected_seconds = expected_seconds
+        # StartCrawler refusals, and the ones that counted as attempts
+        self.refusals: int = 0
+        self.attempts: int = 0
+        self.not_before: float = 0.0
+        self.started: Optional[datetime] = None
+        self.finished: Optional[datetime] = None
+        self.state: Optional[str] = None
+        # SUCCEEDED, FAILED or CANCELLED from LastCrawl - NOT_STARTED when
+        # StartCrawler never went through, DELETED when the crawler was
+        # deleted while it was watched
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self.tables_created: Optional[int] = None
+        self.tables_updated: Optional[int] = None
+        self.tables_deleted: Optional[int] = None
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return (self.finished - self.started).total_seconds()
+
+
+class CrawlerWatcher:
+    """
+    Polls the crawlers of tracked runs and finishes each run when its crawler
+    is READY again after the crawl, or is gone
+    """
+
+    fast_interval: float = 5.0
+    slow_interval: float = 60.0
+    # each poll without a state change waits this much longer, up to slow_interval
+    backoff_factor: float = 1.5
+    # allowed difference between our clock and LastCrawl StartTime
+    clock_skew = timedelta(seconds=30)
+
+    def __init__(
+        self,
+        glue: Glue,
+        fast_interval: Optional[float] = None,
+        slow_interval: Optional[float] = None,
+        on_change: Optional[Callable[[CrawlerRun, Optional[str]], None]] = None,
+    ):
+        self.glue = glue
+        self.fast_interval = fast_interval or CrawlerWatcher.fast_interval
+        self.slow_interval = slow_interval or CrawlerWatcher.slow_interval
+        self.on_change = on_change
+        self.interval: float = self.fast_interval
+        self.running: Dict[str, CrawlerRun] = {}
+
+    def track(self, run: CrawlerRun):
+        """
+        Watch a run whose StartCrawler went through - polls speed up again
+        """
+        self.running[run.name] = run
+        self.interval = self.fast_interval
+
+    def poll(self) -> List[CrawlerRun]:
+        """
+        One sweep over the running crawlers - returns the runs that finished
+        """
+        changed = False
+        finished: List[CrawlerRun] = []
+        not_found = len(self.glue.crawlers_not_found)
+        for crawler in self.glue.iter_crawlers(list(self.running)):
+            run = self.running[crawler.name]
+            if crawler.state != run.state:
+                changed = True
+                previous, run.state = run.state, crawler.state
+                if self.on_change:
+                    self.on_change(run, previous)
+            last_crawl = getattr(crawler, "last_crawl", None)
+            if crawler.state != "READY" or not last_crawl:
+                continue
+            # READY from before our StartCrawler landed isn't the end of our crawl
+            crawl_started = last_crawl.get("StartTime")
+            if crawl_started and crawl_started < run.started - self.clock_skew:
+                continue
+            del self.running[run.name]
+            run.finished = datetime.now(timezone.utc)
+            run.status = last_crawl.get("Status")
+            run.error = last_crawl.get("ErrorMessage")
+            finished.append(run)
+        # BatchGetCrawlers reports deleted crawlers as not found rather than
+        # raising EntityNotFoundException - they will never be READY again
+        for name in self.glue.crawlers_not_found[not_found:]:
+            run = self.running.pop(name, None)
+            if run is None:
+                continue
+            changed = True
+            logger.warning("Crawler '%s' was deleted while it ran" % name)
+            run.finished = datetime.now(timezone.utc)
+            run.status = "DELETED"
+            run.error = "crawler was deleted"
+            finished.append(run)
+
+        if changed:
+            self.interval = self.fast_interval
+        else:
+            self.interval = min(
+                self.slow_interval, self.interval * CrawlerWatcher.backoff_factor
+            )
+        return finished
+
+    def watch(self, runs: List[CrawlerRun]) -> List[CrawlerRun]:
+        """
+        Track runs and poll until every one of them finished
+        """
+        for run in runs:
+            self.track(run)
+        while self.running:
+            time.sleep(self.interval)
+            self.poll()
+        return runs
+
+    def add_table_counts(self, runs: List[CrawlerRun]):
+        """
+        Tables created, updated and deleted by the last crawl of each finished run
+        """
+        names = [run.name for run in runs if run.finished and run.status != "DELETED"]
+        metrics = self.glue.get_crawler_metrics(names) if names else {}
+        for run in runs:
+            if run.name in metrics and run.finished:
+                run.tables_created = metrics[run.name].get("TablesCreated")
+                run.tables_updated = metrics[run.name].get("TablesUpdated")
+                run.tables_deleted = metrics[run.name].get("TablesDeleted")
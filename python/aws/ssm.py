@@ -2,22 +2,49 @@
 AWS SSM Service
 """
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import logging
+import queue
+import threading
 
 import boto3
 from tabulate import tabulate
 from botocore.exceptions import ClientError
 
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Set
 
 from aws.aws_service import AwsService
 from support.aws import Aws
+from support.compact import Compact
+from support.pagination import Pagination
+from support.throttling import Throttling
 
 logger = logging.getLogger(__name__)
 
 
-class Parameter:
+class Parameter(Compact):
+    __slots__ = (
+        "_arn_prefix",
+        "_arn",
+        "name",
+        "type",
+        "version",
+        "last_modified_date",
+        "data_type",
+        "value",
+    )
+    headers = [
+        "arn",
+        "name",
+        "type",
+        "version",
+        "last_modified_date",
+        "data_type",
+        "value",
+    ]
+
     def __init__(
         self,
         ARN: str,
@@ -28,14 +55,26 @@ class Parameter:
         LastModifiedDate: datetime,
         DataType: str = "",
     ):
-        self.arn: str = ARN
         self.name: str = Name
-        self.type: str = Type
+        self.arn: str = ARN
+        self.type: str = Compact.intern(Type)
         self.version: int = Version
         self.last_modified_date: datetime = LastModifiedDate
-        self.data_type: str = DataType
+        self.data_type: str = Compact.intern(DataType)
         self.value: str = Value
 
+    @property
+    def arn(self) -> str:
+        if self._arn_prefix is None:
+            return self._arn
+        return self._arn_prefix + self.name
+
+    @arn.setter
+    def arn(self, arn: str):
+        # ARNs end with the name - only keep the shared prefix
+        self._arn_prefix = Compact.arn_prefix(arn, self.name)
+        self._arn = None if self._arn_prefix is not None else arn
+
     def display(self, show_full_info: bool):
 
         if show_full_info:
@@ -80,63 +119,153 @@ class NewParameter:
         self.Type = Type
 
 
+class PutParameterResult:
+    def __init__(self, name: str, status: str, error: Exception = None):
+        self.name: str = name
+        # created, updated, skipped (already exists) or failed
+        self.status: str = status
+        self.error: Exception = error
+
+
+class ParameterDiff:
+    """
+    Compare parameter metadata of a source and a target by name
+
+    A parameter is changed when its type differs or the source copy was
+    modified after the target one - values are never needed to build the diff.
+    A copy always leaves the target newer than the source, so a target edited
+    after it looks identical.
+    """
+
+    def __init__(self, source: Dict[str, dict], target: Dict[str, dict]):
+        self.new: List[str] = []
+        self.changed: List[str] = []
+        self.identical: List[str] = []
+        self.deleted: List[str] = sorted(set(target) - set(source))
+        for name in sorted(source):
+            if name not in target:
+                self.new.append(name)
+            elif (
+                source[name]["Type"] != target[name]["Type"]
+                or source[name]["LastModifiedDate"] > target[name]["LastModifiedDate"]
+            ):
+                self.changed.append(name)
+            else:
+                self.identical.append(name)
+
+    def mark_identical(self, names: Set[str]):
+        """
+        Move changed parameters whose values turned out to match to identical
+        """
+        self.changed = [name for name in self.changed if name not in names]
+        self.identical = sorted(self.identical + list(names))
+
+    def display(self):
+        table = [
+            ["new", len(self.new)],
+            ["changed", len(self.changed)],
+            ["identical", len(self.identical)],
+            ["deleted", len(self.deleted)],
+        ]
+        print(tabulate(table, ["parameters", "count"], tablefmt="simple"))
+
+
 class SSM(AwsService):
     """
     SSM Client
     """
 
-    def __init__(self, profile_name: str):
+    # most names GetParameters accepts in one call
+    get_parameters_batch_size = 10
+
+    def __init__(self, profile_name: str, region_name: Optional[str] = None):
         self.profile_name = profile_name
+        self.region_name = region_name
         self.client_name = "ssm"
         self.client = self._create_client()
         self.parameters = []
 
     def _create_client(self) -> boto3.client:
-        return Aws.create_client(self.profile_name, self.client_name)
+        return Aws.create_client(self.profile_name, self.client_name, self.region_name)
 
     def describe_parameters(self, values: List[str] = []):
         logger.debug("Describing parameters with values %s..." % values)
+        self.call_ssm_describe_parameters(self._describe_parameters_arguments(values))
+        logger.debug("Completed describing parameters!")
 
-        next_token = " "
+    def iter_describe_parameters(
+        self, values: List[str] = [], limit: Optional[int] = None, **pagination
+    ) -> Iterator[dict]:
+        """
+        Stream parameter metadata as each page arrives
+        """
+        return self._paginate_describe_parameters(
+            self._describe_parameters_arguments(values), limit=limit, **pagination
+        )
 
+    def _describe_parameters_arguments(self, values: List[str]) -> dict:
         if values:
-
             logger.info("Getting parameters that contain '%s'..." % values)
-            call_arguments = {
+            return {
                 "ParameterFilters": [
                     {"Key": "Name", "Option": "Contains", "Values": values}
                 ],
-                "NextToken": next_token,
-            }
-
-        else:
-
-            logger.info("Getting all parameters...")
-            call_arguments = {
-                "NextToken": next_token,
             }
 
-        self.call_ssm_describe_parameters(call_arguments)
-
-        logger.debug("Completed describing parameters!")
+        logger.info("Getting all parameters...")
+        return {}
 
     def call_ssm_describe_parameters(self, arguments=dict):
         logger.debug("Calling describe parameters")
+        self.parameters.extend(self._paginate_describe_parameters(arguments))
+        logger.info("Found %d parameters" % len(self.parameters))
 
-        got_all_parameters = False
+    def _paginate_describe_parameters(self, arguments: dict, **pagination):
+        return Pagination.paginate(
+            self.client, "describe_parameters", "Parameters", **pagination, **arguments
+        )
 
-        while not got_all_parameters:
-            resp = self.client.describe_parameters(**arguments)
-            # logger.debug(pp.pformat(resp))
-            self.parameters.extend(resp["Parameters"])
-            next_token = resp.get("NextToken", None)
-            logger.debug("Next Token: %s" % next_token)
+    def describe_parameters_under_path(
+        self, path: str, recursive: bool
+    ) -> Dict[str, dict]:
+        """
+        Metadata (no values) of every parameter under path keyed by name
+        """
+        arguments = {
+            "ParameterFilters": [
+                {
+                    "Key": "Path",
+                    "Option": "Recursive" if recursive else "OneLevel",
+                    "Values": [path],
+                }
+            ]
+        }
+        return {
+            parameter["Name"]: parameter
+            for parameter in self._paginate_describe_parameters(arguments, page_size=50)
+        }
 
-            if not next_token:
-                got_all_parameters = True
+    def get_parameters(
+        self, names: List[str], decrypt: bool, max_workers: int = 8
+    ) -> List[Parameter]:
+        """
+        Get parameters by name through GetParameters, 10 names per call with
+        max_workers calls in flight - names that don't exist are left out
+        """
 
-            arguments["NextToken"] = next_token
-        logger.info("Found %d parameters" % len(self.parameters))
+        def get_batch(batch: List[str]) -> List[dict]:
+            response = self.client.get_parameters(Names=batch, WithDecryption=decrypt)
+            for name in response["InvalidParameters"]:
+                logger.warning("Parameter '%s' not found" % name)
+            return response["Parameters"]
+
+        batches = self._batches(names, SSM.get_parameters_batch_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [
+                Parameter(**parameter)
+                for parameters in executor.map(get_batch, batches)
+                for parameter in parameters
+            ]
 
     def get_describe_parameters(self, values: List[str] = []) -> List[str]:
         self.describe_parameters(values)
@@ -152,17 +281,159 @@ class SSM(AwsService):
         return Parameter(**token_param["Parameter"])
 
     def get_parameters_by_path(
-        self, path: str, recursive: bool, decrypt: bool, values: List[str] = []
+        self,
+        path: str,
+        recursive: bool,
+        decrypt: bool,
+        values: List[str] = [],
+        sharded: bool = False,
     ):
         logger.debug("Getting parameters by path for %s..." % path)
+        if sharded and recursive:
+            self.parameters.extend(
+                self.iter_parameters_by_path_sharded(path, decrypt, values)
+            )
+            logger.info("Found %d parameters" % len(self.parameters))
+            return
+        self.call_ssm_get_parameters_by_path(
+            self._get_parameters_by_path_arguments(path, recursive, decrypt, values)
+        )
 
-        next_token = " "
+    def iter_parameters_by_path(
+        self,
+        path: str,
+        recursive: bool,
+        decrypt: bool,
+        values: List[str] = [],
+        limit: Optional[int] = None,
+        **pagination,
+    ) -> Iterator[Parameter]:
+        """
+        Stream Parameters under path as each page arrives
+        """
+        arguments = self._get_parameters_by_path_arguments(
+            path, recursive, decrypt, values
+        )
+        return self._paginate_parameters_by_path(arguments, limit=limit, **pagination)
 
+    def iter_parameters_by_path_sharded(
+        self,
+        path: str,
+        decrypt: bool,
+        values: List[str] = [],
+        shards: Optional[int] = None,
+    ) -> Iterator[Parameter]:
+        """
+        Recursive get_parameters_by_path crawling every child path of path as
+        its own concurrent token chain
+
+        Child paths are found through DescribeParameters, which pages 50
+        parameters at a time rather than 10, and each one is crawled as soon as
+        it shows up. Parameters are yielded as pages arrive, in no particular
+        order. shards defaults to what the GetParametersByPath throttling
+        bucket allows right now.
+        """
+        shards = shards or self._shard_count()
+        logger.info("Crawling '%s' with %d shards" % (path, shards))
+        prefix = path.rstrip("/") + "/"
+        pages: queue.Queue = queue.Queue(maxsize=shards * 2)
+        stop = threading.Event()
+        lock = threading.Lock()
+        outstanding = [0]
+        executor = ThreadPoolExecutor(max_workers=shards + 1)
+
+        def submit(function, *args):
+            if stop.is_set():
+                return
+            with lock:
+                outstanding[0] += 1
+            try:
+                executor.submit(run, function, *args)
+            except RuntimeError:
+                # the caller stopped reading and the executor is shut down
+                release()
+
+        def release():
+            with lock:
+                outstanding[0] -= 1
+                finished = outstanding[0] == 0
+            if finished:
+                Pagination._put(pages, Pagination._done, stop)
+
+        def run(function, *args):
+            try:
+                function(*args)
+            except Exception as err:
+                Pagination._put(pages, err, stop)
+            finally:
+                release()
+
+        def crawl(shard_path: str, recursive: bool):
+            arguments = self._get_parameters_by_path_arguments(
+                shard_path, recursive, decrypt, values
+            )
+            for page in Pagination.pages(
+                self.client, "get_parameters_by_path", **arguments
+            ):
+                if stop.is_set() or not Pagination._put(
+                    pages, page["Parameters"], stop
+                ):
+                    return
+
+        def discover():
+            submit(crawl, path, False)
+            arguments = self._describe_parameters_arguments(values)
+            arguments.setdefault("ParameterFilters", []).append(
+                {"Key": "Path", "Option": "Recursive", "Values": [path]}
+            )
+            children = set()
+            for parameter in self._paginate_describe_parameters(
+                arguments, page_size=50
+            ):
+                if stop.is_set():
+                    return
+                child = parameter["Name"][len(prefix) :].split("/")[0]
+                # parameters directly under path are covered by the OneLevel crawl
+                if "/" in parameter["Name"][len(prefix) :] and child not in children:
+                    children.add(child)
+                    submit(crawl, prefix + child, True)
+
+        # every crawl is submitted from discover while it still counts as
+        # outstanding, so the count can't reach 0 before the last one is queued
+        submit(discover)
+        seen = set()
+        try:
+            while True:
+                page = pages.get()
+                if page is Pagination._done:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                for parameter in page:
+                    if parameter["Name"] not in seen:
+                        seen.add(parameter["Name"])
+                        yield Parameter(**parameter)
+        finally:
+            stop.set()
+            executor.shutdown(wait=False)
+
+    def _shard_count(self) -> int:
+        bucket = Throttling.get_bucket(
+            self.profile_name,
+            self.client.meta.region_name,
+            "ssm",
+            "GetParametersByPath",
+        )
+        # more shards than the bucket refills per second would only queue up
+        return max(1, min(int(bucket.rate), Aws.max_pool_connections))
+
+    def _get_parameters_by_path_arguments(
+        self, path: str, recursive: bool, decrypt: bool, values: List[str]
+    ) -> dict:
         call_arguments = {
             "Path": path,
             "Recursive": recursive,
             "WithDecryption": decrypt,
-            "NextToken": next_token,
         }
 
         if values:
@@ -173,28 +444,40 @@ class SSM(AwsService):
                 ],
             }
             call_arguments.update(additional_arguments)
-
-        self.call_ssm_get_parameters_by_path(call_arguments)
+        return call_arguments
 
     def call_ssm_get_parameters_by_path(self, arguments: dict):
         logger.debug("Calling get_parameters_by_path")
-
-        got_all_parameters = False
-
-        while not got_all_parameters:
-            resp = self.client.get_parameters_by_path(**arguments)
-
-            converted: list = self._convert_parameter_dict_to_class(resp["Parameters"])
-            self.parameters.extend(converted)
-            next_token = resp.get("NextToken", None)
-            logger.debug("Next Token: %s" % next_token)
-
-            if not next_token:
-                got_all_parameters = True
-
-            arguments["NextToken"] = next_token
+        self.parameters.extend(self._paginate_parameters_by_path(arguments))
         logger.info("Found %d parameters" % len(self.parameters))
 
+    def _paginate_parameters_by_path(
+        self, arguments: dict, **pagination
+    ) -> Iterator[Parameter]:
+        for parameter in Pagination.paginate(
+            self.client,
+            "get_parameters_by_path",
+            "Parameters",
+            **pagination,
+            **arguments,
+        ):
+            yield Parameter(**parameter)
+
+    def iter_parameter_history(
+        self, name: str, decrypt: bool = False, **pagination
+    ) -> Iterator[dict]:
+        """
+        Stream every recorded version of a parameter, oldest first
+        """
+        return Pagination.paginate(
+            self.client,
+            "get_parameter_history",
+            "Parameters",
+            Name=name,
+            WithDecryption=decrypt,
+            **pagination,
+        )
+
     def _convert_parameter_dict_to_class(
         self, parameters: List[dict]
     ) -> List[Parameter]:
@@ -209,33 +492,117 @@ class SSM(AwsService):
     def display_parameters(self):
         print("Displaying parameters without values")
         if self.parameters:
-            headers = list(vars(self.parameters[0]))
+            headers = Parameter.headers
             table = [parameter.values() for parameter in self.parameters]
             print(tabulate(table, headers, tablefmt="simple"))
 
-    def put_parameters(self, new_parameters: List[NewParameter]):
-        """
-        Add multiple new parameters to AWS SSM
+    def put_parameters(
+        self,
+        new_parameters: List[NewParameter],
+        max_workers: int = 8,
+        overwrite: bool = False,
+        on_result: Optional[Callable[[PutParameterResult], None]] = None,
+    ) -> List[PutParameterResult]:
         """
-        # check if parameter already exists - skip if it does
-        for new_parameter in new_parameters:
-
-            try:
-                token = self.get_parameter(new_parameter.Name, decrypt=False)
-                logger.error("Parameter '%s' already exists!" % new_parameter.Name)
+        Add multiple new parameters to AWS SSM, skipping ones that already exist
 
-            # except self.client.ParameterNotFound:
-            except ClientError as error:
-                if error.response["Error"]["Code"] == "ParameterNotFound":
-                    logger.warning(
-                        "Parameter Not Found. Creating new parameter for '%s'..."
-                        % new_parameter.Name
+        Existence is checked through GetParameters 10 names at a time while the
+        missing parameters are written by max_workers threads. overwrite
+        writes every parameter without checking. on_result is called with
+        each result as it comes in, e.g. to report progress.
+        """
+        results: List[PutParameterResult] = []
+
+        def add(result: PutParameterResult):
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            if overwrite:
+                futures = [
+                    executor.submit(self._put_new_parameter, new_parameter, True)
+                    for new_parameter in new_parameters
+                ]
+                new_parameters = []
+            for batch in self._batches(new_parameters, SSM.get_parameters_batch_size):
+                try:
+                    existing = self._existing_parameter_names(
+                        [new_parameter.Name for new_parameter in batch]
                     )
-                    self.put_parameter(new_parameter)
-                else:
-                    raise error
-
-    def put_parameter(self, new_parameter: NewParameter):
+                except ClientError as error:
+                    for new_parameter in batch:
+                        logger.error(
+                            "Could not check '%s': %s" % (new_parameter.Name, error)
+                        )
+                        add(PutParameterResult(new_parameter.Name, "failed", error))
+                    continue
+
+                for new_parameter in batch:
+                    if new_parameter.Name in existing:
+                        logger.error(
+                            "Parameter '%s' already exists!" % new_parameter.Name
+                        )
+                        add(PutParameterResult(new_parameter.Name, "skipped"))
+                    else:
+                        futures.append(
+                            executor.submit(self._put_new_parameter, new_parameter)
+                        )
+
+            for future in as_completed(futures):
+                add(future.result())
+
+        counts = Counter(result.status for result in results)
+        logger.info(
+            "Created %d, updated %d, skipped %d, failed %d parameters"
+            % (
+                counts["created"],
+                counts["updated"],
+                counts["skipped"],
+                counts["failed"],
+            )
+        )
+        return results
+
+    def _existing_parameter_names(self, names: List[str]) -> Set[str]:
+        response = self.client.get_parameters(Names=names, WithDecryption=False)
+        return {parameter["Name"] for parameter in response["Parameters"]}
+
+    def _put_new_parameter(
+        self, new_parameter: NewParameter, overwrite: bool = False
+    ) -> PutParameterResult:
+        if not overwrite:
+            logger.warning(
+                "Parameter Not Found. Creating new parameter for '%s'..."
+                % new_parameter.Name
+            )
+        try:
+            response = self.put_parameter(new_parameter, overwrite)
+        except ClientError as error:
+            # created by someone else since the existence check
+            if error.response["Error"]["Code"] == "ParameterAlreadyExists":
+                logger.error("Parameter '%s' already exists!" % new_parameter.Name)
+                return PutParameterResult(new_parameter.Name, "skipped")
+            logger.error("Failed creating '%s': %s" % (new_parameter.Name, error))
+            return PutParameterResult(new_parameter.Name, "failed", error)
+        except Exception as error:
+            # e.g. connection errors or invalid values - one bad put must not
+            # lose the results of every other one
+            logger.error("Failed creating '%s': %s" % (new_parameter.Name, error))
+            return PutParameterResult(new_parameter.Name, "failed", error)
+        if response["Version"] > 1:
+            return PutParameterResult(new_parameter.Name, "updated")
+        return PutParameterResult(new_parameter.Name, "created")
+
+    @staticmethod
+    def _batches(items: list, size: int) -> Iterator[list]:
+        for i in range(0, len(items), size):
+            yield items[i : i + size]
+
+    def put_parameter(
+        self, new_parameter: NewParameter, overwrite: bool = False
+    ) -> dict:
         """
         Add a parameter to AWS SSM
         """
@@ -244,5 +611,20 @@ class SSM(AwsService):
             Value=new_parameter.Value,
             Type=new_parameter.Type,
             Description=new_parameter.Description,
+            Overwrite=overwrite,
         )
         logger.info(resp)
+        return resp
+
+    def delete_parameters(self, names: List[str]) -> List[str]:
+        """
+        Delete parameters 10 names per call - returns the names deleted
+        """
+        deleted: List[str] = []
+        for batch in self._batches(names, SSM.get_parameters_batch_size):
+            response = self.client.delete_parameters(Names=batch)
+            deleted.extend(response["DeletedParameters"])
+            for name in response["InvalidParameters"]:
+                logger.warning("Parameter '%s' was already gone" % name)
+        logger.info("Deleted %d parameters" % len(deleted))
+        return deleted
@@ -0,0 +1,192 @@
+"""
+AWS SSM Parameter Cache
+
+In-process cache for services that read parameters on hot paths. Entries live
+in a bounded LRU with a TTL, concurrent reads of the same cold name share one
+call, cold names are fetched 10 at a time through GetParameters and entries
+past their TTL are served stale while a background thread refreshes them.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from aws.ssm import SSM, Parameter
+
+logger = logging.getLogger(__name__)
+
+
+class ParameterCache:
+    """
+    Cached get_parameter for an SSM wrapper
+
+    Entries are fresh for ttl seconds, then served as is for another stale_ttl
+    seconds while being refreshed in the background, then fetched again.
+    """
+
+    def __init__(
+        self,
+        ssm: SSM,
+        max_size: int = 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 60.0,
+        decrypt: bool = True,
+    ):
+        self.ssm = ssm
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.decrypt = decrypt
+        self.hits: int = 0
+        self.stale_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.refreshes: int = 0
+        self.api_calls: int = 0
+        self._entries: "OrderedDict[str, Tuple[Parameter, float]]" = OrderedDict()
+        # name -> Future of the call fetching it, shared by concurrent readers
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get_parameter(self, name: str) -> Parameter:
+        """
+        Cached Parameter - raises ClientError ParameterNotFound like
+        SSM.get_parameter when it doesn't exist
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(name)
+                return entry[0]
+        parameters = self.get_parameters([name])
+        if name not in parameters:
+            raise ClientError(
+                {"Error": {"Code": "ParameterNotFound", "Message": name}},
+                "GetParameters",
+            )
+        return parameters[name]
+
+    def get_value(self, name: str) -> str:
+        return self.get_parameter(name).value
+
+    def get_parameters(self, names: List[str]) -> Dict[str, Parameter]:
+        """
+        Cached Parameters by name - names that don't exist are left out
+        """
+        now = time.monotonic()
+        found: Dict[str, Parameter] = {}
+        waiting: Dict[str, Future] = {}
+        fetch: List[str] = []
+        refresh: List[str] = []
+        with self._lock:
+            for name in dict.fromkeys(names):
+                entry = self._entries.get(name)
+                age = now - entry[1] if entry is not None else None
+                if age is not None and age < self.ttl + self.stale_ttl:
+                    if age < self.ttl:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                        if name not in self._inflight:
+                            self._inflight[name] = Future()
+                            refresh.append(name)
+                    self._entries.move_to_end(name)
+                    found[name] = entry[0]
+                    continue
+                self.misses += 1
+                if name not in self._inflight:
+                    self._inflight[name] = Future()
+                    fetch.append(name)
+                waiting[name] = self._inflight[name]
+
+        if refresh:
+            self._background().submit(self._refresh, refresh)
+        if fetch:
+            self._fetch(fetch)
+        for name, future in waiting.items():
+            parameter = future.result()
+            if parameter is not None:
+                found[name] = parameter
+        return found
+
+    def invalidate(self, name: Optional[str] = None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "api_calls": self.api_calls,
+            }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _refresh(self, names: List[str]):
+        with self._lock:
+            self.refreshes += len(names)
+        self._fetch(names)
+
+    def _fetch(self, names: List[str]):
+        """
+        Fetch names 10 per call and resolve the futures waiting on them
+        """
+        for batch in SSM._batches(names, SSM.get_parameters_batch_size):
+            try:
+                response = self.ssm.client.get_parameters(
+                    Names=batch, WithDecryption=self.decrypt
+                )
+            except Exception as err:
+                logger.warning("Failed fetching %s: %s" % (batch, err))
+                with self._lock:
+                    futures = [self._inflight.pop(name) for name in batch]
+                for future in futures:
+                    future.set_exception(err)
+                continue
+
+            fetched = {
+                parameter["Name"]: Parameter(**parameter)
+                for parameter in response["Parameters"]
+            }
+            now = time.monotonic()
+            with self._lock:
+                self.api_calls += 1
+                for name in batch:
+                    if name in fetched:
+                        self._entries[name] = (fetched[name], now)
+                        self._entries.move_to_end(name)
+                    else:
+                        # deleted since it was cached
+                        self._entries.pop(name, None)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                futures = [(self._inflight.pop(name), name) for name in batch]
+            for future, name in futures:
+                future.set_result(fetched.get(name))
+
+    def _background(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="ssm-cache-refresh"
+                )
+            return self._executor
@@ -0,0 +1,211 @@
+"""
+AWS SSM Parameter History
+
+Local SQLite store of GetParameterHistory for a profile, kept up to date
+incrementally: a sync only fetches the history of parameters whose
+LastModifiedDate moved since they were last synced, so "what changed since T"
+is answered without re-reading every parameter's history.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aws.ssm import SSM
+from support.aws import Aws
+
+logger = logging.getLogger(__name__)
+
+
+class ParameterHistory:
+    """
+    History of every parameter in a profile - values are never stored, only
+    a hash so value changes can be told apart from metadata changes
+
+    Values are read decrypted and hashed in memory, as SecureString
+    ciphertext changes on every put. The hash is keyed with a random key kept
+    in the store, so it can't be looked up in a table of common secrets.
+    """
+
+    directory: Path = (
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "aws-tools"
+        / "ssm-history"
+    )
+
+    def __init__(self, profile_name: str, max_workers: int = Aws.max_pool_connections):
+        self.profile_name = profile_name
+        self.max_workers = max_workers
+        self.file = ParameterHistory.directory / (
+            "%s.sqlite" % (profile_name or "default")
+        )
+        self._ssm: Optional[SSM] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._hash_key: Optional[bytes] = None
+
+    @property
+    def ssm(self) -> SSM:
+        if self._ssm is None:
+            self._ssm = SSM(self.profile_name)
+        return self._ssm
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.file))
+            self._connection.executescript(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "name TEXT, version INTEGER, modified REAL, user TEXT, type TEXT, "
+                "description TEXT, labels TEXT, value_hash TEXT, "
+                "PRIMARY KEY (name, version));"
+                "CREATE INDEX IF NOT EXISTS history_modified ON history (modified);"
+                "CREATE TABLE IF NOT EXISTS synced ("
+                "name TEXT PRIMARY KEY, modified REAL, deleted REAL);"
+                "CREATE TABLE IF NOT EXISTS hash_key (key BLOB);"
+            )
+        return self._connection
+
+    @property
+    def hash_key(self) -> bytes:
+        if self._hash_key is None:
+            row = self.connection.execute("SELECT key FROM hash_key").fetchone()
+            if row is None:
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT INTO hash_key VALUES (?)", (os.urandom(32),)
+                    )
+                row = self.connection.execute("SELECT key FROM hash_key").fetchone()
+            self._hash_key = row[0]
+        return self._hash_key
+
+    def sync(self, path: Optional[str] = None) -> Dict[str, int]:
+        """
+        Fetch history of new and modified parameters (under path) concurrently,
+        storing each parameter's history as soon as it arrives
+        """
+        if path:
+            parameters = self.ssm.describe_parameters_under_path(path, True).values()
+        else:
+            parameters = self.ssm.iter_describe_parameters(page_size=50)
+        current = {
+            parameter["Name"]: parameter["LastModifiedDate"].timestamp()
+            for parameter in parameters
+        }
+        synced = self._synced(path)
+        stale = [
+            name
+            for name, modified in current.items()
+            if name not in synced or synced[name][0] < modified
+        ]
+        deleted = [
+            name
+            for name, (_, deleted) in synced.items()
+            if name not in current and deleted is None
+        ]
+        logger.info(
+            "%d of %d parameters changed since the last sync"
+            % (len(stale), len(current))
+        )
+
+        # sqlite connections stay on this thread - read the key before fanning out
+        hash_key = self.hash_key
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_history, name, hash_key): name
+                for name in stale
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as err:
+                    # stays stale - picked up again by the next sync
+                    logger.error("Failed getting history of '%s': %s" % (name, err))
+                    continue
+                self._store(name, current[name], rows)
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE synced SET deleted = ? WHERE name = ?",
+                [(now, name) for name in deleted],
+            )
+        return {
+            "parameters": len(current),
+            "fetched": len(stale),
+            "deleted": len(deleted),
+        }
+
+    def changed_since(self, since: datetime) -> List[Tuple]:
+        """
+        (name, version, modified, user, value changed) of every version written
+        after since, plus (name, None, deleted, None, None) for deletions
+        """
+        cutoff = since.timestamp()
+        rows = self.connection.execute(
+            "SELECT h.name, h.version, h.modified, h.user, "
+            "h.value_hash IS NOT p.value_hash "
+            "FROM history h LEFT JOIN history p "
+            "ON p.name = h.name AND p.version = h.version - 1 "
+            "WHERE h.modified > ? ORDER BY h.modified",
+            (cutoff,),
+        ).fetchall()
+        deleted = self.connection.execute(
+            "SELECT name, NULL, deleted, NULL, NULL FROM synced "
+            "WHERE deleted > ? ORDER BY deleted",
+            (cutoff,),
+        ).fetchall()
+        return [
+            (name, version, self._datetime(modified), user, changed)
+            for name, version, modified, user, changed in rows + deleted
+        ]
+
+    def _fetch_history(self, name: str, hash_key: bytes) -> List[tuple]:
+        return [
+            (
+                name,
+                entry["Version"],
+                entry["LastModifiedDate"].timestamp(),
+                entry.get("LastModifiedUser"),
+                entry.get("Type"),
+                entry.get("Description"),
+                json.dumps(entry.get("Labels", [])),
+                hashlib.blake2b(
+                    entry.get("Value", "").encode("utf-8"),
+                    key=hash_key,
+                    digest_size=16,
+                ).hexdigest(),
+            )
+            for entry in self.ssm.iter_parameter_history(
+                name, decrypt=True, page_size=50
+            )
+        ]
+
+    def _store(self, name: str, modified: float, rows: List[tuple]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO synced VALUES (?, ?, NULL)", (name, modified)
+            )
+
+    def _synced(self, path: Optional[str]) -> Dict[str, Tuple[float, Optional[float]]]:
+        prefix = (path.rstrip("/") + "/") if path else ""
+        rows = self.connection.execute(
+            "SELECT name, modified, deleted FROM synced WHERE substr(name, 1, ?) = ?",
+            (len(prefix), prefix),
+        )
+        return {name: (modified, deleted) for name, modified, deleted in rows}
+
+    @staticmethod
+    def _datetime(timestamp: float) -> datetime:
+        return datetime.fromtimestamp(timestamp, timezone.utc)
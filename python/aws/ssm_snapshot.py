@@ -0,0 +1,327 @@
+"""
+AWS SSM Snapshot
+
+Local copy of a profile's parameter metadata (and optionally values) with a
+path trie and a trigram substring index, so path and "contains" queries are
+answered offline. A refresh only re-fetches parameters whose
+LastModifiedDate moved. Both indexes are saved with the snapshot, so a
+query doesn't rebuild them.
+"""
+
+from array import array
+import base64
+from datetime import datetime
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+from aws.ssm import SSM
+from support.aws import Aws
+
+logger = logging.getLogger(__name__)
+
+
+class PathTrie:
+    """
+    Parameter names by hierarchy - each node holds the names directly under it
+    """
+
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: Dict[str, PathTrie] = {}
+        self.names: List[str] = []
+
+    def insert(self, name: str):
+        node = self
+        # "/a/b/key" lives under the node for /a/b
+        for segment in name.split("/")[1:-1]:
+            node = node.children.setdefault(segment, PathTrie())
+        node.names.append(name)
+
+    def find(self, path: str, recursive: bool) -> Iterator[str]:
+        node = self
+        for segment in path.strip("/").split("/") if path.strip("/") else []:
+            node = node.children.get(segment)
+            if node is None:
+                return
+        if not recursive:
+            yield from node.names
+            return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.names
+            stack.extend(node.children.values())
+
+    def dump(self, ids: Dict[str, int]) -> list:
+        """
+        [name ids, {segment: child}] - names are stored as their row number
+        """
+        return [
+            [ids[name] for name in self.names],
+            {segment: child.dump(ids) for segment, child in self.children.items()},
+        ]
+
+    @staticmethod
+    def load(stored: list, names: List[str]) -> "PathTrie":
+        node = PathTrie()
+        node.names = [names[i] for i in stored[0]]
+        node.children = {
+            segment: PathTrie.load(child, names) for segment, child in stored[1].items()
+        }
+        return node
+
+
+class SubstringIndex:
+    """
+    Trigram index answering "name contains value" without scanning every name
+    """
+
+    def __init__(self, names: List[str], postings: Dict[str, array] = None):
+        self.names = names
+        if postings is not None:
+            self.postings = postings
+            return
+        postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            for trigram in {name[j : j + 3] for j in range(len(name) - 2)}:
+                postings.setdefault(trigram, []).append(i)
+        # arrays of ints are a fraction of the size of lists
+        self.postings: Dict[str, array] = {
+            trigram: array("I", ids) for trigram, ids in postings.items()
+        }
+
+    def contains(self, value: str) -> Iterator[str]:
+        if len(value) < 3:
+            return (name for name in self.names if value in name)
+        candidates = min(
+            (self.postings.get(value[j : j + 3], ()) for j in range(len(value) - 2)),
+            key=len,
+        )
+        # the rarest trigram narrows it down - check the rest on the names
+        return (self.names[i] for i in candidates if value in self.names[i])
+
+    def dump(self) -> Dict[str, str]:
+        """
+        Postings as base64 of little endian unsigned ints
+        """
+        stored = {}
+        for trigram, ids in self.postings.items():
+            if sys.byteorder == "big":
+                ids = array("I", ids)
+                ids.byteswap()
+            stored[trigram] = base64.b64encode(ids.tobytes()).decode("ascii")
+        return stored
+
+    @staticmethod
+    def load(stored: Dict[str, str], names: List[str]) -> "SubstringIndex":
+        postings = {}
+        for trigram, encoded in stored.items():
+            ids = array("I", base64.b64decode(encoded))
+            if sys.byteorder == "big":
+                ids.byteswap()
+            postings[trigram] = ids
+        return SubstringIndex(names, postings)
+
+
+class SSMSnapshot:
+    """
+    Snapshot of the parameters in a profile and region stored as gzipped JSON
+    under ~/.cache/aws-tools/ssm-snapshots/<profile>/<region>. Values are read without decryption, so
+    SecureString values stay encrypted on disk.
+    """
+
+    fields = ("Name", "Type", "Version", "LastModifiedDate", "DataType", "Value")
+    directory: Path = (
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "aws-tools"
+        / "ssm-snapshots"
+    )
+
+    def __init__(self, profile_name: str, region_name: Optional[str] = None):
+        self.profile_name = profile_name
+        # read from the profile's config - no API call
+        self.region_name = (
+            region_name or Aws.create_session(profile_name).region_name or "us-east-1"
+        )
+        self.file = (
+            SSMSnapshot.directory
+            / (profile_name or "default")
+            / ("%s.json.gz" % self.region_name)
+        )
+        self.with_values: bool = False
+        self.taken: Optional[float] = None
+        self.parameters: Dict[str, dict] = {}
+        self._ssm: Optional[SSM] = None
+        self._trie: Optional[PathTrie] = None
+        self._substrings: Optional[SubstringIndex] = None
+
+    @property
+    def ssm(self) -> SSM:
+        if self._ssm is None:
+            self._ssm = SSM(self.profile_name, self.region_name)
+        return self._ssm
+
+    def exists(self) -> bool:
+        return self.file.exists()
+
+    def take(self, with_values: bool = False):
+        """
+        Replace the snapshot with every parameter in the account
+        """
+        self.with_values = with_values
+        self.parameters = self._describe_all()
+        if with_values:
+            self._fetch_values(list(self.parameters))
+        self.taken = time.time()
+        self._reset_indexes()
+        logger.info("Took snapshot of %d parameters" % len(self.parameters))
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Re-list metadata and only re-fetch values of parameters that changed
+        """
+        current = self._describe_all()
+        changed = [
+            name
+            for name, parameter in current.items()
+            if name not in self.parameters
+            or self.parameters[name]["LastModifiedDate"]
+            != parameter["LastModifiedDate"]
+        ]
+        removed = [name for name in self.parameters if name not in current]
+        unchanged = set(current) - set(changed)
+        for name, parameter in current.items():
+            if name in unchanged:
+                parameter["Value"] = self.parameters[name].get("Value")
+        self.parameters = current
+        if self.with_values:
+            self._fetch_values(changed)
+        self.taken = time.time()
+        self._reset_indexes()
+        logger.info(
+            "Refreshed snapshot - %d changed, %d removed" % (len(changed), len(removed))
+        )
+        return {"changed": len(changed), "removed": len(removed)}
+
+    def load(self):
+        with gzip.open(self.file, "rt", encoding="utf-8") as file:
+            stored = json.load(file)
+        self.with_values = stored["with_values"]
+        self.taken = stored["taken"]
+        fields = stored["fields"]
+        self.parameters = {}
+        for row in stored["rows"]:
+            parameter = dict(zip(fields, row))
+            parameter["LastModifiedDate"] = datetime.fromisoformat(
+                parameter["LastModifiedDate"]
+            )
+            self.parameters[parameter["Name"]] = parameter
+        self._reset_indexes()
+        # snapshots saved without indexes build them on first query
+        if "trie" in stored:
+            names = list(self.parameters)
+            self._trie = PathTrie.load(stored["trie"], names)
+            self._substrings = SubstringIndex.load(stored["trigrams"], names)
+        logger.info(
+            "Loaded snapshot of %d parameters taken %s"
+            % (len(self.parameters), datetime.fromtimestamp(self.taken))
+        )
+
+    def save(self):
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        # the indexes refer to parameters by row number
+        ids = {name: i for i, name in enumerate(self.parameters)}
+        # rows instead of objects - field names aren't repeated per parameter
+        stored = {
+            "profile": self.profile_name,
+            "region": self.region_name,
+            "taken": self.taken,
+            "with_values": self.with_values,
+            "fields": SSMSnapshot.fields,
+            "rows": [
+                [
+                    (
+                        parameter.get(field)
+                        if field != "LastModifiedDate"
+                        else parameter[field].isoformat()
+                    )
+                    for field in SSMSnapshot.fields
+                ]
+                for parameter in self.parameters.values()
+            ],
+            "trie": self.trie.dump(ids),
+            "trigrams": self.substrings.dump(),
+        }
+        temporary = "%s.%d.tmp" % (self.file, os.getpid())
+        # the trigram postings barely compress - level 9 only makes saving slow
+        with gzip.open(temporary, "wt", compresslevel=6, encoding="utf-8") as file:
+            json.dump(stored, file, separators=(",", ":"))
+        os.replace(temporary, self.file)
+        logger.info("Saved snapshot to '%s'" % self.file)
+
+    def describe_parameters(self, values: List[str] = []) -> List[dict]:
+        """
+        Same parameters describe_parameters(values) finds - names containing
+        any of values, or every parameter
+        """
+        if not values:
+            return sorted(self.parameters.values(), key=lambda p: p["Name"])
+        return self._parameters(self._contains(values))
+
+    def get_parameters_by_path(
+        self, path: str, recursive: bool, values: List[str] = []
+    ) -> List[dict]:
+        names = set(self.trie.find(path, recursive))
+        if values:
+            names &= self._contains(values)
+        return self._parameters(names)
+
+    @property
+    def trie(self) -> PathTrie:
+        if self._trie is None:
+            self._trie = PathTrie()
+            for name in self.parameters:
+                if name.startswith("/"):
+                    self._trie.insert(name)
+        return self._trie
+
+    @property
+    def substrings(self) -> SubstringIndex:
+        if self._substrings is None:
+            self._substrings = SubstringIndex(list(self.parameters))
+        return self._substrings
+
+    def _contains(self, values: List[str]) -> set:
+        names = set()
+        for value in values:
+            names.update(self.substrings.contains(value))
+        return names
+
+    def _parameters(self, names: set) -> List[dict]:
+        return [self.parameters[name] for name in sorted(names)]
+
+    def _reset_indexes(self):
+        self._trie = None
+        self._substrings = None
+
+    def _describe_all(self) -> Dict[str, dict]:
+        return {
+            parameter["Name"]: {
+                field: parameter.get(field)
+                for field in SSMSnapshot.fields
+                if field != "Value"
+            }
+            for parameter in self.ssm.iter_describe_parameters(page_size=50)
+        }
+
+    def _fetch_values(self, names: List[str]):
+        for parameter in self.ssm.get_parameters(names, decrypt=False):
+            if parameter.name in self.parameters:
+                self.parameters[parameter.name]["Value"] = parameter.value
@@ -2,31 +2,70 @@
 AWS Step Functions
 """
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import hashlib
+import itertools
 import logging
+import re
 
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import boto3
+from botocore.exceptions import ClientError
 from tabulate import tabulate
 
 from aws.aws_service import AwsService
 from support.aws import Aws
+from support.compact import Compact
+from support.pagination import Pagination
 
 logger = logging.getLogger(__name__)
 
 
-class StateMachine:
+class StateMachine(Compact):
+    __slots__ = ("_arn_prefix", "_arn", "name", "type", "creation_date")
+    headers = ["arn", "name", "type", "creation_date"]
+
     def __init__(self, arn: str, name: str, sm_type: str, creation_date: datetime):
-        self.arn: str = arn
         self.name: str = name
-        self.type: str = sm_type
+        self.arn: str = arn
+        self.type: str = Compact.intern(sm_type)
         self.creation_date: datetime = creation_date
 
+    @property
+    def arn(self) -> str:
+        if self._arn_prefix is None:
+            return self._arn
+        return self._arn_prefix + self.name
+
+    @arn.setter
+    def arn(self, arn: str):
+        self._arn_prefix = Compact.arn_prefix(arn, self.name)
+        self._arn = None if self._arn_prefix is not None else arn
+
     def values(self) -> List[str]:
         return [self.arn, self.name, self.type, self.creation_date]
 
 
+class StartExecutionResult:
+    def __init__(
+        self,
+        name: str,
+        status: str,
+        execution_arn: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        error: Exception = None,
+    ):
+        self.name: str = name
+        # started (or already running with the same input), exists (closed or
+        # started with another input) or failed
+        self.status: str = status
+        self.execution_arn: Optional[str] = execution_arn
+        self.start_date: Optional[datetime] = start_date
+        self.error: Exception = error
+
+
 class StepFunctions(AwsService):
     """
     Step Functions Client
@@ -44,25 +83,27 @@ class StepFunctions(AwsService):
 
     def list_state_machines(self):
         logger.debug("Listing state machines...")
-
-        # Implemented in this duplicated manner as I was unable
-        # to find a valid initial value for nextToken
-        resp = self.client.list_state_machines()
-        converted = self._convert_dict_to_state_machine(resp["stateMachines"])
-        self.state_machines.extend(converted)
-        next_token = resp.get("nextToken", None)
-
-        while next_token:
-            resp = self.client.list_state_machines(nextToken=next_token)
-            converted: List[StateMachine] = self._convert_dict_to_state_machine(
-                resp["stateMachines"]
-            )
-            self.state_machines.extend(converted)
-            next_token = resp.get("nextToken", None)
-
+        self.state_machines.extend(self.iter_state_machines())
         logger.info("Found %d state machines" % len(self.state_machines))
         logger.debug("Completed listing state machines!")
 
+    def iter_state_machines(
+        self, limit: Optional[int] = None, **pagination
+    ) -> Iterator[StateMachine]:
+        """
+        Stream state machines as each page arrives
+        """
+        for sm in Pagination.paginate(
+            self.client,
+            "list_state_machines",
+            "stateMachines",
+            limit=limit,
+            input_token="nextToken",
+            output_token="nextToken",
+            **pagination,
+        ):
+            yield from self._convert_dict_to_state_machine([sm])
+
     def _convert_dict_to_state_machine(
         self, state_machines: List[dict]
     ) -> List[StateMachine]:
@@ -83,7 +124,7 @@ class StepFunctions(AwsService):
 
     def display_state_machines(self):
         if self.state_machines:
-            headers = list(vars(self.state_machines[0]).keys())
+            headers = StateMachine.headers
             # print("heders:", headers)
             table = [state_machine.values() for state_machine in self.state_machines]
             # print("tables:", table[0])
@@ -107,5 +148,118 @@ class StepFunctions(AwsService):
             "Starting execution for %d state machines" % len(state_machine_arns)
         )
         for sm_arn in state_machine_arns:
-            resp = self.client.start_execution(stateMachineArn=sm_arn)
+            try:
+                resp = self.client.start_execution(stateMachineArn=sm_arn)
+            except ClientError as error:
+                logger.error("Failed starting '%s': %s" % (sm_arn, error))
+                continue
             logger.info("resp:%s", resp)
+
+    @staticmethod
+    def execution_name(execution_input: str, prefix: str = "bulk") -> str:
+        """
+        Name derived from the input, so starting the same input again is a
+        no-op rather than a second execution
+        """
+        digest = hashlib.sha256(execution_input.encode("utf-8")).hexdigest()[:32]
+        return "%s-%s" % (StepFunctions.clean_execution_name(prefix)[:47], digest)
+
+    @staticmethod
+    def execution_arn(state_machine_arn: str, name: str) -> str:
+        return "%s:%s" % (
+            state_machine_arn.replace(":stateMachine:", ":execution:"),
+            name,
+        )
+
+    def state_machine_type(self, state_machine_arn: str) -> str:
+        """
+        STANDARD or EXPRESS - from the listed state machines when there are any
+        """
+        for state_machine in self.state_machines:
+            if state_machine.arn == state_machine_arn:
+                return state_machine.type
+        resp = self.client.describe_state_machine(stateMachineArn=state_machine_arn)
+        return resp["type"]
+
+    @staticmethod
+    def clean_execution_name(name: str) -> str:
+        # 1 to 80 letters, digits, - and _ keep names usable in CloudWatch too
+        return re.sub(r"[^A-Za-z0-9_-]", "_", name)[:80]
+
+    def start_executions(
+        self,
+        state_machine_arn: str,
+        executions: Iterable[Tuple[str, str]],
+        max_workers: int = Aws.max_pool_connections,
+        allow_express: bool = False,
+    ) -> Iterator[StartExecutionResult]:
+        """
+        Start (name, input) executions concurrently and yield each result as
+        it lands, in no particular order
+
+        executions is read as slots free up, so millions of inputs can be
+        streamed from a file, and the StartExecution throttling bucket keeps
+        the pace at the service's rate. A name already started with the same
+        input returns the original execution, so reruns don't double start.
+
+        EXPRESS state machines don't keep execution names, so a rerun would
+        start everything again - they're refused unless allow_express.
+        """
+        if (
+            not allow_express
+            and self.state_machine_type(state_machine_arn) == "EXPRESS"
+        ):
+            raise ValueError(
+                "'%s' is an EXPRESS state machine - execution names don't stop "
+                "reruns from starting the same inputs again" % state_machine_arn
+            )
+        # a generator of its own so the check above raises on the call, before
+        # the caller starts reading results
+        return self._start_executions(state_machine_arn, executions, max_workers)
+
+    def _start_executions(
+        self,
+        state_machine_arn: str,
+        executions: Iterable[Tuple[str, str]],
+        max_workers: int,
+    ) -> Iterator[StartExecutionResult]:
+        executions = iter(executions)
+
+        def start(name: str, execution_input: str) -> StartExecutionResult:
+            try:
+                resp = self.client.start_execution(
+                    stateMachineArn=state_machine_arn,
+                    name=name,
+                    input=execution_input,
+                )
+            except ClientError as error:
+                if error.response["Error"]["Code"] == "ExecutionAlreadyExists":
+                    return StartExecutionResult(
+                        name,
+                        "exists",
+                        StepFunctions.execution_arn(state_machine_arn, name),
+                        error=error,
+                    )
+                return StartExecutionResult(name, "failed", error=error)
+            return StartExecutionResult(
+                name, "started", resp["executionArn"], resp["startDate"]
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # a couple of calls queued behind each worker - inputs are only
+            # read as they're needed
+            pending = {
+                executor.submit(start, *execution)
+                for execution in itertools.islice(executions, max_workers * 2)
+            }
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                    for execution in itertools.islice(executions, len(done)):
+                        pending.add(executor.submit(start, *execution))
+            finally:
+                # the caller stopped early - don't start the rest
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark - time to first call with a cold vs warm Aws client registry
+
+Calls are answered by botocore's Stubber so no credentials or network are needed.
+    python -m benchmarks.client_registry -n 20
+"""
+
+import argparse
+import statistics
+import time
+
+from botocore.stub import Stubber
+
+from support.aws import Aws
+
+SERVICES = ["ssm", "glue", "stepfunctions", "logs", "iam"]
+FIRST_CALLS = {
+    "ssm": ("describe_parameters", {"Parameters": []}),
+    "glue": ("list_crawlers", {"CrawlerNames": []}),
+    "stepfunctions": ("list_state_machines", {"stateMachines": []}),
+    "logs": ("describe_log_groups", {"logGroups": []}),
+    "iam": ("list_users", {"Users": []}),
+}
+
+
+def main():
+    args = setup_args()
+
+    cold = [
+        time_first_calls(args.profile, args.region, warm=False)
+        for _ in range(args.runs)
+    ]
+    warm = [
+        time_first_calls(args.profile, args.region, warm=True) for _ in range(args.runs)
+    ]
+
+    report("cold registry", cold)
+    report("warm registry", warm)
+    print("speedup: %.1fx" % (statistics.median(cold) / statistics.median(warm)))
+
+
+def time_first_calls(profile_name: str, region_name: str, warm: bool) -> float:
+    """
+    Time creating a client and making one call for every service
+    """
+    if not warm:
+        Aws.close()
+
+    start = time.perf_counter()
+    for service in SERVICES:
+        client = Aws.create_client(profile_name, service, region_name)
+        operation, response = FIRST_CALLS[service]
+        with Stubber(client) as stubber:
+            stubber.add_response(operation, response)
+            getattr(client, operation)()
+    return time.perf_counter() - start
+
+
+def report(label: str, timings: list):
+    print(
+        "%-14s median %8.2f ms   min %8.2f ms   max %8.2f ms"
+        % (
+            label,
+            statistics.median(timings) * 1000,
+            min(timings) * 1000,
+            max(timings) * 1000,
+        )
+    )
+
+
+def setup_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument("-p", "--profile", default=None)
+    parser.add_argument("-r", "--region", default="us-east-1")
+    parser.add_argument("-n", "--runs", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
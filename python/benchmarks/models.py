@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark - memory per model object, compact __slots__ layout vs plain __dict__
+
+Objects are built from freshly decoded response dicts like botocore hands
+them over, and only what the objects keep alive once the responses are gone
+is counted.
+    python -m benchmarks.models -n 100000
+"""
+
+import argparse
+from datetime import datetime, timezone
+import gc
+import json
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.stand_in import StandIn
+
+# response keys holding timestamps - decoded back to datetimes like botocore does
+TIMESTAMPS = {
+    "LastModifiedDate",
+    "CreationTime",
+    "LastUpdated",
+    "StartTime",
+    "creationDate",
+}
+
+
+class Plain:
+    """
+    The layout the models had before - attributes in a per instance __dict__
+    """
+
+    def __init__(self, **attributes):
+        # set one by one like the old __init__s so instances share dict keys
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+
+def parameter(item: dict, compact: bool):
+    from aws.ssm import Parameter
+
+    if compact:
+        return Parameter(**item)
+    return Plain(
+        arn=item["ARN"],
+        name=item["Name"],
+        type=item["Type"],
+        version=item["Version"],
+        last_modified_date=item["LastModifiedDate"],
+        data_type=item["DataType"],
+        value=item["Value"],
+    )
+
+
+def crawler(item: dict, compact: bool):
+    from aws.glue import Crawler
+
+    if compact:
+        return Crawler(**item)
+    return Plain(
+        classifiers=item["Classifiers"],
+        configuration=item["Configuration"],
+        crawl_elapsed_time=item["CrawlElapsedTime"],
+        creation_time=item["CreationTime"],
+        database_name=item["DatabaseName"],
+        last_updated=item["LastUpdated"],
+        name=item["Name"],
+        role=item["Role"],
+        schedule=item["Schedule"],
+        schema_change_policy=item["SchemaChangePolicy"],
+        state=item["State"],
+        targets=item["Targets"],
+        version=item["Version"],
+        last_crawl=item["LastCrawl"],
+    )
+
+
+def log_stream(item: dict, compact: bool):
+    from aws.cloudwatchlogs import LogStream
+
+    if compact:
+        return LogStream(**item)
+    return Plain(
+        log_stream_name=item["logStreamName"],
+        creation_time=item["creationTime"],
+        first_event_timestamp=item["firstEventTimestamp"],
+        last_event_timestamp=item["lastEventTimestamp"],
+        last_ingestion_time=item["lastIngestionTime"],
+        upload_sequence_token=item["uploadSequenceToken"],
+        arn=item["arn"],
+        stored_bytes=item["storedBytes"],
+    )
+
+
+def state_machine(item: dict, compact: bool):
+    from aws.stepfunctions import StateMachine
+
+    if compact:
+        return StateMachine(
+            item["stateMachineArn"], item["name"], item["type"], item["creationDate"]
+        )
+    return Plain(
+        arn=item["stateMachineArn"],
+        name=item["name"],
+        type=item["type"],
+        creation_date=item["creationDate"],
+    )
+
+
+def main():
+    args = setup_args()
+    # imported up front so module import isn't counted against the objects
+    import aws.cloudwatchlogs
+    import aws.glue
+    import aws.ssm
+    import aws.stepfunctions
+
+    stand_in = StandIn(
+        parameters=args.count,
+        crawlers=args.count,
+        state_machines=args.count,
+        log_streams=args.count,
+        users=0,
+        partitions=0,
+    )
+    models: Dict[str, Tuple[Callable, List[dict]]] = {
+        "Parameter": (parameter, list(stand_in.parameters.values())),
+        "Crawler": (crawler, list(stand_in.crawlers.values())),
+        "LogStream": (log_stream, stand_in.log_streams),
+        "StateMachine": (state_machine, stand_in.state_machines),
+    }
+
+    print(
+        "%-14s %10s %12s %12s %8s"
+        % ("model", "objects", "plain B", "compact B", "saved")
+    )
+    for name, (build, items) in models.items():
+        encoded = json.dumps(items, default=lambda value: value.timestamp())
+        plain = measure(build, encoded, compact=False)
+        compact = measure(build, encoded, compact=True)
+        print(
+            "%-14s %10d %12.0f %12.0f %7.0f%%"
+            % (name, len(items), plain, compact, 100 * (1 - compact / plain))
+        )
+
+
+def measure(build: Callable, encoded: str, compact: bool) -> float:
+    """
+    Bytes each object keeps alive after the decoded responses are dropped
+    """
+    gc.collect()
+    tracemalloc.start()
+    items = json.loads(encoded, object_hook=decode_timestamps)
+    objects = [build(item, compact) for item in items]
+    del items
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / len(objects)
+
+
+def decode_timestamps(item: dict) -> dict:
+    for key in TIMESTAMPS & item.keys():
+        item[key] = datetime.fromtimestamp(item[key], timezone.utc)
+    return item
+
+
+def setup_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "-n", "--count", help="objects of each model", type=int, default=100_000
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
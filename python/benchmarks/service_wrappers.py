@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Benchmark - every aws.* service wrapper against a synthetic account
+
+Requests are answered by benchmarks.stand_in, so this runs on a plain Linux box
+with no network or credentials. Wall time, API call count and peak memory of each
+operation are compared with benchmarks/baselines.json and the run exits
+non-zero on a regression.
+    python -m benchmarks.service_wrappers
+    python -m benchmarks.service_wrappers --update-baselines
+    python -m benchmarks.service_wrappers --latency 0.05 -o ssm_get_parameters_by_path
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import Callable, Dict, List
+
+# the stand in never checks credentials but botocore wants some to sign with
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "stand-in")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stand-in")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from benchmarks.stand_in import StandIn
+from file_finder import FileFinder
+from support.throttling import Throttling
+
+BASELINES = FileFinder.resolve("benchmarks/baselines.json")
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(function: Callable) -> Callable:
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def attached(stand_in: StandIn, service):
+    stand_in.attach(service.client)
+    return service
+
+
+@benchmark
+def ssm_describe_parameters(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    attached(stand_in, SSM(None)).describe_parameters()
+
+
+@benchmark
+def ssm_describe_parameters_filtered(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    attached(stand_in, SSM(None)).describe_parameters(values=["app007"])
+
+
+@benchmark
+def ssm_iter_describe_parameters_limit(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    ssm = attached(stand_in, SSM(None))
+    for _ in ssm.iter_describe_parameters(limit=500):
+        pass
+
+
+@benchmark
+def ssm_get_parameters_by_path(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    attached(stand_in, SSM(None)).get_parameters_by_path(
+        "/prod", recursive=True, decrypt=True
+    )
+
+
+@benchmark
+def ssm_get_parameters_by_path_sharded(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    attached(stand_in, SSM(None)).get_parameters_by_path(
+        "/prod", recursive=True, decrypt=True, sharded=True
+    )
+
+
+@benchmark
+def ssm_get_parameter(stand_in: StandIn):
+    from aws.ssm import SSM
+
+    ssm = attached(stand_in, SSM(None))
+    for name in list(stand_in.parameters)[:200]:
+        ssm.get_parameter(name, decrypt=True)
+
+
+@benchmark
+def ssm_put_parameters(stand_in: StandIn):
+    from aws.ssm import SSM, NewParameter
+
+    # a 5,000 row import where every other parameter already exists
+    existing = list(stand_in.parameters)[:2500]
+    new_parameters = [NewParameter(name, "new", "String") for name in existing]
+    new_parameters += [
+        NewParameter("/import/key%06d" % i, "new", "String") for i in range(2500)
+    ]
+    attached(stand_in, SSM(None)).put_parameters(new_parameters)
+
+
+@benchmark
+def glue_list_crawlers(stand_in: StandIn):
+    from aws.glue import Glue
+
+    attached(stand_in, Glue(None)).list_crawlers()
+
+
+@benchmark
+def glue_batch_get_crawlers(stand_in: StandIn):
+    from aws.glue import Glue
+
+    glue = attached(stand_in, Glue(None))
+    glue.batch_get_crawlers(list(stand_in.crawlers))
+    glue.get_crawler_names_by_state("READY")
+
+
+@benchmark
+def glue_load_crawlers(stand_in: StandIn):
+    from aws.glue import Glue
+
+    glue = attached(stand_in, Glue(None))
+    glue.load_crawlers()
+    for state in ("READY", "RUNNING", "STOPPING"):
+        glue.get_crawler_names_by_state(state)
+
+
+@benchmark
+def glue_iter_partitions(stand_in: StandIn):
+    from aws.glue import Glue
+
+    glue = attached(stand_in, Glue(None))
+    for _ in glue.iter_partitions("lake_db", "events", segments=1):
+        pass
+
+
+@benchmark
+def glue_iter_partitions_segmented(stand_in: StandIn):
+    from aws.glue import Glue
+
+    glue = attached(stand_in, Glue(None))
+    for _ in glue.iter_partitions("lake_db", "events", segments=8):
+        pass
+
+
+@benchmark
+def stepfunctions_list_state_machines(stand_in: StandIn):
+    from aws.stepfunctions import StepFunctions
+
+    step_functions = attached(stand_in, StepFunctions(None))
+    step_functions.list_state_machines()
+    step_functions.organize_state_machines_by_name()
+
+
+@benchmark
+def stepfunctions_start_executions(stand_in: StandIn):
+    import json
+
+    from aws.stepfunctions import StepFunctions
+
+    step_functions = attached(stand_in, StepFunctions(None))
+    arn = stand_in.state_machines[0]["stateMachineArn"]
+    inputs = (json.dumps({"day": day}) for day in range(2_000))
+    executions = (
+        (StepFunctions.execution_name(execution_input), execution_input)
+        for execution_input in inputs
+    )
+    for _ in step_functions.start_executions(arn, executions):
+        pass
+
+
+@benchmark
+def cloudwatchlogs_get_log_events(stand_in: StandIn):
+    from aws.cloudwatchlogs import CloudWatchLogs
+
+    logs = attached(stand_in, CloudWatchLogs(None))
+    logs.describe_log_streams("/aws/lambda/app", descending=True, limit=50)
+    for log_stream_name in logs.get_log_stream_names():
+        logs.get_log_events("/aws/lambda/app", log_stream_name)
+
+
+@benchmark
+def iam_credential_report(stand_in: StandIn):
+    from aws.iam import IAM
+
+    iam = attached(stand_in, IAM(None))
+    iam.get_credential_report()
+    try:
+        from aws.iam_credential_report import IAMCredentialReport
+    except ImportError:
+        # pandas isn't installed - only the API side can be measured
+        return
+    IAMCredentialReport("stand-in", iam.credential_report).clean()
+
+
+@benchmark
+def ec2_describe_security_groups(stand_in: StandIn):
+    from aws.ec2 import SecurityGroup
+
+    security_group = attached(stand_in, SecurityGroup(None))
+    for i in range(50):
+        security_group.describe_security_groups(["sg-%d-a" % i, "sg-%d-b" % i])
+
+
+def main():
+    args = setup_args()
+    # the stand in has no rate limits - don't let client side throttling pace it
+    Throttling.enabled = False
+    StandIn.latency = args.latency
+
+    scale = args.scale
+    started = time.perf_counter()
+    stand_in = StandIn(
+        parameters=int(100_000 * scale),
+        crawlers=int(5_000 * scale),
+        state_machines=int(2_000 * scale),
+        log_streams=int(1_000 * scale),
+        users=int(5_000 * scale),
+        partitions=int(50_000 * scale),
+    )
+    print("Built synthetic account in %.1f s\n" % (time.perf_counter() - started))
+    warm_up()
+
+    baselines = load_baselines() if scale == 1 and not args.latency else {}
+    results = {}
+    failures: List[str] = []
+    print("%-38s %9s %8s %9s" % ("benchmark", "seconds", "calls", "peak MB"))
+    for name, function in BENCHMARKS.items():
+        if args.only and not any(only in name for only in args.only):
+            continue
+        result = run(function, stand_in)
+        # a sub-second run is mostly scheduler noise - keep the fastest of a few
+        for _ in range(args.repeat - 1):
+            if result["seconds"] >= 1:
+                break
+            result = min(result, run(function, stand_in), key=lambda r: r["seconds"])
+        results[name] = result
+        print(
+            "%-38s %9.3f %8d %9.1f"
+            % (name, result["seconds"], result["calls"], result["peak_mb"])
+        )
+        failures.extend(compare(name, result, baselines.get(name), args.tolerance))
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(BASELINES, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print("\nUpdated %s" % BASELINES)
+    elif failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print("  %s" % failure)
+        sys.exit(1)
+
+
+def warm_up():
+    """
+    Import the wrappers and build their pooled clients before forking so
+    benchmarks don't measure module imports and botocore model loading
+    """
+    import aws.cloudwatchlogs
+    import aws.ec2
+    import aws.glue
+    import aws.iam
+    import aws.ssm
+    import aws.stepfunctions
+    from support.aws import Aws
+
+    for client_name in ("ssm", "glue", "stepfunctions", "logs", "iam", "ec2"):
+        Aws.create_client(None, client_name)
+
+
+def run(function: Callable, stand_in: StandIn) -> dict:
+    """
+    Run one benchmark in a forked child and return its wall time, API call count
+    and peak memory - forking keeps each benchmark's peak RSS separate without
+    the slowdown of tracemalloc
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    child = multiprocessing.get_context("fork").Process(
+        target=_run_child, args=(function, stand_in, sender)
+    )
+    child.start()
+    result = receiver.recv()
+    child.join()
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def _run_child(function: Callable, stand_in: StandIn, sender):
+    try:
+        stand_in.reset_counts()
+        start_rss = _current_rss()
+        start = time.perf_counter()
+        # some wrappers print or log their results - keep the report readable
+        logging.disable(logging.CRITICAL)
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(stand_in)
+        seconds = time.perf_counter() - start
+        # ru_maxrss is in KiB on Linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        sender.send(
+            {
+                "seconds": round(seconds, 3),
+                "calls": stand_in.calls,
+                "peak_mb": round(max(0, peak_rss - start_rss) / 1024 / 1024, 1),
+            }
+        )
+    except Exception as err:
+        sender.send(err)
+
+
+def _current_rss() -> int:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * resource.getpagesize()
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> List[str]:
+    if not baseline:
+        return []
+    failures = []
+    if result["calls"] > baseline["calls"]:
+        failures.append(
+            "%s made %d calls (baseline %d)"
+            % (name, result["calls"], baseline["calls"])
+        )
+    for metric in ("seconds", "peak_mb"):
+        # ignore noise on operations that are too small to measure reliably
+        allowed = max(baseline[metric] * (1 + tolerance), baseline[metric] + 0.05)
+        if result[metric] > allowed:
+            failures.append(
+                "%s %s %.3f (baseline %.3f)"
+                % (name, metric, result[metric], baseline[metric])
+            )
+    return failures
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES) as file:
+        return json.load(file)
+
+
+def setup_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "-s",
+        "--scale",
+        help="size of the synthetic account - baselines only apply at 1",
+        type=float,
+        default=1,
+    )
+    parser.add_argument(
+        "-l",
+        "--latency",
+        help="seconds every API call takes - baselines only apply at 0",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-o", "--only", help="run benchmarks whose name contains these", nargs="*"
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        help="allowed slowdown / memory growth over baseline, 0.5 = 50%%",
+        type=float,
+        default=0.5,
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        help="runs of a benchmark under a second, the fastest counts",
+        type=int,
+        default=5,
+    )
+    parser.add_argument("-u", "--update-baselines", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,808 @@
+"""
+Stand In
+
+A synthetic AWS account that answers requests locally. It hooks botocore's
+before-send event, so requests still go through serialization, the client
+hooks (throttling, cache, metrics) and response parsing - only the network
+round trip is replaced, by StandIn.latency seconds of sleep when it is set.
+"""
+
+import base64
+import json
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs
+
+from botocore.awsrequest import AWSResponse
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+
+
+class RawBody:
+    """
+    Minimal stand in for the urllib3 response botocore reads the body from
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class StandIn:
+    # real seconds a crawl or job run takes per second of its synthetic runtime
+    time_scale: float = 0.0001
+    # account quota on crawls running at once
+    max_concurrent_crawlers: int = 25
+    # real seconds every request waits before it is answered, like a round trip
+    latency: float = 0.0
+
+    def __init__(
+        self,
+        parameters: int = 100_000,
+        crawlers: int = 5_000,
+        state_machines: int = 2_000,
+        log_streams: int = 1_000,
+        log_events: int = 10_000,
+        users: int = 5_000,
+        partitions: int = 50_000,
+        jobs: int = 50,
+        seed: int = 42,
+    ):
+        self.random = random.Random(seed)
+        self.calls: int = 0
+        self.calls_by_operation: Dict[str, int] = {}
+        self.parameters: Dict[str, dict] = self._build_parameters(parameters)
+        self.crawlers: Dict[str, dict] = self._build_crawlers(crawlers)
+        self.state_machines: List[dict] = self._build_state_machines(state_machines)
+        self.log_streams: List[dict] = self._build_log_streams(log_streams)
+        self.log_events = log_events
+        self.users = users
+        # every partition belongs to the lake_db.events table
+        self.partitions: List[dict] = self._build_partitions(partitions)
+        self.jobs: Dict[str, dict] = self._build_jobs(jobs)
+        # (state machine arn, execution name) -> (input, StartExecution response)
+        self.executions: Dict[Tuple[str, str], Tuple[str, dict]] = {}
+        # job name -> its runs, newest first
+        self.job_runs: Dict[str, List[dict]] = {}
+        # run id -> monotonic time the run ends
+        self._job_run_ends: Dict[str, float] = {}
+        self._queries: Dict[str, List[dict]] = {}
+        # crawler name -> monotonic time its crawl finishes
+        self._crawls: Dict[str, float] = {}
+
+    def attach(self, client):
+        """
+        Answer every request client sends from this account
+        """
+        client.meta.events.register(
+            "before-send", self._handle, unique_id="aws-tools-stand-in"
+        )
+
+    def reset_counts(self):
+        self.calls = 0
+        self.calls_by_operation = {}
+
+    def _handle(self, request, **kwargs) -> AWSResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        operation, params = self._parse_request(request)
+        self.calls += 1
+        self.calls_by_operation[operation] = (
+            self.calls_by_operation.get(operation, 0) + 1
+        )
+        handler: Callable = getattr(self, "_" + operation, None)
+        if handler is None:
+            status, body = self._json_error(
+                "InvalidAction", "%s is not supported by the stand in" % operation
+            )
+        else:
+            status, body = handler(params)
+        return AWSResponse(request.url, status, {}, RawBody(body))
+
+    def _parse_request(self, request) -> Tuple[str, dict]:
+        target = request.headers.get("X-Amz-Target")
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if target:
+            operation = target.decode("utf-8").split(".")[-1]
+            return operation, json.loads(body or b"{}")
+        # query protocol (IAM, EC2)
+        query = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+        return query.pop("Action"), query
+
+    def _json(self, payload: dict) -> Tuple[int, bytes]:
+        return 200, json.dumps(payload, default=self._timestamp).encode("utf-8")
+
+    def _json_error(self, code: str, message: str) -> Tuple[int, bytes]:
+        return 400, json.dumps({"__type": code, "message": message}).encode("utf-8")
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        return value.timestamp()
+
+    @staticmethod
+    def _page(items: list, params: dict, default_size: int, token: str = "NextToken"):
+        start = int(params.get(token) or 0)
+        size = int(params.get("MaxResults") or params.get("maxResults") or default_size)
+        page = items[start : start + size]
+        next_token = str(start + size) if start + size < len(items) else None
+        return page, next_token
+
+    # ---- SSM ----
+
+    def _build_parameters(self, count: int) -> Dict[str, dict]:
+        types = ["String", "StringList", "SecureString"]
+        parameters = {}
+        for i in range(count):
+            name = "/%s/app%03d/key%06d" % (
+                ("dev", "stg", "prod")[i % 3],
+                (i // 3) % 200,
+                i,
+            )
+            parameters[name] = {
+                "Name": name,
+                "Type": types[i % 3],
+                "Value": "value-%d-%s" % (i, "x" * self.random.randint(8, 64)),
+                "Version": 1 + i % 7,
+                "LastModifiedDate": EPOCH + timedelta(minutes=i),
+                "ARN": "arn:aws:ssm:%s:%s:parameter%s" % (REGION, ACCOUNT_ID, name),
+                "DataType": "text",
+            }
+        return parameters
+
+    def _filter_parameters(self, params: dict) -> List[dict]:
+        # every page of a listing filters the same way - only do it once
+        query = json.dumps(
+            [params.get(k) for k in ("ParameterFilters", "Path", "Recursive")]
+        )
+        if query not in self._queries:
+            parameters = list(self.parameters.values())
+            for parameter_filter in params.get("ParameterFilters", []):
+                if parameter_filter["Key"] == "Name":
+                    values = parameter_filter["Values"]
+                    parameters = [
+                        p for p in parameters if any(v in p["Name"] for v in values)
+                    ]
+                elif parameter_filter["Key"] == "Path":
+                    path = parameter_filter["Values"][0].rstrip("/") + "/"
+                    recursive = parameter_filter.get("Option") == "Recursive"
+                    parameters = [
+                        p
+                        for p in parameters
+                        if p["Name"].startswith(path)
+                        and (recursive or "/" not in p["Name"][len(path) :])
+                    ]
+            if "Path" in params:
+                path = params["Path"].rstrip("/") + "/"
+                parameters = [
+                    p
+                    for p in parameters
+                    if p["Name"].startswith(path)
+                    and (params.get("Recursive") or "/" not in p["Name"][len(path) :])
+                ]
+            self._queries[query] = parameters
+        return self._queries[query]
+
+    def _DescribeParameters(self, params: dict):
+        page, next_token = self._page(self._filter_parameters(params), params, 50)
+        metadata = [
+            {k: v for k, v in p.items() if k not in ("Value", "ARN")} for p in page
+        ]
+        return self._json({"Parameters": metadata, "NextToken": next_token})
+
+    def _GetParametersByPath(self, params: dict):
+        page, next_token = self._page(self._filter_parameters(params), params, 10)
+        return self._json({"Parameters": page, "NextToken": next_token})
+
+    def _GetParameter(self, params: dict):
+        parameter = self.parameters.get(params["Name"])
+        if parameter is None:
+            return self._json_error("ParameterNotFound", params["Name"])
+        return self._json({"Parameter": parameter})
+
+    def _GetParameters(self, params: dict):
+        found = [self.parameters[n] for n in params["Names"] if n in self.parameters]
+        invalid = [n for n in params["Names"] if n not in self.parameters]
+        return self._json({"Parameters": found, "InvalidParameters": invalid})
+
+    def _PutParameter(self, params: dict):
+        name = params["Name"]
+        existing = self.parameters.get(name)
+        if existing and not params.get("Overwrite"):
+            return self._json_error("ParameterAlreadyExists", name)
+        version = existing["Version"] + 1 if existing else 1
+        if not existing:
+            self._queries = {}
+        self.parameters[name] = {
+            "Name": name,
+            "Type": params["Type"],
+            "Value": params["Value"],
+            "Version": version,
+            "LastModifiedDate": datetime.now(timezone.utc),
+            "ARN": "arn:aws:ssm:%s:%s:parameter%s" % (REGION, ACCOUNT_ID, name),
+            "DataType": params.get("DataType", "text"),
+        }
+        return self._json({"Version": version, "Tier": "Standard"})
+
+    def _GetParameterHistory(self, params: dict):
+        parameter = self.parameters.get(params["Name"])
+        if parameter is None:
+            return self._json_error("ParameterNotFound", params["Name"])
+        history = [
+            {
+                **{k: v for k, v in parameter.items() if k != "ARN"},
+                "Version": version,
+                "Value": "%s-v%d" % (parameter["Value"], version),
+                "LastModifiedDate": parameter["LastModifiedDate"]
+                - timedelta(days=parameter["Version"] - version),
+                "LastModifiedUser": "arn:aws:iam::%s:user/dev%d"
+                % (ACCOUNT_ID, version % 5),
+                "Labels": [],
+            }
+            for version in range(1, parameter["Version"] + 1)
+        ]
+        history[-1]["Value"] = parameter["Value"]
+        page, next_token = self._page(history, params, 50)
+        return self._json({"Parameters": page, "NextToken": next_token})
+
+    def _DeleteParameters(self, params: dict):
+        deleted = [n for n in params["Names"] if self.parameters.pop(n, None)]
+        invalid = [n for n in params["Names"] if n not in deleted]
+        self._queries = {}
+        return self._json({"DeletedParameters": deleted, "InvalidParameters": invalid})
+
+    # ---- Glue ----
+
+    def _build_crawlers(self, count: int) -> Dict[str, dict]:
+        crawlers = {}
+        for i in range(count):
+            environment = ("dev", "stg", "prod")[i % 3]
+            name = "%s-crawler-%05d" % (environment, i)
+            crawlers[name] = {
+                "Name": name,
+                "Role": "arn:aws:iam::%s:role/glue-crawler" % ACCOUNT_ID,
+                "Targets": {
+                    "S3Targets": [
+                        {"Path": "s3://%s-lake/table_%05d/" % (environment, i)}
+                    ]
+                },
+                "DatabaseName": "%s_db_%02d" % (environment, i % 20),
+                "Classifiers": [],
+                "SchemaChangePolicy": {
+                    "UpdateBehavior": "UPDATE_IN_DATABASE",
+                    "DeleteBehavior": "LOG",
+                },
+                "State": ("READY", "READY", "RUNNING", "STOPPING")[i % 4],
+                "CrawlElapsedTime": 0,
+                "CreationTime": EPOCH,
+                "LastUpdated": EPOCH + timedelta(days=i % 30),
+                "LastCrawl": {
+                    "Status": "SUCCEEDED",
+                    "LogGroup": "/aws-glue/crawlers",
+                    "StartTime": EPOCH + timedelta(days=30),
+                },
+                "Schedule": {
+                    "ScheduleExpression": "cron(0 %d * * ? *)" % (i % 24),
+                    "State": "SCHEDULED",
+                },
+                "Version": 1,
+                "Configuration": '{"Version":1.0}',
+            }
+        return crawlers
+
+    @staticmethod
+    def _crawler_runtime(name: str) -> float:
+        # a spread from a minute to an hour, fixed per crawler
+        return 60.0 + int(name.rsplit("-", 1)[-1]) * 7919 % 3540
+
+    def _finish_crawls(self):
+        now = time.monotonic()
+        for name, finish in list(self._crawls.items()):
+            if finish <= now:
+                del self._crawls[name]
+                self.crawlers[name]["State"] = "READY"
+
+    def _StartCrawler(self, params: dict):
+        self._finish_crawls()
+        crawler = self.crawlers.get(params["Name"])
+        if crawler is None:
+            return self._json_error("EntityNotFoundException", params["Name"])
+        if crawler["State"] != "READY":
+            return self._json_error("CrawlerRunningException", params["Name"])
+        if len(self._crawls) >= StandIn.max_concurrent_crawlers:
+            return self._json_error(
+                "ConcurrentRunsExceededException", "Too many crawlers running"
+            )
+        crawler["State"] = "RUNNING"
+        crawler["LastCrawl"] = {
+            "Status": "SUCCEEDED",
+            "LogGroup": "/aws-glue/crawlers",
+            "StartTime": datetime.now(timezone.utc),
+        }
+        self._crawls[crawler["Name"]] = (
+            time.monotonic()
+            + self._crawler_runtime(crawler["Name"]) * StandIn.time_scale
+        )
+        return self._json({})
+
+    def _GetCrawlerMetrics(self, params: dict):
+        names = params.get("CrawlerNameList") or list(self.crawlers)
+        metrics = [
+            {
+                "CrawlerName": name,
+                "TimeLeftSeconds": 0.0,
+                "StillEstimating": False,
+                "LastRuntimeSeconds": self._crawler_runtime(name),
+                "MedianRuntimeSeconds": self._crawler_runtime(name),
+                "TablesCreated": 0,
+                "TablesUpdated": 1,
+                "TablesDeleted": 0,
+            }
+            for name in names
+            if name in self.crawlers
+        ]
+        page, next_token = self._page(metrics, params, 200)
+        return self._json({"CrawlerMetricsList": page, "NextToken": next_token})
+
+    def _ListCrawlers(self, params: dict):
+        names = list(self.crawlers)
+        if params.get("Tags"):
+            # crawlers are tagged with their environment
+            names = [
+                name
+                for name in names
+                if params["Tags"] == {"environment": name.split("-")[0]}
+            ]
+        page, next_token = self._page(names, params, 100)
+        return self._json({"CrawlerNames": page, "NextToken": next_token})
+
+    def _GetCrawlers(self, params: dict):
+        self._finish_crawls()
+        page, next_token = self._page(list(self.crawlers.values()), params, 100)
+        return self._json({"Crawlers": page, "NextToken": next_token})
+
+    def _BatchGetCrawlers(self, params: dict):
+        names = params["CrawlerNames"]
+        if not 1 <= len(names) <= 25:
+            return self._json_error(
+                "InvalidInputException",
+                "Number of requested crawlers must be between 1 and 25",
+            )
+        self._finish_crawls()
+        found = [self.crawlers[name] for name in names if name in self.crawlers]
+        missing = [name for name in names if name not in self.crawlers]
+        return self._json({"Crawlers": found, "CrawlersNotFound": missing})
+
+    def _build_partitions(self, count: int) -> List[dict]:
+        partitions = []
+        for i in range(count):
+            dt = (EPOCH + timedelta(days=i // 24)).strftime("%Y-%m-%d")
+            hour = "%02d" % (i % 24)
+            partitions.append(
+                {
+                    "Values": [dt, hour],
+                    "DatabaseName": "lake_db",
+                    "TableName": "events",
+                    "CreationTime": EPOCH + timedelta(hours=i),
+                    "StorageDescriptor": {
+                        "Location": "s3://prod-lake/events/dt=%s/hour=%s/" % (dt, hour),
+                        "InputFormat": "org.apache.hadoop.mapred.TextInputFormat",
+                        "OutputFormat": "org.apache.hadoop.hive.ql.io."
+                        "HiveIgnoreKeyTextOutputFormat",
+                        "SerdeInfo": {
+                            "SerializationLibrary": "org.openx.data.jsonserde.JsonSerDe"
+                        },
+                    },
+                    "Parameters": {
+                        "recordCount": str(1000 + i % 97),
+                        "sizeKey": str(250_000 + i % 89 * 1000),
+                        "classification": "json",
+                    },
+                }
+            )
+        return partitions
+
+    def _GetTable(self, params: dict):
+        if (params["DatabaseName"], params["Name"]) != ("lake_db", "events"):
+            return self._json_error("EntityNotFoundException", params["Name"])
+        return self._json(
+            {
+                "Table": {
+                    "Name": "events",
+                    "DatabaseName": "lake_db",
+                    "PartitionKeys": [
+                        {"Name": "dt", "Type": "string"},
+                        {"Name": "hour", "Type": "string"},
+                    ],
+                }
+            }
+        )
+
+    def _filter_partitions(self, expression: str) -> List[dict]:
+        """
+        Partitions matching expression - only "key op 'value' AND ..." is
+        understood
+        """
+        operators: Dict[str, Callable] = {
+            "=": str.__eq__,
+            "!=": str.__ne__,
+            "<": str.__lt__,
+            "<=": str.__le__,
+            ">": str.__gt__,
+            ">=": str.__ge__,
+        }
+        conditions = []
+        for clause in re.split(r"\s+AND\s+", expression, flags=re.IGNORECASE):
+            match = re.fullmatch(
+                r"\s*(dt|hour)\s*(<=|>=|!=|=|<|>)\s*'([^']*)'\s*", clause
+            )
+            if not match:
+                raise ValueError(clause)
+            key, operator, value = match.groups()
+            conditions.append((("dt", "hour").index(key), operators[operator], value))
+        return [
+            partition
+            for partition in self.partitions
+            if all(
+                compare(partition["Values"][index], value)
+                for index, compare, value in conditions
+            )
+        ]
+
+    def _GetPartitions(self, params: dict):
+        if (params["DatabaseName"], params["TableName"]) != ("lake_db", "events"):
+            return self._json_error("EntityNotFoundException", params["TableName"])
+        expression = params.get("Expression") or ""
+        query = "partitions:" + expression
+        if query not in self._queries:
+            try:
+                self._queries[query] = (
+                    self._filter_partitions(expression)
+                    if expression
+                    else self.partitions
+                )
+            except ValueError as err:
+                return self._json_error(
+                    "InvalidInputException", "Unsupported expression: %s" % err
+                )
+        partitions = self._queries[query]
+        segment = params.get("Segment")
+        if segment:
+            total = len(partitions)
+            number, segments = segment["SegmentNumber"], segment["TotalSegments"]
+            partitions = partitions[
+                number * total // segments : (number + 1) * total // segments
+            ]
+        page, next_token = self._page(partitions, params, 1000)
+        if not params.get("ExcludeColumnSchema"):
+            columns = [{"Name": "event", "Type": "string"}]
+            page = [
+                dict(
+                    partition,
+                    StorageDescriptor=dict(
+                        partition["StorageDescriptor"], Columns=columns
+                    ),
+                )
+                for partition in page
+            ]
+        return self._json({"Partitions": page, "NextToken": next_token})
+
+    def _build_jobs(self, count: int) -> Dict[str, dict]:
+        jobs = {}
+        for i in range(count):
+            name = "etl-job-%03d" % i
+            jobs[name] = {
+                "Name": name,
+                "Role": "arn:aws:iam::%s:role/glue-job" % ACCOUNT_ID,
+                "Command": {
+                    "Name": "glueetl",
+                    "ScriptLocation": "s3://etl/%s.py" % name,
+                },
+                "ExecutionProperty": {"MaxConcurrentRuns": 1 + i % 3},
+                "WorkerType": "G.1X",
+                "NumberOfWorkers": 2 + i % 5,
+                "GlueVersion": "4.0",
+                "CreatedOn": EPOCH,
+                "LastModifiedOn": EPOCH,
+            }
+        return jobs
+
+    def _job_runtime(self, name: str, arguments: dict) -> float:
+        # a few minutes to half an hour, fixed per job and arguments
+        key = name + json.dumps(arguments, sort_keys=True)
+        return 120.0 + sum(key.encode("utf-8")) * 31 % 1680
+
+    def _finish_job_runs(self):
+        now = time.monotonic()
+        for run_id, end in list(self._job_run_ends.items()):
+            if end > now:
+                continue
+            del self._job_run_ends[run_id]
+            job_name = run_id.split(":")[0]
+            for job_run in self.job_runs[job_name]:
+                if job_run["Id"] == run_id:
+                    runtime = int(job_run.pop("_Runtime"))
+                    job_run["JobRunState"] = (
+                        "FAILED" if job_run["Arguments"].get("--fail") else "SUCCEEDED"
+                    )
+                    job_run["CompletedOn"] = job_run["StartedOn"] + timedelta(
+                        seconds=runtime
+                    )
+                    job_run["ExecutionTime"] = runtime
+
+    def _BatchGetJobs(self, params: dict):
+        names = params["JobNames"]
+        return self._json(
+            {
+                "Jobs": [self.jobs[name] for name in names if name in self.jobs],
+                "JobsNotFound": [name for name in names if name not in self.jobs],
+            }
+        )
+
+    def _StartJobRun(self, params: dict):
+        self._finish_job_runs()
+        job = self.jobs.get(params["JobName"])
+        if job is None:
+            return self._json_error("EntityNotFoundException", params["JobName"])
+        runs = self.job_runs.setdefault(job["Name"], [])
+        active = [run for run in runs if run["JobRunState"] == "RUNNING"]
+        if len(active) >= job["ExecutionProperty"]["MaxConcurrentRuns"]:
+            return self._json_error(
+                "ConcurrentRunsExceededException",
+                "Concurrent runs exceeded for %s" % job["Name"],
+            )
+        arguments = params.get("Arguments", {})
+        run_id = "%s:jr_%06d" % (job["Name"], len(runs))
+        runtime = self._job_runtime(job["Name"], arguments)
+        runs.insert(
+            0,
+            {
+                "Id": run_id,
+                "JobName": job["Name"],
+                "Arguments": arguments,
+                "JobRunState": "RUNNING",
+                "StartedOn": datetime.now(timezone.utc),
+                "WorkerType": job["WorkerType"],
+                "NumberOfWorkers": job["NumberOfWorkers"],
+                "_Runtime": runtime,
+            },
+        )
+        self._job_run_ends[run_id] = time.monotonic() + runtime * StandIn.time_scale
+        return self._json({"JobRunId": run_id})
+
+    def _GetJobRuns(self, params: dict):
+        self._finish_job_runs()
+        runs = [
+            {key: value for key, value in run.items() if not key.startswith("_")}
+            for run in self.job_runs.get(params["JobName"], [])
+        ]
+        page, next_token = self._page(runs, params, 100)
+        return self._json({"JobRuns": page, "NextToken": next_token})
+
+    def _GetJobRun(self, params: dict):
+        self._finish_job_runs()
+        for run in self.job_runs.get(params["JobName"], []):
+            if run["Id"] == params["RunId"]:
+                return self._json(
+                    {
+                        "JobRun": {
+                            key: value
+                            for key, value in run.items()
+                            if not key.startswith("_")
+                        }
+                    }
+                )
+        return self._json_error("EntityNotFoundException", params["RunId"])
+
+    # ---- Step Functions ----
+
+    def _build_state_machines(self, count: int) -> List[dict]:
+        return [
+            {
+                "stateMachineArn": "arn:aws:states:%s:%s:stateMachine:sm-%05d"
+                % (REGION, ACCOUNT_ID, i),
+                "name": "sm-%05d" % i,
+                "type": ("STANDARD", "EXPRESS")[i % 2],
+                "creationDate": EPOCH + timedelta(hours=i),
+            }
+            for i in range(count)
+        ]
+
+    def _ListStateMachines(self, params: dict):
+        page, next_token = self._page(self.state_machines, params, 100, "nextToken")
+        return self._json({"stateMachines": page, "nextToken": next_token})
+
+    def _DescribeStateMachine(self, params: dict):
+        for state_machine in self.state_machines:
+            if state_machine["stateMachineArn"] == params["stateMachineArn"]:
+                return self._json(
+                    {
+                        **state_machine,
+                        "definition": "{}",
+                        "roleArn": "",
+                        "status": "ACTIVE",
+                    }
+                )
+        return self._json_error("StateMachineDoesNotExist", params["stateMachineArn"])
+
+    def _StartExecution(self, params: dict):
+        arn = params["stateMachineArn"]
+        name = params.get("name") or "execution-%d" % len(self.executions)
+        if not any(sm["stateMachineArn"] == arn for sm in self.state_machines):
+            return self._json_error("StateMachineDoesNotExist", arn)
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,80}", name):
+            return self._json_error("InvalidName", name)
+        execution_input = params.get("input", "{}")
+        existing = self.executions.get((arn, name))
+        if existing is not None:
+            # idempotent for the same input, an error for another one
+            if existing[0] != execution_input:
+                return self._json_error("ExecutionAlreadyExists", name)
+            return self._json(existing[1])
+        response = {
+            "executionArn": "%s:%s"
+            % (arn.replace(":stateMachine:", ":execution:"), name),
+            "startDate": datetime.now(timezone.utc),
+        }
+        self.executions[(arn, name)] = (execution_input, response)
+        return self._json(response)
+
+    # ---- CloudWatch Logs ----
+
+    def _build_log_streams(self, count: int) -> List[dict]:
+        names = ["2020/01/01/[$LATEST]%032x" % i for i in range(count)]
+        return [
+            {
+                "logStreamName": names[i],
+                "creationTime": 1577836800000 + i * 1000,
+                "firstEventTimestamp": 1577836800000 + i * 1000,
+                "lastEventTimestamp": 1577836900000 + i * 1000,
+                "lastIngestionTime": 1577836900000 + i * 1000,
+                "uploadSequenceToken": "%056d" % i,
+                "arn": "arn:aws:logs:%s:%s:log-group:/aws/lambda/app:log-stream:%s"
+                % (REGION, ACCOUNT_ID, names[i]),
+                "storedBytes": 0,
+            }
+            for i in range(count)
+        ]
+
+    def _DescribeLogStreams(self, params: dict):
+        streams = self.log_streams
+        if params.get("descending"):
+            streams = list(reversed(streams))
+        page, next_token = self._page(streams, {"MaxResults": params.get("limit")}, 50)
+        return self._json({"logStreams": page, "nextToken": next_token})
+
+    def _GetLogEvents(self, params: dict):
+        # a single GetLogEvents page holds at most 10,000 events
+        events = [
+            {
+                "timestamp": 1577836800000 + i,
+                "message": "START RequestId: %08x processed %d records" % (i, i % 97),
+                "ingestionTime": 1577836800000 + i,
+            }
+            for i in range(min(self.log_events, 10_000))
+        ]
+        return self._json(
+            {
+                "events": events,
+                "nextForwardToken": "f/%d" % len(events),
+                "nextBackwardToken": "b/0",
+            }
+        )
+
+    # ---- IAM ----
+
+    def _GetCredentialReport(self, params: dict):
+        columns = [
+            "user",
+            "arn",
+            "user_creation_time",
+            "password_enabled",
+            "password_last_used",
+            "password_last_changed",
+            "password_next_rotation",
+            "mfa_active",
+            "access_key_1_active",
+            "access_key_1_last_rotated",
+            "access_key_1_last_used_date",
+            "access_key_1_last_used_region",
+            "access_key_1_last_used_service",
+            "access_key_2_active",
+            "access_key_2_last_rotated",
+            "access_key_2_last_used_date",
+            "access_key_2_last_used_region",
+            "access_key_2_last_used_service",
+            "cert_1_active",
+            "cert_1_last_rotated",
+            "cert_2_active",
+            "cert_2_last_rotated",
+        ]
+        rows = [",".join(columns)]
+        for i in range(self.users):
+            when = (EPOCH + timedelta(days=i % 365)).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+            rows.append(
+                ",".join(
+                    [
+                        "user-%05d" % i,
+                        "arn:aws:iam::%s:user/user-%05d" % (ACCOUNT_ID, i),
+                        when,
+                        "true",
+                        when if i % 5 else "no_information",
+                        when,
+                        "N/A" if i % 7 else when,
+                        "true",
+                        "true",
+                        when,
+                        when,
+                        REGION,
+                        "s3",
+                        "false",
+                        "N/A",
+                        "N/A",
+                        "N/A",
+                        "N/A",
+                        "false",
+                        "N/A",
+                        "false",
+                        "N/A",
+                    ]
+                )
+            )
+        content = base64.b64encode("\n".join(rows).encode("utf-8")).decode("ascii")
+        body = (
+            '<GetCredentialReportResponse xmlns="https://iam.amazonaws.com/doc/2010-05-08/">'
+            "<GetCredentialReportResult><Content>%s</Content>"
+            "<ReportFormat>text/csv</ReportFormat>"
+            "<GeneratedTime>2020-06-01T00:00:00Z</GeneratedTime>"
+            "</GetCredentialReportResult>"
+            "<ResponseMetadata><RequestId>stand-in</RequestId></ResponseMetadata>"
+            "</GetCredentialReportResponse>" % content
+        )
+        return 200, body.encode("utf-8")
+
+    # ---- EC2 ----
+
+    def _DescribeSecurityGroups(self, params: dict):
+        names = [v for k, v in sorted(params.items()) if k.startswith("GroupName.")]
+        items = "".join(
+            "<item><ownerId>%s</ownerId><groupId>sg-%08x</groupId>"
+            "<groupName>%s</groupName><groupDescription>%s</groupDescription>"
+            "<vpcId>vpc-00000001</vpcId><ipPermissions><item>"
+            "<ipProtocol>tcp</ipProtocol><fromPort>443</fromPort><toPort>443</toPort>"
+            "<ipRanges><item><cidrIp>10.0.0.0/8</cidrIp></item></ipRanges>"
+            "</item></ipPermissions><ipPermissionsEgress/></item>"
+            % (ACCOUNT_ID, i, name, name)
+            for i, name in enumerate(names)
+        )
+        body = (
+            '<DescribeSecurityGroupsResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+            "<requestId>stand-in</requestId>"
+            "<securityGroupInfo>%s</securityGroupInfo>"
+            "</DescribeSecurityGroupsResponse>" % items
+        )
+        return 200, body.encode("utf-8")
+
+    def _DescribeRegions(self, params: dict):
+        # the default regions only - none of the opt-in ones are enabled
+        items = "".join(
+            "<item><regionName>%s</regionName>"
+            "<regionEndpoint>ec2.%s.amazonaws.com</regionEndpoint>"
+            "<optInStatus>opt-in-not-required</optInStatus></item>" % (region, region)
+            for region in ("us-east-1", "us-east-2", "us-west-2", "eu-west-1")
+        )
+        body = (
+            '<DescribeRegionsResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+            "<requestId>stand-in</requestId>"
+            "<regionInfo>%s</regionInfo>"
+            "</DescribeRegionsResponse>" % items
+        )
+        return 200, body.encode("utf-8")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark - startup cost of every aws-*.py entry point
+
+Runs each script with --help and with a bad argument under `python -X importtime`.
+Exits non-zero when a heavy module is imported before a command needs it or the
+fastest of --runs runs takes longer than the time budget over a bare
+interpreter start.
+    python -m benchmarks.startup --budget-ms 150 --runs 5
+"""
+
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from file_finder import FileFinder
+
+HEAVY_MODULES = ("boto3", "botocore", "tabulate", "pandas", "numpy", "pytz")
+SCENARIOS = {"help": ["--help"], "bad-argument": ["--no-such-argument"]}
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def main():
+    args = setup_args()
+
+    baseline = min(run_python(["-c", "pass"])[0] for _ in range(args.runs))
+    print("bare interpreter: %.1f ms\n" % (baseline * 1000))
+
+    failures: List[str] = []
+    print("%-48s %-13s %9s %9s" % ("script", "scenario", "extra ms", "import ms"))
+    for script in entry_points():
+        for scenario, script_args in SCENARIOS.items():
+            # the fastest run - a single one is at the mercy of whatever
+            # else the machine is doing
+            wall, imports = min(
+                (run_python([script] + script_args) for _ in range(args.runs)),
+                key=lambda run: run[0],
+            )
+            extra_ms = (wall - baseline) * 1000
+            import_ms = sum(cumulative for _, cumulative in imports.values()) / 1000
+            print(
+                "%-48s %-13s %9.1f %9.1f"
+                % (os.path.basename(script), scenario, extra_ms, import_ms)
+            )
+
+            heavy = sorted(
+                name for name in imports if name.split(".")[0] in HEAVY_MODULES
+            )
+            if heavy:
+                failures.append(
+                    "%s %s imported %s"
+                    % (os.path.basename(script), scenario, ", ".join(heavy[:5]))
+                )
+            if extra_ms > args.budget_ms:
+                failures.append(
+                    "%s %s took %.1f ms (budget %d ms)"
+                    % (os.path.basename(script), scenario, extra_ms, args.budget_ms)
+                )
+
+    if failures:
+        print("\nStartup regressions:")
+        for failure in failures:
+            print("  %s" % failure)
+        sys.exit(1)
+
+
+def entry_points() -> List[str]:
+    return sorted(glob.glob(FileFinder.resolve("aws-*.py")))
+
+
+def run_python(python_args: List[str]) -> Tuple[float, Dict]:
+    """
+    Run the interpreter and return its wall time and top level imports
+    as {module: (self_us, cumulative_us)}
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + python_args,
+        cwd=FileFinder.current_run_dir(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    wall = time.perf_counter() - start
+
+    imports: Dict[str, Tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # only count top level imports so cumulative times are not summed twice
+        if match and len(match.group(3)) == 1:
+            imports[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+        elif match:
+            imports.setdefault(match.group(4), (int(match.group(1)), 0))
+    return wall, imports
+
+
+def setup_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument(
+        "-b",
+        "--budget-ms",
+        help="max wall time per run on top of a bare interpreter start",
+        type=int,
+        default=150,
+    )
+    parser.add_argument(
+        "-r", "--runs", help="runs per script, the fastest counts", type=int, default=5
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
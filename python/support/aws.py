@@ -1,28 +1,198 @@
 """
 AWS
+
+boto3/botocore are imported on first use so scripts can parse arguments
+(and print --help) without paying for them.
 """
 
-from configparser import ConfigParser
-from pathlib import Path
-from typing import List
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-import boto3
+if TYPE_CHECKING:
+    import boto3
 
 
 class Aws:
-    aws_credentials = str(Path.home()) + "/" + ".aws/credentials"
+    aws_credentials = os.environ.get(
+        "AWS_SHARED_CREDENTIALS_FILE", os.path.expanduser("~/.aws/credentials")
+    )
+    aws_config = os.environ.get("AWS_CONFIG_FILE", os.path.expanduser("~/.aws/config"))
+
+    # clients are shared process-wide so every service object built for the
+    # same (profile, region, service, config) reuses one connection pool
+    max_pool_connections: int = 10
+    _lock = threading.RLock()
+    _sessions: Dict[str, boto3.session.Session] = {}
+    _clients: Dict[Tuple, boto3.client] = {}
+    # profile -> regions enabled for its account
+    _regions: Dict[str, List[str]] = {}
 
     @staticmethod
     def get_profiles() -> List[str]:
+        """
+        Profiles from the credentials and config files - the same ones
+        botocore's available_profiles finds, without importing botocore
+        """
+        from configparser import ConfigParser
+
+        credentials = ConfigParser()
+        credentials.read(Aws.aws_credentials)
         config = ConfigParser()
-        config.read(Aws.aws_credentials)
-        return config.sections()
+        config.read(Aws.aws_config)
+        profiles = credentials.sections()
+        for section in config.sections():
+            # config names profiles "profile NAME", except for default
+            name = (
+                section[len("profile ") :]
+                if section.startswith("profile ")
+                else section
+            )
+            if section == "default" or section.startswith("profile "):
+                profiles.append(name.strip())
+        return list(dict.fromkeys(profiles))
 
     @staticmethod
-    def create_client(profile_name: str, client_name: str) -> boto3.client:
-        session = Aws.create_session(profile_name)
-        return session.client(client_name)
+    def profile(profile_name: str) -> str:
+        """
+        argparse type for --profile - only reads the credentials file once parsing
+        gets to the profile argument
+        """
+        from support.cassette import Cassette
+
+        # replayed runs need no credentials, and the default profile may come
+        # from the environment, SSO or instance credentials instead of a file
+        if Cassette.replaying() or profile_name == "default":
+            return profile_name
+        profiles = Aws.get_profiles()
+        if profile_name not in profiles:
+            raise argparse.ArgumentTypeError(
+                "invalid profile '%s' (choose from %s)"
+                % (profile_name, ", ".join(profiles))
+            )
+        return profile_name
+
+    @staticmethod
+    def create_client(
+        profile_name: str,
+        client_name: str,
+        region_name: Optional[str] = None,
+        **config_options,
+    ) -> boto3.client:
+        """
+        Get the pooled client for profile/region/service, creating it on first use.
+        Every client is rate limited by the shared Throttling buckets.
+
+        config_options are passed to botocore Config, e.g. max_pool_connections=50
+        """
+        from support.cassette import Cassette
+        from support.metrics import Metrics
+        from support.response_cache import ResponseCache
+        from support.throttling import Throttling
+
+        options = {
+            "max_pool_connections": Aws.max_pool_connections,
+            "retries": {"max_attempts": Throttling.max_attempts},
+        }
+        options.update(config_options)
+        key = (profile_name, region_name, client_name, Aws._config_key(options))
+        client = Aws._clients.get(key)
+        if client is None:
+            with Aws._lock:
+                client = Aws._clients.get(key)
+                if client is None:
+                    from botocore.config import Config
+
+                    # Session.client() is not thread safe - only build under the lock
+                    session = Aws.create_session(profile_name)
+                    client = session.client(
+                        client_name,
+                        region_name=region_name,
+                        config=Config(**options),
+                    )
+                    Throttling.register(client, profile_name)
+                    # before-call stops at the first handler returning a response
+                    # - Metrics has to see calls the cassette replays
+                    Metrics.register(client)
+                    Cassette.register(client, profile_name)
+                    # a recording needs every response to come over the network
+                    if not Cassette.recording():
+                        ResponseCache.register(client, profile_name)
+                    Aws._clients[key] = client
+        return client
 
     @staticmethod
     def create_session(profile_name: str) -> boto3.session:
-        return boto3.Session(profile_name=profile_name)
+        session = Aws._sessions.get(profile_name)
+        if session is None:
+            with Aws._lock:
+                session = Aws._sessions.get(profile_name)
+                if session is None:
+                    import boto3
+                    from support.cassette import Cassette
+
+                    if Cassette.replaying():
+                        # the profile may not exist where a cassette is replayed
+                        session = boto3.Session(
+                            region_name=os.environ.get(
+                                "AWS_DEFAULT_REGION", "us-east-1"
+                            )
+                        )
+                    else:
+                        session = boto3.Session(profile_name=profile_name)
+                    Aws._sessions[profile_name] = session
+        return session
+
+    @staticmethod
+    def get_regions(profile_name: str, client_name: str = "ec2") -> List[str]:
+        """
+        Regions enabled for the profile's account that client_name is available
+        in - one DescribeRegions call per profile, opt-in regions the account
+        hasn't enabled are left out
+        """
+        regions = Aws._regions.get(profile_name)
+        if regions is None:
+            with Aws._lock:
+                regions = Aws._regions.get(profile_name)
+                if regions is None:
+                    session = Aws.create_session(profile_name)
+                    # DescribeRegions works from any region the account has
+                    ec2 = Aws.create_client(
+                        profile_name, "ec2", session.region_name or "us-east-1"
+                    )
+                    regions = sorted(
+                        region["RegionName"]
+                        for region in ec2.describe_regions()["Regions"]
+                    )
+                    Aws._regions[profile_name] = regions
+        if client_name == "ec2":
+            return regions
+        available = set(
+            Aws.create_session(profile_name).get_available_regions(client_name)
+        )
+        return [region for region in regions if region in available]
+
+    @staticmethod
+    def close():
+        """
+        Close every pooled client and forget all cached sessions
+        """
+        with Aws._lock:
+            for client in Aws._clients.values():
+                close = getattr(client, "close", None)
+                if close:
+                    close()
+                else:
+                    # older botocore has no BaseClient.close()
+                    client._endpoint.http_session.close()
+            Aws._clients.clear()
+            Aws._sessions.clear()
+            Aws._regions.clear()
+
+    @staticmethod
+    def _config_key(config_options: dict) -> Tuple:
+        # Config values can be dicts (retries, s3) so key on their repr
+        return tuple(sorted((k, repr(v)) for k, v in config_options.items()))
@@ -0,0 +1,37 @@
+"""
+Backoff
+
+When to try a start call again after a run quota refused it. Refusals while
+some of our own runs are going don't use up attempts - one of them ending
+frees a slot, however long that takes. Only refusals with none of ours
+running, when the quota is held by runs started elsewhere, count.
+"""
+
+import random
+from typing import Optional
+
+
+class QuotaBackoff:
+    """
+    Jittered exponential backoff - runs need .refusals and .attempts
+    """
+
+    def __init__(self, base: float, maximum: float, max_attempts: int):
+        self.base = base
+        self.maximum = maximum
+        self.max_attempts = max_attempts
+        self.random = random.Random()
+
+    def retry_in(self, run, own_running: bool) -> Optional[float]:
+        """
+        Seconds until a refused run is tried again - None once it used up
+        max_attempts
+        """
+        run.refusals += 1
+        if not own_running:
+            run.attempts += 1
+            if run.attempts >= self.max_attempts:
+                return None
+        backoff = min(self.maximum, self.base * 2 ** (run.refusals - 1))
+        # jittered so runs refused together don't retry together
+        return backoff * self.random.uniform(0.5, 1.0)
@@ -0,0 +1,250 @@
+"""
+Cassette
+
+Record the responses pooled clients get from AWS into a compressed cassette
+and replay them later without credentials or network, so any aws-*.py command
+can be profiled reproducibly against real page sizes and payloads.
+
+Set AWS_TOOLS_RECORD=<file.jsonl.gz> to record or AWS_TOOLS_REPLAY=<file> to
+replay; AWS_TOOLS_REPLAY_LATENCY=1 also sleeps for each recorded call's latency.
+Secrets (SecureString values, secret strings, credentials) are redacted from
+JSON and XML responses alike; streamed responses such as S3 objects aren't
+recorded.
+"""
+
+from __future__ import annotations
+
+import atexit
+import base64
+import collections
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class Cassette:
+    # request parameters that never get written - always redacted
+    redacted_request_keys = {"Value", "SecretString", "Password"}
+    # response fields that never get written
+    redacted_response_keys = {
+        "SecretString",
+        "SecretBinary",
+        "SecretAccessKey",
+        "SessionToken",
+        "Password",
+    }
+    redacted = "REDACTED"
+
+    mode: Optional[str] = None
+    path: Optional[str] = None
+    replay_latency: bool = False
+    _lock = threading.Lock()
+    _file = None
+    _sequence: int = 0
+    _recorded: Dict[str, Deque[dict]] = {}
+
+    @staticmethod
+    def from_environment():
+        if Cassette.mode:
+            return
+        if os.environ.get("AWS_TOOLS_RECORD"):
+            Cassette.record(os.environ["AWS_TOOLS_RECORD"])
+        elif os.environ.get("AWS_TOOLS_REPLAY"):
+            Cassette.replay(
+                os.environ["AWS_TOOLS_REPLAY"],
+                latency=os.environ.get("AWS_TOOLS_REPLAY_LATENCY", "") == "1",
+            )
+
+    @staticmethod
+    def record(path: str):
+        Cassette.mode = "record"
+        Cassette.path = path
+        Cassette._file = gzip.open(path, "wt", encoding="utf-8")
+        atexit.register(Cassette.close)
+        logger.info("Recording AWS responses to '%s'" % path)
+
+    @staticmethod
+    def replay(path: str, latency: bool = False):
+        Cassette.mode = "replay"
+        Cassette.path = path
+        Cassette.replay_latency = latency
+        Cassette._recorded = {}
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                Cassette._recorded.setdefault(entry["key"], collections.deque()).append(
+                    entry
+                )
+        logger.info("Replaying AWS responses from '%s'" % path)
+
+    @staticmethod
+    def replaying() -> bool:
+        Cassette.from_environment()
+        return Cassette.mode == "replay"
+
+    @staticmethod
+    def recording() -> bool:
+        Cassette.from_environment()
+        return Cassette.mode == "record"
+
+    @staticmethod
+    def close():
+        with Cassette._lock:
+            if Cassette._file:
+                Cassette._file.close()
+                Cassette._file = None
+
+    @staticmethod
+    def register(client: boto3.client, profile_name: str):
+        Cassette.from_environment()
+        if not Cassette.mode:
+            return
+        service_name = client.meta.service_model.service_name
+        protocol = client.meta.service_model.protocol
+
+        def build_key(params: dict, model, context: dict, **kwargs):
+            context["cassette_key"] = json.dumps(
+                [
+                    service_name,
+                    model.name,
+                    Cassette._redact(params, Cassette.redacted_request_keys),
+                ],
+                sort_keys=True,
+                default=str,
+            )
+            context["cassette_start"] = time.perf_counter()
+
+        def before_call(model, context: dict, **kwargs):
+            if Cassette.mode == "replay":
+                return Cassette._play(context["cassette_key"], protocol, model, context)
+
+        def after_call(http_response, model, context: dict, **kwargs):
+            # only record what came over the network
+            if Cassette.mode != "record" or http_response.url is None:
+                return
+            if model.has_streaming_output:
+                # reading the body here would take it from the caller
+                logger.warning("Not recording streamed %s response" % model.name)
+                return
+            Cassette._write(
+                context["cassette_key"],
+                service_name,
+                model.name,
+                profile_name,
+                client.meta.region_name,
+                http_response,
+                protocol,
+                time.perf_counter() - context["cassette_start"],
+            )
+
+        events = client.meta.events
+        events.register("before-parameter-build", build_key)
+        events.register("before-call", before_call)
+        events.register("after-call", after_call)
+
+    @staticmethod
+    def _write(
+        key: str,
+        service_name: str,
+        operation_name: str,
+        profile_name: str,
+        region_name: str,
+        http_response,
+        protocol: str,
+        seconds: float,
+    ):
+        body = Cassette._redact_body(http_response.content or b"", protocol)
+        with Cassette._lock:
+            Cassette._sequence += 1
+            entry = {
+                "key": key,
+                "sequence": Cassette._sequence,
+                "service": service_name,
+                "operation": operation_name,
+                "profile": profile_name,
+                "region": region_name,
+                "status": http_response.status_code,
+                "headers": {
+                    k: v
+                    for k, v in http_response.headers.items()
+                    if k.lower().startswith("content-")
+                },
+                "body": base64.b64encode(body).decode("ascii"),
+                "seconds": round(seconds, 4),
+            }
+            Cassette._file.write(json.dumps(entry) + "\n")
+
+    @staticmethod
+    def _play(key: str, protocol: str, model, context: dict):
+        from botocore import parsers
+        from botocore.awsrequest import AWSResponse
+
+        with Cassette._lock:
+            entries = Cassette._recorded.get(key)
+            if not entries:
+                raise ValueError(
+                    "No recorded response in '%s' for %s" % (Cassette.path, key)
+                )
+            # repeat the last response once a key runs out, e.g. status polling
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if Cassette.replay_latency:
+            time.sleep(entry["seconds"])
+        body = base64.b64decode(entry["body"])
+        parsed = parsers.create_parser(protocol).parse(
+            {
+                "status_code": entry["status"],
+                "headers": entry["headers"],
+                "body": body,
+                "context": context,
+            },
+            model.output_shape,
+        )
+        return AWSResponse(None, entry["status"], entry["headers"], None), parsed
+
+    @staticmethod
+    def _redact_body(body: bytes, protocol: str) -> bytes:
+        """
+        body with the redacted response fields replaced - JSON for json and
+        rest-json services, XML for query, ec2 and rest-xml ones
+        """
+        if not body:
+            return body
+        if protocol in ("json", "rest-json"):
+            return json.dumps(
+                Cassette._redact(json.loads(body), Cassette.redacted_response_keys)
+            ).encode("utf-8")
+        from xml.etree import ElementTree
+
+        root = ElementTree.fromstring(body)
+        for element in list(root.iter()):
+            # tags come with their namespace, e.g. {https://sts...}SessionToken
+            if element.tag.rsplit("}", 1)[-1] in Cassette.redacted_response_keys:
+                element[:] = []
+                element.text = Cassette.redacted
+        return ElementTree.tostring(root)
+
+    @staticmethod
+    def _redact(value: Any, keys: set) -> Any:
+        if isinstance(value, dict):
+            secure = value.get("Type") == "SecureString"
+            return {
+                k: (
+                    Cassette.redacted
+                    if k in keys or (secure and k == "Value")
+                    else Cassette._redact(v, keys)
+                )
+                for k, v in value.items()
+            }
+        if isinstance(value, list):
+            return [Cassette._redact(v, keys) for v in value]
+        return value
@@ -0,0 +1,94 @@
+"""
+Checkpoint
+
+Progress of a long running import kept in a small JSON file, so a crashed run
+can resume after the last row it finished instead of starting over. Rows that
+failed are kept by name so the next run can retry them.
+"""
+
+from collections import Counter
+import json
+import logging
+import os
+from typing import Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Rows of source finished so far plus per status counts - results need
+    .name and .status
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self.rows_done: int = 0
+        self.counts: Counter = Counter()
+        self.failed: List[str] = []
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            stored = json.load(file)
+        if stored["source"] != self._fingerprint():
+            raise ValueError(
+                "'%s' changed since checkpoint '%s' was written - rerun with "
+                "-r/--restart to discard the checkpoint and start over"
+                % (self.source, self.path)
+            )
+        self.rows_done = stored["rows_done"]
+        self.counts = Counter(stored["counts"])
+        self.failed = stored["failed"]
+        logger.info("Resuming '%s' after row %d" % (self.source, self.rows_done))
+
+    def advance(self, rows_done: int, results: Iterable):
+        for result in results:
+            self.counts[result.status] += 1
+            if result.status == "failed":
+                self.failed.append(result.name)
+        self.rows_done = rows_done
+        self.save()
+
+    def retried(self, results: Iterable):
+        """
+        Take the results of retrying failed rows - the ones that went through
+        no longer count as failed
+        """
+        for result in results:
+            if result.status == "failed" or result.name not in self.failed:
+                continue
+            self.failed.remove(result.name)
+            self.counts["failed"] -= 1
+            self.counts[result.status] += 1
+        self.save()
+
+    def save(self):
+        stored = {
+            "source": self._fingerprint(),
+            "rows_done": self.rows_done,
+            "counts": self.counts,
+            "failed": self.failed,
+        }
+        # a crash mid write must leave the previous checkpoint intact
+        temporary = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(temporary, "w") as file:
+            json.dump(stored, file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.rows_done = 0
+        self.counts = Counter()
+        self.failed = []
+
+    def _fingerprint(self) -> dict:
+        stat = os.stat(self.source)
+        return {
+            "path": os.path.abspath(self.source),
+            "size": stat.st_size,
+            "mtime": int(stat.st_mtime),
+        }
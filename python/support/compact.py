@@ -0,0 +1,65 @@
+"""
+Compact
+
+Helpers for model classes that get built by the hundred thousand - repeated
+strings are interned, ARNs share an interned prefix and nested response fields
+are kept pickled until they are first read.
+"""
+
+import pickle
+import sys
+from typing import Any, Optional
+
+
+class Compact:
+    """
+    Base for __slots__ model classes
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def intern(value: Optional[str]) -> Optional[str]:
+        return sys.intern(value) if isinstance(value, str) else value
+
+    @staticmethod
+    def arn_prefix(arn: Optional[str], name: str) -> Optional[str]:
+        """
+        Interned ARN without its trailing name when it ends with name - None
+        when it doesn't and the whole ARN has to be kept
+        """
+        if arn and name and arn.endswith(name):
+            return sys.intern(arn[: -len(name)])
+        return None
+
+    @staticmethod
+    def pack(value: Any) -> Optional[bytes]:
+        # one bytes object instead of a tree of small dicts and lists
+        return None if value is None else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def unpack(blob: Optional[bytes]) -> Any:
+        return None if blob is None else pickle.loads(blob)
+
+
+class Packed:
+    """
+    Nested response field of a Compact class kept pickled in slot until the
+    first read - the decoded value then takes its place, so changes made to
+    it stick like they would on a plain attribute
+    """
+
+    def __init__(self, slot: str):
+        self.slot = slot
+
+    def __get__(self, instance: Optional[Compact], owner: type) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if isinstance(value, bytes):
+            value = Compact.unpack(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance: Compact, value: Any):
+        setattr(instance, self.slot, Compact.pack(value))
@@ -4,29 +4,35 @@ CSV Reader Class
 
 import csv
 
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 
 class CSVReader:
     @staticmethod
     def read_file(csv_file: str, skip_header: bool) -> List[str]:
-        content = []
-        with open(csv_file, "r") as file:
+        return list(CSVReader.iter_file(csv_file, skip_header))
+
+    @staticmethod
+    def read_file_into_dict(csv_file: str) -> Dict[str, str]:
+        return list(CSVReader.iter_file_into_dict(csv_file))
+
+    @staticmethod
+    def iter_file(csv_file: str, skip_header: bool) -> Iterator[List[str]]:
+        """
+        Yield rows one at a time without loading the file
+        """
+        with open(csv_file, "r", newline="") as file:
             reader = csv.reader(file)
 
             if skip_header:
-                next(reader)
+                next(reader, None)
 
-            for row in reader:
-                content.append(row)
-        return content
+            yield from reader
 
     @staticmethod
-    def read_file_into_dict(csv_file: str) -> Dict[str, str]:
-        content = []
-        with open(csv_file, "r") as file:
-            reader = csv.DictReader(file)
-
-            for row in reader:
-                content.append(row)
-        return content
+    def iter_file_into_dict(csv_file: str) -> Iterator[Dict[str, str]]:
+        """
+        Yield rows as dicts keyed by the header one at a time
+        """
+        with open(csv_file, "r", newline="") as file:
+            yield from csv.DictReader(file)
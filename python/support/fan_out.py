@@ -0,0 +1,109 @@
+"""
+Fan Out
+
+Runs a callable over every (profile, region) pair on a bounded thread pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from support.aws import Aws
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutResult:
+    def __init__(
+        self,
+        profile_name: str,
+        region_name: str,
+        result: Any = None,
+        error: Exception = None,
+    ):
+        self.profile_name: str = profile_name
+        self.region_name: str = region_name
+        self.result: Any = result
+        self.error: Exception = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class FanOut:
+    """
+    Fan a call out across accounts and regions
+
+    function gets the pooled client for client_name in each target, or
+    (profile_name, region_name) when no client_name is given.
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self.errors: List[FanOutResult] = []
+
+    def run(
+        self,
+        function: Callable,
+        profile_names: List[str],
+        region_names: Optional[List[str]] = None,
+        client_name: Optional[str] = None,
+    ) -> Iterator[FanOutResult]:
+        """
+        Yield a FanOutResult per target in completion order - failed targets
+        are yielded too and collected in self.errors
+        """
+        targets = [
+            (profile_name, region_name)
+            for profile_name in profile_names
+            for region_name in (
+                region_names or Aws.get_regions(profile_name, client_name or "ec2")
+            )
+        ]
+        return self.run_targets(function, targets, client_name)
+
+    def run_targets(
+        self,
+        function: Callable,
+        targets: List[Tuple[str, Optional[str]]],
+        client_name: Optional[str] = None,
+    ) -> Iterator[FanOutResult]:
+        """
+        Like run for an explicit list of (profile_name, region_name) pairs -
+        a None region is the profile's default region
+        """
+        logger.info(
+            "Running across %d targets with %d workers"
+            % (len(targets), self.max_workers)
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._call, function, profile_name, region_name, client_name
+                ): (profile_name, region_name)
+                for profile_name, region_name in targets
+            }
+            for future in as_completed(futures):
+                profile_name, region_name = futures[future]
+                try:
+                    result = FanOutResult(profile_name, region_name, future.result())
+                except Exception as err:
+                    logger.error("%s/%s failed: %s" % (profile_name, region_name, err))
+                    result = FanOutResult(profile_name, region_name, error=err)
+                    self.errors.append(result)
+                yield result
+
+    def _call(
+        self,
+        function: Callable,
+        profile_name: str,
+        region_name: str,
+        client_name: Optional[str],
+    ) -> Any:
+        if client_name:
+            return function(Aws.create_client(profile_name, client_name, region_name))
+        return function(profile_name, region_name)
@@ -2,9 +2,6 @@
 Logging Configurator
 """
 
-import logging
-import logging.config
-
 from file_finder import FileFinder
 
 
@@ -12,7 +9,10 @@ class LoggingConfigurator:
     @classmethod
     def configure_logging(cls, logging_ini="logging.ini"):
         """
-        Configure logging
+        Configure logging - logging.config pulls in logging.handlers, so scripts
+        only call this once their arguments are parsed
         """
+        import logging.config
+
         located_at = FileFinder.resolve(logging_ini)
         logging.config.fileConfig(located_at, disable_existing_loggers=False)
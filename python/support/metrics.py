@@ -0,0 +1,309 @@
+"""
+Metrics
+
+Per API call latency and volume instrumentation. Every pooled client reports
+call counts, latency histograms, retries, throttles and bytes received per
+operation through botocore events, and service wrapper methods report timing
+spans. Summaries print to stdout or go to a Prometheus textfile / JSON report.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    # upper bounds in seconds, prometheus style
+    buckets: Tuple[float, ...] = (
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(Histogram.buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(Histogram.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(Histogram.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+    def percentile(self, fraction: float) -> str:
+        """
+        Upper bound of the bucket holding the given fraction of observations
+        """
+        for bound, total in self.cumulative():
+            if total >= self.count * fraction:
+                return bound
+        return "+Inf"
+
+
+class OperationMetrics:
+    def __init__(self):
+        self.calls: int = 0
+        self.errors: int = 0
+        self.retries: int = 0
+        self.throttles: int = 0
+        self.bytes_received: int = 0
+        self.latency = Histogram()
+
+
+class Metrics:
+    enabled: bool = False
+    _lock = threading.Lock()
+    operations: Dict[Tuple[str, str], OperationMetrics] = {}
+    spans: Dict[str, Histogram] = {}
+
+    @staticmethod
+    def enable():
+        Metrics.enabled = True
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "--metrics",
+            help="print API call metrics when done or write them to a .prom/.json file",
+            nargs="?",
+            const="-",
+            metavar="FILE",
+        )
+
+    @staticmethod
+    def configure(args: argparse.Namespace):
+        if args.metrics:
+            Metrics.enable()
+            atexit.register(Metrics.report, args.metrics)
+
+    @staticmethod
+    def register(client: boto3.client):
+        """
+        Record every call client makes - a no-op until metrics are enabled
+        """
+        service_name = client.meta.service_model.service_name
+
+        def before_call(context: dict, **kwargs):
+            if Metrics.enabled:
+                context["metrics_start"] = time.perf_counter()
+
+        def needs_retry(response, operation, **kwargs):
+            if Metrics.enabled and response and "Error" in response[1]:
+                from support.throttling import Throttling
+
+                if Throttling.is_throttling_error(response[1]):
+                    with Metrics._lock:
+                        Metrics._operation(service_name, operation.name).throttles += 1
+
+        def after_call(http_response, parsed: dict, model, context: dict, **kwargs):
+            start = context.get("metrics_start")
+            if start is None or context.get("response_cache_hit"):
+                return
+            elapsed = time.perf_counter() - start
+            retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            # reading .content would drain streaming bodies before the caller
+            size = int(http_response.headers.get("Content-Length") or 0)
+            with Metrics._lock:
+                operation = Metrics._operation(service_name, model.name)
+                operation.calls += 1
+                operation.retries += retries
+                operation.bytes_received += size
+                operation.latency.observe(elapsed)
+                if http_response.status_code >= 300:
+                    operation.errors += 1
+
+        events = client.meta.events
+        events.register("before-call", before_call)
+        events.register("needs-retry", needs_retry)
+        events.register("after-call", after_call)
+
+    @staticmethod
+    def timed(name: str, function: Callable) -> Callable:
+        """
+        Wrap function in a timing span - returned iterators are timed while consumed
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not Metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            Metrics.observe_span(name, time.perf_counter() - start)
+            if isinstance(result, Iterator):
+                return Metrics._timed_generator(name, result)
+            return result
+
+        return wrapper
+
+    @staticmethod
+    def observe_span(name: str, seconds: float):
+        with Metrics._lock:
+            Metrics.spans.setdefault(name, Histogram()).observe(seconds)
+
+    @staticmethod
+    def _timed_generator(name: str, iterator: Iterator):
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        except StopIteration:
+            return
+        finally:
+            Metrics.observe_span(name + " (iteration)", elapsed)
+
+    @staticmethod
+    def _operation(service_name: str, operation_name: str) -> OperationMetrics:
+        key = (service_name, operation_name)
+        if key not in Metrics.operations:
+            Metrics.operations[key] = OperationMetrics()
+        return Metrics.operations[key]
+
+    @staticmethod
+    def report(destination: str = "-"):
+        if destination == "-":
+            Metrics.print_summary()
+        elif destination.endswith(".json"):
+            Metrics._write_atomically(
+                destination, json.dumps(Metrics.to_dict(), indent=2)
+            )
+        else:
+            Metrics._write_atomically(destination, Metrics.to_prometheus())
+        if destination != "-":
+            logger.info("Wrote metrics to '%s'" % destination)
+
+    @staticmethod
+    def print_summary():
+        from tabulate import tabulate
+
+        headers = ["service", "operation", "calls", "errors", "retries"]
+        headers += ["throttles", "bytes", "total s", "p50 <=", "p99 <="]
+        table = [
+            [
+                service_name,
+                operation_name,
+                operation.calls,
+                operation.errors,
+                operation.retries,
+                operation.throttles,
+                operation.bytes_received,
+                round(operation.latency.sum, 3),
+                operation.latency.percentile(0.5),
+                operation.latency.percentile(0.99),
+            ]
+            for (service_name, operation_name), operation in sorted(
+                Metrics.operations.items()
+            )
+        ]
+        print(tabulate(table, headers, tablefmt="simple"))
+        print()
+        table = [
+            [name, span.count, round(span.sum, 3)]
+            for name, span in sorted(Metrics.spans.items())
+        ]
+        print(tabulate(table, ["span", "count", "total s"], tablefmt="simple"))
+
+    @staticmethod
+    def to_dict() -> dict:
+        return {
+            "operations": [
+                {
+                    "service": service_name,
+                    "operation": operation_name,
+                    "calls": operation.calls,
+                    "errors": operation.errors,
+                    "retries": operation.retries,
+                    "throttles": operation.throttles,
+                    "bytes_received": operation.bytes_received,
+                    "latency_seconds_sum": operation.latency.sum,
+                    "latency_seconds_buckets": dict(operation.latency.cumulative()),
+                }
+                for (service_name, operation_name), operation in sorted(
+                    Metrics.operations.items()
+                )
+            ],
+            "spans": [
+                {"span": name, "count": span.count, "seconds_sum": span.sum}
+                for name, span in sorted(Metrics.spans.items())
+            ],
+        }
+
+    @staticmethod
+    def to_prometheus() -> str:
+        prefix = "aws_tools"
+        operations = sorted(Metrics.operations.items())
+        lines = []
+
+        counters = {
+            "api_calls_total": lambda operation: operation.calls,
+            "api_errors_total": lambda operation: operation.errors,
+            "api_retries_total": lambda operation: operation.retries,
+            "api_throttles_total": lambda operation: operation.throttles,
+            "api_response_bytes_total": lambda operation: operation.bytes_received,
+        }
+        for name, value in counters.items():
+            lines.append("# TYPE %s_%s counter" % (prefix, name))
+            for (service_name, operation_name), operation in operations:
+                lines.append(
+                    '%s_%s{service="%s",operation="%s"} %d'
+                    % (prefix, name, service_name, operation_name, value(operation))
+                )
+
+        name = "%s_api_call_duration_seconds" % prefix
+        lines.append("# TYPE %s histogram" % name)
+        for (service_name, operation_name), operation in operations:
+            labels = 'service="%s",operation="%s"' % (service_name, operation_name)
+            for bound, total in operation.latency.cumulative():
+                lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bound, total))
+            lines.append("%s_sum{%s} %f" % (name, labels, operation.latency.sum))
+            lines.append("%s_count{%s} %d" % (name, labels, operation.latency.count))
+
+        name = "%s_span_duration_seconds" % prefix
+        lines.append("# TYPE %s summary" % name)
+        for span_name, span in sorted(Metrics.spans.items()):
+            lines.append('%s_sum{span="%s"} %f' % (name, span_name, span.sum))
+            lines.append('%s_count{span="%s"} %d' % (name, span_name, span.count))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomically(destination: str, content: str):
+        # node exporter may read the textfile at any moment - never show it half written
+        temporary = "%s.%d.tmp" % (destination, os.getpid())
+        with open(temporary, "w") as file:
+            file.write(content)
+        os.replace(temporary, destination)
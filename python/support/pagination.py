@@ -0,0 +1,156 @@
+"""
+Pagination
+
+Streams items out of paginated AWS list/describe calls one page at a time, and
+merges several page streams read concurrently into one.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class Pagination:
+    # marks the end of the stream coming back from the merge threads
+    _done = object()
+
+    @staticmethod
+    def paginate(
+        client: boto3.client,
+        operation_name: str,
+        result_key: str,
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+        prefetch: bool = False,
+        input_token: str = "NextToken",
+        output_token: str = "NextToken",
+        **arguments,
+    ) -> Iterator:
+        """
+        Yield every item under result_key across all pages of operation_name
+
+        limit stops after N items, page_size sets the per-call page size and
+        prefetch fetches the next page in the background while the current one
+        is consumed. Operations botocore has no paginator for fall back to a
+        plain input_token/output_token loop.
+        """
+        pages = Pagination.pages(
+            client,
+            operation_name,
+            page_size=page_size,
+            input_token=input_token,
+            output_token=output_token,
+            **arguments,
+        )
+        if prefetch:
+            # the next page is fetched while the caller works on this one
+            pages = Pagination.merge([pages], buffer_size=1)
+
+        count = 0
+        try:
+            for page in pages:
+                for item in page.get(result_key, []):
+                    if limit is not None and count >= limit:
+                        return
+                    count += 1
+                    yield item
+                if limit is not None and count >= limit:
+                    return
+        finally:
+            # stops a prefetch thread when the caller stops early
+            close = getattr(pages, "close", None)
+            if close:
+                close()
+
+    @staticmethod
+    def pages(
+        client: boto3.client,
+        operation_name: str,
+        page_size: Optional[int] = None,
+        input_token: str = "NextToken",
+        output_token: str = "NextToken",
+        **arguments,
+    ) -> Iterator[dict]:
+        """
+        Yield raw response pages of operation_name
+        """
+        if client.can_paginate(operation_name):
+            pagination_config = {"PageSize": page_size} if page_size else {}
+            paginator = client.get_paginator(operation_name)
+            yield from paginator.paginate(
+                PaginationConfig=pagination_config, **arguments
+            )
+            return
+
+        if page_size:
+            arguments["MaxResults"] = page_size
+        while True:
+            resp = getattr(client, operation_name)(**arguments)
+            yield resp
+            next_token = resp.get(output_token, None)
+            logger.debug("Next Token: %s" % next_token)
+            if not next_token:
+                return
+            arguments[input_token] = next_token
+
+    @staticmethod
+    def merge(sources: List[Iterable], buffer_size: Optional[int] = None) -> Iterator:
+        """
+        Yield the items of every source as they come, each source read in its
+        own thread - in no particular order
+
+        At most buffer_size items (default one per source) wait to be taken.
+        An error in a source is raised here, and closing the iterator early
+        stops the rest.
+        """
+        if not sources:
+            return
+        buffer: queue.Queue = queue.Queue(maxsize=buffer_size or len(sources))
+        stop = threading.Event()
+        lock = threading.Lock()
+        remaining = [len(sources)]
+
+        def read(source: Iterable):
+            try:
+                for item in source:
+                    if not Pagination._put(buffer, item, stop):
+                        return
+            except Exception as err:
+                Pagination._put(buffer, err, stop)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    finished = remaining[0] == 0
+                if finished:
+                    Pagination._put(buffer, Pagination._done, stop)
+
+        for source in sources:
+            threading.Thread(target=read, args=(source,), daemon=True).start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is Pagination._done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    @staticmethod
+    def _put(buffer: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,44 @@
+"""
+Record Reader
+
+Rows of a CSV or NDJSON file, or of stdin with "-", as dicts one at a time.
+"""
+
+import csv
+import json
+import sys
+from typing import Iterator, Optional
+
+
+class RecordReader:
+    formats = ("csv", "ndjson")
+
+    @staticmethod
+    def format_of(path: str) -> str:
+        """
+        csv for .csv files, ndjson for anything else including stdin
+        """
+        return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+    @staticmethod
+    def iter_records(path: str, format: Optional[str] = None) -> Iterator[dict]:
+        """
+        Yield each CSV row keyed by the header or each NDJSON line - blank
+        lines are skipped, a malformed line raises ValueError with its number
+        """
+        format = format or RecordReader.format_of(path)
+        file = sys.stdin if path == "-" else open(path, "r", newline="")
+        try:
+            if format == "csv":
+                yield from csv.DictReader(file)
+                return
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as err:
+                    raise ValueError("%s line %d: %s" % (path, number, err))
+        finally:
+            if file is not sys.stdin:
+                file.close()
@@ -0,0 +1,249 @@
+"""
+Response Cache
+
+Opt-in (--cache) on-disk cache for read-only list/describe calls. Responses
+are stored per page as JSON in SQLite under ~/.cache/aws-tools, keyed by
+profile, region, operation and parameters, so a repeat listing never leaves
+the machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import sqlite3
+
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    # seconds a cached page stays fresh - only these operations are cached
+    ttls: Dict[Tuple[str, str], int] = {
+        ("ssm", "DescribeParameters"): 300,
+        ("ssm", "GetParametersByPath"): 300,
+        ("glue", "ListCrawlers"): 600,
+        ("glue", "GetCrawlers"): 60,
+        ("stepfunctions", "ListStateMachines"): 900,
+        ("logs", "DescribeLogGroups"): 300,
+    }
+    max_bytes: int = 256 * 1024 * 1024
+    # sqlite3 and hashlib are imported on first use - every script imports this
+    cache_file: str = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "aws-tools",
+        "responses.sqlite",
+    )
+
+    enabled: bool = False
+    refresh: bool = False
+    _local = threading.local()
+
+    @staticmethod
+    def enable(refresh: bool = False):
+        """
+        Cache responses of every client Aws.create_client makes from now on.
+        refresh ignores what is cached but still stores new responses.
+        """
+        ResponseCache.enabled = True
+        ResponseCache.refresh = refresh
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "--cache",
+            help="serve repeat listings from the local response cache",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--refresh",
+            help="ignore cached responses and refresh the cache (implies --cache)",
+            action="store_true",
+        )
+
+    @staticmethod
+    def configure(args: argparse.Namespace):
+        if args.cache or args.refresh:
+            ResponseCache.enable(refresh=args.refresh)
+
+    @staticmethod
+    def register(client: boto3.client, profile_name: str):
+        """
+        Serve cacheable calls made through client from the cache once enabled
+        """
+        region_name = client.meta.region_name
+        service_name = client.meta.service_model.service_name
+
+        def build_key(params: dict, model, context: dict, **kwargs):
+            ttl = ResponseCache.ttls.get((service_name, model.name))
+            # never write decrypted values to disk
+            if not ResponseCache.enabled or ttl is None or params.get("WithDecryption"):
+                return
+            context["response_cache"] = (
+                ResponseCache._key(
+                    profile_name, region_name, service_name, model.name, params
+                ),
+                ttl,
+            )
+
+        def before_call(context: dict, **kwargs):
+            if "response_cache" not in context or ResponseCache.refresh:
+                return None
+            key, _ = context["response_cache"]
+            parsed = ResponseCache.get(key)
+            if parsed is None:
+                return None
+            from botocore.awsrequest import AWSResponse
+
+            # not an API call - Metrics leaves it out
+            context["response_cache_hit"] = True
+            return AWSResponse(None, 200, {}, None), parsed
+
+        def after_call(http_response, parsed: dict, context: dict, **kwargs):
+            if "response_cache" not in context or http_response.status_code >= 300:
+                return
+            # responses served from the cache have no url
+            if http_response.url is None:
+                return
+            key, ttl = context["response_cache"]
+            ResponseCache.put(key, parsed, ttl)
+
+        events = client.meta.events
+        events.register("before-parameter-build", build_key)
+        events.register("before-call", before_call)
+        events.register("after-call", after_call)
+
+    @staticmethod
+    def get(key: str) -> Optional[dict]:
+        connection = ResponseCache._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        try:
+            parsed = ResponseCache._decode(row[0])
+        except ValueError:
+            # written by an older version - fetched and stored again
+            return None
+        logger.debug("Cache hit %s" % key)
+        return parsed
+
+    @staticmethod
+    def put(key: str, parsed: dict, ttl: int):
+        value = ResponseCache._encode(
+            {k: v for k, v in parsed.items() if k != "ResponseMetadata"}
+        )
+        now = time.time()
+        connection = ResponseCache._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, now + ttl, now, len(value), value),
+            )
+        ResponseCache._evict(connection)
+
+    @staticmethod
+    def _encode(parsed: dict) -> bytes:
+        # JSON rather than pickle - a shared cache file must not run code on load
+        def timestamp(value):
+            if hasattr(value, "isoformat"):
+                return {"__timestamp__": value.isoformat()}
+            raise TypeError("%r is not cacheable" % type(value))
+
+        return json.dumps(parsed, default=timestamp, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    @staticmethod
+    def _decode(value: bytes) -> dict:
+        from botocore.utils import parse_timestamp
+
+        def timestamp(item: dict):
+            # parsed like botocore parses response timestamps
+            if len(item) == 1 and "__timestamp__" in item:
+                return parse_timestamp(item["__timestamp__"])
+            return item
+
+        return json.loads(value.decode("utf-8"), object_hook=timestamp)
+
+    @staticmethod
+    def clear():
+        connection = ResponseCache._connection()
+        with connection:
+            connection.execute("DELETE FROM responses")
+
+    @staticmethod
+    def _evict(connection: sqlite3.Connection):
+        """
+        Drop expired pages, then least recently used ones until under max_bytes
+        """
+        with connection:
+            connection.execute(
+                "DELETE FROM responses WHERE expires <= ?", (time.time(),)
+            )
+            (total,) = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total <= ResponseCache.max_bytes:
+                return
+            rows = connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed"
+            ).fetchall()
+            evicted = []
+            for key, size in rows:
+                if total <= ResponseCache.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+            logger.debug("Evicted %d cached responses" % len(evicted))
+
+    @staticmethod
+    def _connection() -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads - one each
+        connection = getattr(ResponseCache._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            os.makedirs(os.path.dirname(ResponseCache.cache_file), exist_ok=True)
+            connection = sqlite3.connect(ResponseCache.cache_file, timeout=30)
+            # WAL lets parallel processes read while another one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires REAL, accessed REAL, "
+                "size INTEGER, value BLOB)"
+            )
+            ResponseCache._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(
+        profile_name: str,
+        region_name: str,
+        service_name: str,
+        operation_name: str,
+        params: dict,
+    ) -> str:
+        import hashlib
+
+        normalized = json.dumps(
+            [profile_name, region_name, service_name, operation_name, params],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,161 @@
+"""
+Throttling
+
+Client side rate limiting shared by every thread and client in the process.
+Each (profile, region, service, operation) gets a token bucket that starts
+at the known AWS limit, halves its rate when AWS throttles us and creeps back
+up on success.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    import boto3
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket with additive increase / multiplicative decrease of its rate
+    """
+
+    def __init__(self, max_rate: float, burst: float = None, min_rate: float = 0.5):
+        self.max_rate: float = max_rate
+        self.min_rate: float = min(min_rate, max_rate)
+        self.rate: float = max_rate
+        self.capacity: float = burst or max(1.0, max_rate)
+        self.tokens: float = self.capacity
+        self.last_refill: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            # drop the burst too so the next calls are actually spaced out
+            self.tokens = min(self.tokens, 0)
+        logger.debug("Throttled - rate now %.2f/s" % self.rate)
+
+    def on_success(self):
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate
+        )
+        self.last_refill = now
+
+
+class Throttling:
+    """
+    Process-wide registry of token buckets keyed by (profile, region, service,
+    operation) - AWS limits apply per account and region
+    """
+
+    # default transactions per second (refill rate, burst) for APIs we call
+    # in bulk - anything else gets default_limit
+    limits: Dict[Tuple[str, str], Tuple[float, float]] = {
+        ("ssm", "PutParameter"): (3, 3),
+        ("ssm", "GetParameter"): (40, 40),
+        ("ssm", "GetParameters"): (40, 40),
+        ("ssm", "GetParametersByPath"): (40, 40),
+        ("ssm", "DescribeParameters"): (10, 10),
+        ("ssm", "GetParameterHistory"): (10, 10),
+        ("glue", "StartCrawler"): (5, 5),
+        ("glue", "BatchGetCrawlers"): (10, 10),
+        ("glue", "StartJobRun"): (5, 5),
+        ("stepfunctions", "StartExecution"): (150, 800),
+    }
+    default_limit: Tuple[float, float] = (25, 25)
+    throttling_error_codes = {
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "ProvisionedThroughputExceededException",
+        "RequestThrottled",
+        "RequestThrottledException",
+        "SlowDown",
+        "RateExceeded",
+    }
+    # botocore keeps retrying throttled calls this many times while the
+    # buckets slow everyone down
+    max_attempts: int = 10
+    # switched off for offline benchmarks where there is no AWS limit to respect
+    enabled: bool = True
+
+    _lock = threading.Lock()
+    _buckets: Dict[Tuple[str, str, str, str], TokenBucket] = {}
+
+    @staticmethod
+    def get_bucket(
+        profile_name: str, region_name: str, service_name: str, operation_name: str
+    ) -> TokenBucket:
+        key = (profile_name, region_name, service_name, operation_name)
+        bucket = Throttling._buckets.get(key)
+        if bucket is None:
+            with Throttling._lock:
+                bucket = Throttling._buckets.get(key)
+                if bucket is None:
+                    rate, burst = Throttling.limits.get(
+                        (service_name, operation_name), Throttling.default_limit
+                    )
+                    bucket = TokenBucket(rate, burst)
+                    Throttling._buckets[key] = bucket
+        return bucket
+
+    @staticmethod
+    def register(client: boto3.client, profile_name: str):
+        """
+        Hook the shared buckets into every request client sends, retries included
+        """
+        target = (
+            profile_name,
+            client.meta.region_name,
+            client.meta.service_model.service_name,
+        )
+
+        def before_request(operation_name: str, **kwargs):
+            if Throttling.enabled:
+                Throttling.get_bucket(*target, operation_name).acquire()
+
+        def needs_retry(response, operation, **kwargs):
+            if response and Throttling.is_throttling_error(response[1]):
+                Throttling.get_bucket(*target, operation.name).on_throttle()
+
+        def after_call(http_response, model, **kwargs):
+            if http_response is not None and http_response.status_code < 300:
+                Throttling.get_bucket(*target, model.name).on_success()
+
+        events = client.meta.events
+        events.register("request-created", before_request)
+        events.register("needs-retry", needs_retry)
+        events.register("after-call", after_call)
+
+    @staticmethod
+    def is_throttling_error(parsed_response: dict) -> bool:
+        code = parsed_response.get("Error", {}).get("Code", "")
+        return code in Throttling.throttling_error_codes